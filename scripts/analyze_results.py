@@ -8,7 +8,11 @@ import json
 from pathlib import Path
 from typing import Dict, List, Optional
 
-ZIGSCAN_PATH = "/home/winger/code/zig/zigscan"
+import workspace
+from blob_store import walk_submission
+
+ZIGSCAN_PATH = str(workspace.bench_dir())
+RESULTS_DIR = workspace.results_dir()
 
 def parse_finish_log(log_path: str) -> Dict:
     """解析finish.log文件，提取关键指标"""
@@ -75,7 +79,8 @@ def collect_all_results() -> List[Dict]:
     """收集所有finish.log的结果"""
     results = []
     
-    for root, dirs, files in os.walk(ZIGSCAN_PATH):
+    # 跳过vendored工具链/参考文档，不读取它们
+    for root, dirs, files in walk_submission(ZIGSCAN_PATH):
         if 'finish.log' in files:
             log_path = os.path.join(root, 'finish.log')
             result = parse_finish_log(log_path)
@@ -116,14 +121,14 @@ if __name__ == "__main__":
     
     # 生成Markdown
     md_content = generate_markdown_table(results)
-    md_path = "/home/winger/code/zig/ai-pk/results/ZIGSCAN_RESULTS.md"
+    md_path = str(RESULTS_DIR / "ZIGSCAN_RESULTS.md")
     with open(md_path, 'w', encoding='utf-8') as f:
         f.write(md_content)
     print(f"Generated: {md_path}")
     
     # 生成JSON
     json_content = generate_json_results(results)
-    json_path = "/home/winger/code/zig/ai-pk/results/zigscan_results.json"
+    json_path = str(RESULTS_DIR / "zigscan_results.json")
     with open(json_path, 'w', encoding='utf-8') as f:
         f.write(json_content)
     print(f"Generated: {json_path}")
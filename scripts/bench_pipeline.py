@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+流水线基准测试 - 用合成的大规模测试目录衡量报告工具本身的性能
+真实数据只有二十来个测试目录，看不出1000或100000个时会怎样。
+generate 按 STATS_TEMPLATE.json 和真实stats.json的形状（quality_breakdown、
+metadata里的token字段、中英文各种finish.log/start）生成合成工作区；
+run 在多个规模上分别计时 发现/导入/评分/汇总/图表/HTML 各步骤，
+结果追加到 results/pipeline_bench.json，并与上一次同规模的结果对比，变慢的步骤会标出来。
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import resource
+import tempfile
+import subprocess
+import contextlib
+from datetime import datetime, timedelta
+
+import workspace
+
+RESULTS_FILE = workspace.results_root() / 'pipeline_bench.json'
+PROJECT = 'synthetic'
+DEFAULT_SCALES = [100, 1000, 10000]
+REGRESSION_RATIO = 1.25
+REGRESSION_MIN_S = 0.02
+
+# 目录名用的别名 -> 与registry里的别名一致，保证规范化能解析
+ENGINES = [('gpt5', 'GPT-5'), ('gpt5_codex', 'GPT-5-Codex'), ('sonnet4.5', 'Claude Sonnet 4.5'),
+           ('opus4.1', 'Claude Opus 4.1'), ('glm4.6', 'GLM-4.6'), ('grok-code-fast-1', 'Grok Code Fast 1'),
+           ('kat', 'KAT-Coder'), ('qwen', 'Qwen Coder'), ('Supernova', 'Code Supernova')]
+CLIENTS = [('codex', 'Codex'), ('dorid', 'Factory Droid'), ('claudecode', 'Claude Code'),
+           ('kilo', 'Kilo Code'), ('roo', 'Roo Code'), ('cline', 'Cline'), ('qwen-cli', 'Qwen CLI')]
+LEVELS = ['', 'minimal', 'low', 'medium', 'hight']
+STATUSES = [('SUCCESS', 8), ('PARTIAL', 5), ('FAILED', 0), ('UNCLEAR', 3)]
+NOTES = ['成功，非常流畅', '整体可用', '总体可用', '大部分可用', '投机使用ncat', '无法完成',
+         '完全失败', 'Mostly usable', 'Works but slow']
+WEEKDAYS = ['星期一', '星期二', '星期三', '星期四', '星期五', '星期六', '星期日']
+# 少量记录故意让finish.log与stats.json不一致，给一致性检查留样本
+INCONSISTENT_RATE = 0.03
+
+
+def zh_date(dt):
+    """finish.log/start里的中文date格式：2025年 10月 18日 星期六 22:25:28 CST"""
+    return f"{dt.year}年 {dt.month:02d}月 {dt.day:02d}日 {WEEKDAYS[dt.weekday()]} {dt:%H:%M:%S} CST"
+
+
+def fmt_duration(minutes):
+    h, m = divmod(int(minutes), 60)
+    return f"{h}h {m}m {int(minutes * 60) % 60}s" if h else f"{m}m {int(minutes * 60) % 60}s"
+
+
+def finish_log(rng, client, status, minutes, tokens, start, end):
+    """按客户端生成不同风格的finish.log（Codex/Claude Code/Factory/纯中文/英文）"""
+    lines = []
+    if tokens:
+        if client == 'codex':
+            lines.append(f"[{end:%Y-%m-%dT%H:%M:%S}] tokens used: {tokens:,}")
+        elif client == 'claudecode':
+            lines += [f"Total duration (wall): {fmt_duration(minutes or 0)}",
+                      f"     Usage by model:",
+                      f"         glm-4.6:  {tokens / 1000:.1f}k input, {tokens / 10000:.1f}k output"]
+        elif client == 'dorid':
+            lines += ["  Session Token Usage", "", "   Factory Token Usage (approximate):",
+                      f"   {tokens / 1000:.1f}K tokens"]
+        else:
+            lines.append(f"Tokens: {tokens}")
+    lines.append('-' * 10)
+    if minutes:
+        lines.append(rng.choice([f"用时{minutes:g}分钟", f"耗时\n{fmt_duration(minutes)}",
+                                 f"Completed in {minutes:g} minutes"]))
+    lines.append({'SUCCESS': rng.choice(['成功', '完成度很高', 'Success']),
+                  'PARTIAL': rng.choice(['部分成功', '整体可用但核心功能缺陷', 'Partially working']),
+                  'FAILED': rng.choice(['无法完成', '完全失败', 'Failed']),
+                  'UNCLEAR': '不确定'}[status])
+    lines.append(zh_date(end) if rng.random() < 0.8 else end.strftime('%a %b %d %H:%M:%S CST %Y'))
+    return '\n'.join(lines) + '\n'
+
+
+def make_run(rng, index, base_date):
+    engine_tok, engine = rng.choice(ENGINES)
+    client_tok, client = rng.choice(CLIENTS)
+    level = rng.choice(LEVELS)
+    status, base = rng.choices(STATUSES, weights=[5, 2, 2, 1])[0]
+    start = base_date + timedelta(days=rng.randrange(120), minutes=rng.randrange(1440))
+    minutes = round(rng.uniform(5, 180), 1) if status != 'FAILED' or rng.random() < 0.5 else None
+    tokens = rng.randrange(50_000, 5_000_000) if minutes else None
+    end = start + timedelta(minutes=minutes or rng.uniform(10, 60))
+    engine_dir = f"{engine_tok}_{level}" if level else engine_tok
+    test_dir = f"{engine_dir}-{client_tok}-{start:%Y-%m-%d}-{index:06d}"
+
+    bonus = {k: rng.choice([0.0, 0.5, 1.0]) if base else 0.0
+             for k in ('functionality', 'code_quality', 'performance')}
+    bonus['total'] = sum(bonus.values())
+    penalty = {k: rng.choice([0.0, 0.0, 0.5, 1.0]) if base else 0.0
+               for k in ('bugs', 'workaround', 'efficiency')}
+    penalty['total'] = sum(penalty.values())
+    raw = base + bonus['total'] - penalty['total']
+    final = int(max(0, min(10, raw)))
+    notes = rng.choice(NOTES)
+    stats = {
+        'test_dir': test_dir,
+        'engine': engine,
+        'client': client,
+        'config': level or 'default',
+        'completed': status,
+        'time_minutes': minutes,
+        'tokens': tokens,
+        'quality_score': final,
+        'quality_breakdown': {
+            'base_score': base,
+            'bonus': bonus,
+            'penalty': penalty,
+            'calculation': f"{base} + {bonus['total']} - {penalty['total']} = {raw:g}",
+            'final_score': final,
+            'reasoning': f"基础分{base}({status})",
+        },
+        'notes': notes,
+        'detailed_comments': f"{notes}。合成数据 #{index}",
+        'issues': [] if status == 'SUCCESS' else [rng.choice(['并发控制无效', '超时未处理'])],
+        'metadata': {
+            'test_date': f"{start:%Y-%m-%d}",
+            'zig_version': '0.15.1',
+            'verified': rng.random() < 0.7,
+        },
+    }
+    if tokens and client_tok == 'dorid':
+        stats['metadata'].update({'factory_token_usage': tokens, 'raw_input_tokens': tokens // 3,
+                                  'cache_read': tokens, 'output_tokens': tokens // 20})
+    if status == 'SUCCESS' and rng.random() < 0.5:
+        ports = rng.choice([500, 1000, 65535])
+        stats['metadata']['performance_test'] = f"{ports} ports in {rng.uniform(0.2, 10):.2f}s"
+
+    log_minutes, log_tokens = minutes, tokens
+    if minutes and rng.random() < INCONSISTENT_RATE:
+        log_minutes = round(minutes * rng.uniform(1.5, 3), 1)
+    return test_dir, stats, finish_log(rng, client_tok, status, log_minutes, log_tokens, start, end), start
+
+
+def generate(root, runs, seed=0):
+    """在root下生成合成工作区：benchmarks/synthetic/<test_dir>/{stats.json,finish.log,start}"""
+    rng = random.Random(seed)
+    bench = os.path.join(root, 'benchmarks', PROJECT)
+    os.makedirs(bench, exist_ok=True)
+    template = workspace.benchmarks_dir() / workspace.default_project() / 'STATS_TEMPLATE.json'
+    if template.exists():
+        shutil.copyfile(template, os.path.join(bench, 'STATS_TEMPLATE.json'))
+    with open(os.path.join(root, 'workspace.json'), 'w', encoding='utf-8') as f:
+        json.dump({'default_project': PROJECT}, f)
+    base_date = datetime(2025, 10, 1, 8, 0, 0)
+    for i in range(runs):
+        test_dir, stats, log, start = make_run(rng, i, base_date)
+        run_dir = os.path.join(bench, test_dir)
+        os.makedirs(run_dir, exist_ok=True)
+        with open(os.path.join(run_dir, 'stats.json'), 'w', encoding='utf-8') as f:
+            json.dump(stats, f, indent=2, ensure_ascii=False)
+        with open(os.path.join(run_dir, 'finish.log'), 'w', encoding='utf-8') as f:
+            f.write(log)
+        with open(os.path.join(run_dir, 'start'), 'w', encoding='utf-8') as f:
+            f.write(zh_date(start) + '\n')
+    return bench
+
+
+# ---- worker：在AI_PK_ROOT指向合成工作区的子进程里逐步计时 ----
+
+def timed(results, name, func):
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            value = func()
+        status = 'ok'
+    except ImportError as e:
+        value, status = None, f'skipped ({e.name} not installed)'
+    except Exception as e:
+        value, status = None, f'error: {e}'
+    results[name] = {'wall_s': round(time.perf_counter() - wall, 4),
+                     'cpu_s': round(time.process_time() - cpu, 4), 'status': status}
+    return value
+
+
+def worker():
+    from blob_store import iter_run_dirs
+    import cyberpunk_analyzer
+    import manual_verification
+    import ranking
+    import registry
+    import trends
+
+    steps = {}
+    results_dir = workspace.results_dir()
+    results_dir.mkdir(parents=True, exist_ok=True)
+
+    timed(steps, 'discovery', lambda: [list(iter_run_dirs(workspace.bench_dir(p)))
+                                       for p in workspace.list_projects()])
+    records = timed(steps, 'ingest', cyberpunk_analyzer.load_all_stats)
+
+    def aggregate():
+        with open(results_dir / 'benchmark_data.json', 'w', encoding='utf-8') as f:
+            json.dump(records, f, indent=2, ensure_ascii=False)
+        registry.save_index()
+        trends.update(records)
+        cyberpunk_analyzer.save_reports(records, verbose=False)
+
+    timed(steps, 'scoring', lambda: ranking.write_rankings(records))
+    timed(steps, 'aggregation', aggregate)
+    timed(steps, 'trends_report', lambda: trends.write_report(trends.load_series()))
+    timed(steps, 'consistency', lambda: [manual_verification.check_run(d)
+                                         for p in workspace.list_projects()
+                                         for d in iter_run_dirs(workspace.bench_dir(p))])
+
+    def charts():
+        import generate_charts
+        generate_charts.generate_all()
+
+    def html():
+        import generate_html_report
+        with open(results_dir / 'REPORT.html', 'w', encoding='utf-8') as f:
+            f.write(generate_html_report.generate_html_report(records))
+
+    def html_bilingual():
+        import generate_bilingual_html
+        for lang in ('en', 'zh'):
+            generate_bilingual_html.generate_html(records, lang)
+
+    def site():
+        import static_site
+        static_site.build_site(force=True)
+
+    timed(steps, 'charts', charts)
+    timed(steps, 'html', html)
+    timed(steps, 'html_bilingual', html_bilingual)
+    timed(steps, 'static_site', site)
+    timed(steps, 'static_site_incremental', lambda: __import__('static_site').build_site())
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({'steps': steps, 'peak_rss_mb': round(peak_kb / 1024, 1)}))
+
+
+# ---- 主流程 ----
+
+def run_scale(runs, seed, keep=False, timeout=None):
+    root = tempfile.mkdtemp(prefix=f'ai-pk-bench-{runs}-')
+    try:
+        start = time.perf_counter()
+        generate(root, runs, seed)
+        gen_s = time.perf_counter() - start
+        env = dict(os.environ, AI_PK_ROOT=root)
+        env.pop('AI_PK_PROJECT', None)
+        env.pop('AI_PK_PROFILE', None)
+        proc = subprocess.run([sys.executable, __file__, 'worker'], env=env, capture_output=True,
+                              text=True, timeout=timeout)
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else 'worker failed')
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        result['generate_s'] = round(gen_s, 3)
+        if keep:
+            result['root'] = root
+        return result
+    finally:
+        if not keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+def git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=workspace.CODE_ROOT,
+                             capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+
+
+def load_history():
+    if not RESULTS_FILE.exists():
+        return {'runs': []}
+    with open(RESULTS_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def previous_scale(history, runs):
+    """上一次同规模的结果"""
+    for entry in reversed(history['runs']):
+        if str(runs) in entry['scales']:
+            return entry['scales'][str(runs)]
+    return None
+
+
+def regressions(current, previous):
+    found = []
+    if not previous:
+        return found
+    for step, s in current['steps'].items():
+        p = previous['steps'].get(step)
+        if not p or s['status'] != 'ok' or p['status'] != 'ok':
+            continue
+        if s['wall_s'] > p['wall_s'] * REGRESSION_RATIO and s['wall_s'] - p['wall_s'] > REGRESSION_MIN_S:
+            found.append((step, p['wall_s'], s['wall_s']))
+    return found
+
+
+def print_scale(runs, result, previous):
+    print(f"\n[*] {runs} runs (generated in {result['generate_s']:.2f}s, peak RSS {result['peak_rss_mb']} MB)")
+    for step, s in result['steps'].items():
+        prev = previous['steps'].get(step) if previous else None
+        delta = ''
+        if prev and prev['status'] == 'ok' and s['status'] == 'ok' and prev['wall_s'] > 0:
+            delta = f"  ({s['wall_s'] / prev['wall_s']:.2f}x vs previous)"
+        if s['status'] == 'ok':
+            print(f"    {step:24s} {s['wall_s']:9.3f}s  cpu {s['cpu_s']:9.3f}s{delta}")
+        else:
+            print(f"    {step:24s} {s['status']}")
+
+
+def cmd_run(args):
+    history = load_history()
+    entry = {'commit': git_commit(), 'timestamp': datetime.now().isoformat(timespec='seconds'),
+             'python': sys.version.split()[0], 'seed': args.seed, 'scales': {}}
+    found = []
+    for runs in args.scales:
+        print(f"[*] Benchmarking {runs} runs...")
+        try:
+            result = run_scale(runs, args.seed, args.keep, args.timeout)
+        except (RuntimeError, subprocess.TimeoutExpired) as e:
+            print(f"[!] {runs} runs failed: {e}")
+            continue
+        previous = previous_scale(history, runs)
+        print_scale(runs, result, previous)
+        entry['scales'][str(runs)] = result
+        for step, before, after in regressions(result, previous):
+            found.append((runs, step, before, after))
+
+    if entry['scales'] and not args.no_save:
+        history['runs'].append(entry)
+        RESULTS_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = str(RESULTS_FILE) + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(history, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, RESULTS_FILE)
+        print(f"\n[+] Results saved: {RESULTS_FILE}")
+    for runs, step, before, after in found:
+        print(f"[!] Regression at {runs} runs: {step} {before:.3f}s -> {after:.3f}s")
+    if found and args.fail_on_regression:
+        return 1
+    return 0
+
+
+def cmd_generate(args):
+    bench = generate(args.root, args.runs, args.seed)
+    print(f"[+] Generated {args.runs} synthetic runs in {bench}")
+    print(f"[*] Use with: AI_PK_ROOT={args.root} python3 scripts/pipeline.py")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the reporting pipeline on synthetic corpora')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('run', help='time every pipeline step at several scales')
+    p.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES)
+    p.add_argument('--seed', type=int, default=0)
+    p.add_argument('--timeout', type=float, help='abort a scale after this many seconds')
+    p.add_argument('--keep', action='store_true', help='keep the generated workspaces')
+    p.add_argument('--no-save', action='store_true', help='do not append to results/pipeline_bench.json')
+    p.add_argument('--fail-on-regression', action='store_true')
+    p.set_defaults(func=cmd_run)
+    p = sub.add_parser('generate', help='write a synthetic workspace to ROOT')
+    p.add_argument('root')
+    p.add_argument('--runs', type=int, default=1000)
+    p.add_argument('--seed', type=int, default=0)
+    p.set_defaults(func=cmd_generate)
+    sub.add_parser('worker', help=argparse.SUPPRESS).set_defaults(func=lambda args: worker())
+    args = parser.parse_args()
+    sys.exit(args.func(args) or 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+内容寻址存储 - 去重各测试目录里重复的工具链和参考文档
+每个测试目录都带一份 zig-Language-Reference-0.15.1.txt 和 zig-0.15.1 工具链，
+ingest 会把它们按 sha256 存进 artifacts/blobs/ 只保留一份，
+原位置换成 artifacts.json 清单，restore 可以按清单还原。
+"""
+import os
+import sys
+import json
+import stat
+import shutil
+import hashlib
+import argparse
+import fnmatch
+
+import workspace
+
+BENCH_ROOT = workspace.benchmarks_dir()
+STORE_DIR = workspace.root() / 'artifacts' / 'blobs'
+
+MANIFEST_NAME = 'artifacts.json'
+CHUNK_SIZE = 1 << 20
+
+# 需要去重的vendored产物（按文件名匹配）
+VENDORED_PATTERNS = [
+    'zig-Language-Reference-*.txt',
+    'zig-[0-9]*',
+    'zig-linux-*',
+]
+
+# 构建缓存目录，遍历时直接跳过，不进store
+SKIP_DIRS = {'.zig-cache', 'zig-cache', 'zig-out', '.git', '.marscode', '__pycache__'}
+
+
+def is_vendored(name):
+    """文件名是否属于vendored产物"""
+    return any(fnmatch.fnmatch(name, p) for p in VENDORED_PATTERNS)
+
+
+def should_skip(name):
+    """遍历时是否剪掉该目录/文件（vendored产物、构建缓存、清单本身）"""
+    return name in SKIP_DIRS or name == MANIFEST_NAME or is_vendored(name)
+
+
+def walk_submission(root):
+    """os.walk的替代：剪掉vendored产物和构建缓存，不进入也不读取"""
+    for dirpath, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if not should_skip(d))
+        yield dirpath, dirs, [f for f in files if not should_skip(f)]
+
+
+def iter_run_dirs(project_dir):
+    """列出项目下所有测试目录（含stats.json或finish.log的子目录）"""
+    for entry in sorted(os.scandir(project_dir), key=lambda e: e.name):
+        if not entry.is_dir(follow_symlinks=False) or should_skip(entry.name):
+            continue
+        if (os.path.exists(os.path.join(entry.path, 'stats.json')) or
+                os.path.exists(os.path.join(entry.path, 'finish.log'))):
+            yield entry.path
+
+
+def hash_file(path):
+    """流式计算sha256"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def blob_path(digest):
+    """blob在store中的路径：blobs/ab/cdef..."""
+    return STORE_DIR / digest[:2] / digest[2:]
+
+
+def has_blob(digest):
+    return blob_path(digest).exists()
+
+
+def put_file(path):
+    """把文件存入store，已存在则跳过拷贝，返回digest"""
+    digest = hash_file(path)
+    target = blob_path(digest)
+    if not target.exists():
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(target.name + '.tmp')
+        shutil.copyfile(path, tmp)
+        os.chmod(tmp, 0o444)
+        os.replace(tmp, target)
+    return digest
+
+
+def put_bytes(data):
+    """把一段字节存入store（用于目录树对象）"""
+    digest = hashlib.sha256(data).hexdigest()
+    target = blob_path(digest)
+    if not target.exists():
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(target.name + '.tmp')
+        tmp.write_bytes(data)
+        os.replace(tmp, target)
+    return digest
+
+
+def describe(path):
+    """把一个文件/目录/符号链接存入store，返回清单条目"""
+    st = os.lstat(path)
+    if stat.S_ISLNK(st.st_mode):
+        # 工具链通常是指向仓库外的链接，只记录目标
+        return {'type': 'symlink', 'target': os.readlink(path)}
+    if stat.S_ISDIR(st.st_mode):
+        entries = {}
+        for name in sorted(os.listdir(path)):
+            entries[name] = describe(os.path.join(path, name))
+        tree = json.dumps(entries, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        size = sum(e.get('size', 0) for e in entries.values())
+        return {'type': 'tree', 'sha256': put_bytes(tree), 'size': size}
+    return {
+        'type': 'file',
+        'sha256': put_file(path),
+        'size': st.st_size,
+        'mode': stat.S_IMODE(st.st_mode),
+    }
+
+
+def load_manifest(run_dir):
+    """读取测试目录的artifacts.json，不存在返回空清单"""
+    path = os.path.join(run_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {'version': 1, 'artifacts': {}}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_manifest(run_dir, manifest):
+    path = os.path.join(run_dir, MANIFEST_NAME)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False, sort_keys=True)
+        f.write('\n')
+    os.replace(tmp, path)
+
+
+def remove_path(path):
+    if os.path.islink(path) or not os.path.isdir(path):
+        os.unlink(path)
+    else:
+        shutil.rmtree(path)
+
+
+def ingest_run(run_dir, dry_run=False):
+    """把一个测试目录里的vendored产物存入store并替换成清单引用"""
+    manifest = load_manifest(run_dir)
+    ingested = []
+    for name in sorted(os.listdir(run_dir)):
+        if not is_vendored(name):
+            continue
+        path = os.path.join(run_dir, name)
+        if dry_run:
+            ingested.append((name, None))
+            continue
+        entry = describe(path)
+        manifest['artifacts'][name] = entry
+        remove_path(path)
+        ingested.append((name, entry))
+    if ingested and not dry_run:
+        save_manifest(run_dir, manifest)
+    return ingested
+
+
+def materialize(entry, dest, link=True):
+    """按清单条目从store还原到dest"""
+    kind = entry['type']
+    if kind == 'symlink':
+        os.symlink(entry['target'], dest)
+    elif kind == 'tree':
+        os.makedirs(dest, exist_ok=True)
+        entries = json.loads(blob_path(entry['sha256']).read_bytes())
+        for name, child in entries.items():
+            materialize(child, os.path.join(dest, name), link)
+    else:
+        src = blob_path(entry['sha256'])
+        mode = entry.get('mode', 0o644)
+        # blob是只读的0o444，硬链接共用inode改不了权限：可执行文件（工具链）一律复制
+        if link and not mode & 0o111:
+            try:
+                os.link(src, dest)
+                return
+            except OSError:
+                pass
+        shutil.copyfile(src, dest)
+        os.chmod(dest, mode)
+
+
+def restore_run(run_dir, link=True):
+    """还原测试目录中被替换的产物（只读数据文件默认硬链接，节省空间；可执行文件复制）"""
+    manifest = load_manifest(run_dir)
+    restored = []
+    for name, entry in sorted(manifest['artifacts'].items()):
+        dest = os.path.join(run_dir, name)
+        if os.path.lexists(dest):
+            continue
+        materialize(entry, dest, link)
+        restored.append(name)
+    return restored
+
+
+def verify_store():
+    """校验store中每个blob的内容与文件名一致"""
+    bad = []
+    if not STORE_DIR.exists():
+        return bad
+    for sub in sorted(STORE_DIR.iterdir()):
+        for blob in sorted(sub.iterdir()):
+            if blob.name.endswith('.tmp'):
+                continue
+            if hash_file(blob) != sub.name + blob.name:
+                bad.append(str(blob))
+    return bad
+
+
+def project_dirs(project=None):
+    if project:
+        return [BENCH_ROOT / project]
+    return sorted(p for p in BENCH_ROOT.iterdir() if p.is_dir())
+
+
+def cmd_ingest(args):
+    total = 0
+    for project_dir in project_dirs(args.project):
+        for run_dir in iter_run_dirs(project_dir):
+            for name, entry in ingest_run(run_dir, args.dry_run):
+                test_dir = os.path.basename(run_dir)
+                if entry is None:
+                    print(f"[*] Would ingest: {test_dir}/{name}")
+                else:
+                    total += entry.get('size', 0)
+                    print(f"[+] Ingested: {test_dir}/{name} -> {entry['type']} {entry.get('sha256', entry.get('target', ''))[:12]}")
+    print(f"[+] Replaced {total / 1024 / 1024:.1f} MB of vendored artifacts with manifest references")
+
+
+def cmd_restore(args):
+    for project_dir in project_dirs(args.project):
+        for run_dir in iter_run_dirs(project_dir):
+            for name in restore_run(run_dir, link=not args.copy):
+                print(f"[+] Restored: {os.path.basename(run_dir)}/{name}")
+
+
+def cmd_status(args):
+    refs = 0
+    logical = 0
+    digests = set()
+    for project_dir in project_dirs(args.project):
+        for run_dir in iter_run_dirs(project_dir):
+            for entry in load_manifest(run_dir)['artifacts'].values():
+                refs += 1
+                logical += entry.get('size', 0)
+                if 'sha256' in entry:
+                    digests.add(entry['sha256'])
+    stored = sum(blob_path(d).stat().st_size for d in digests if has_blob(d))
+    print(f"[+] Manifest references: {refs}")
+    print(f"[+] Unique blobs:        {len(digests)}")
+    print(f"[+] Logical size:        {logical / 1024 / 1024:.1f} MB")
+    print(f"[+] Stored size:         {stored / 1024 / 1024:.1f} MB")
+
+
+def cmd_verify(args):
+    bad = verify_store()
+    for path in bad:
+        print(f"[!] Corrupted blob: {path}")
+    print(f"[+] Store verified, {len(bad)} corrupted blob(s)")
+    return 1 if bad else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Content-addressed store for vendored toolchains and reference docs')
+    parser.add_argument('--project', help='only process benchmarks/<project>')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('ingest', help='move vendored artifacts into the store')
+    p.add_argument('--dry-run', action='store_true')
+    p.set_defaults(func=cmd_ingest)
+    p = sub.add_parser('restore', help='materialize artifacts back from manifests')
+    p.add_argument('--copy', action='store_true', help='copy instead of hardlinking')
+    p.set_defaults(func=cmd_restore)
+    sub.add_parser('status', help='show dedup statistics').set_defaults(func=cmd_status)
+    sub.add_parser('verify', help='re-hash every blob in the store').set_defaults(func=cmd_verify)
+    args = parser.parse_args()
+    sys.exit(args.func(args) or 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+可复现构建 - 用统一的Zig 0.15.1工具链重新编译每个提交
+不再信任测试目录里现成的二进制，按源码在进程池里并行构建
+ReleaseFast/ReleaseSafe，记录构建耗时、二进制大小和源码哈希。
+工具链版本、构建模式、超时和源码后缀来自任务规格（tasks.py）；
+不是Zig的任务用build.recipe命令构建，产物放到{bin_dir}下。
+"""
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import tasks
+import workspace
+from blob_store import walk_submission, iter_run_dirs, hash_file
+
+PROJECT_ROOT = workspace.root()
+PROJECT = workspace.current_project() or workspace.default_project()
+BENCH_DIR = workspace.bench_dir()
+RESULTS_DIR = workspace.results_dir()
+BUILD_DIR = RESULTS_DIR / 'builds'
+GLOBAL_CACHE_DIR = RESULTS_DIR / '.zig-cache' / 'global'
+BUILD_RESULTS_FILE = RESULTS_DIR / 'build_results.json'
+
+BUILD_SPEC = tasks.load_spec()['build']
+TOOLCHAIN = BUILD_SPEC['toolchain']
+ZIG_VERSION = BUILD_SPEC['version'] if TOOLCHAIN == 'zig' else tasks.DEFAULT_SPEC['build']['version']
+ZIG_MODES = ['Debug', 'ReleaseSafe', 'ReleaseFast', 'ReleaseSmall']
+DEFAULT_MODES = BUILD_SPEC['modes']
+BUILD_TIMEOUT = BUILD_SPEC['timeout']
+SOURCE_SUFFIXES = tuple(BUILD_SPEC['sources'])
+
+MAIN_RE = re.compile(r'^\s*pub\s+fn\s+main\s*\(', re.MULTILINE)
+
+
+def find_zig(explicit=None):
+    """定位共享工具链：--zig > $ZIG > toolchains/zig-0.15.1/zig > PATH"""
+    candidates = [explicit, os.environ.get('ZIG'),
+                  str(PROJECT_ROOT / 'toolchains' / f'zig-{ZIG_VERSION}' / 'zig'),
+                  shutil.which('zig')]
+    for c in candidates:
+        if c and os.path.isfile(c) and os.access(c, os.X_OK):
+            return c
+    return None
+
+
+def zig_version(zig):
+    try:
+        out = subprocess.run([zig, 'version'], capture_output=True, text=True, timeout=30)
+        return out.stdout.strip()
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+
+
+def source_files(run_dir):
+    """提交中的所有源码（build.sources后缀，跳过vendored产物和构建缓存）"""
+    files = []
+    for root, dirs, names in walk_submission(run_dir):
+        for name in names:
+            if name.endswith(SOURCE_SUFFIXES):
+                files.append(os.path.join(root, name))
+    return sorted(files)
+
+
+def source_digest(run_dir):
+    """源码树哈希：相对路径 + 文件哈希，用来确认二进制来自已知源码"""
+    h = hashlib.sha256()
+    for path in source_files(run_dir):
+        h.update(os.path.relpath(path, run_dir).encode('utf-8'))
+        h.update(b'\0')
+        h.update(hash_file(path).encode('ascii'))
+        h.update(b'\n')
+    return h.hexdigest()
+
+
+def has_main(path):
+    try:
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            return bool(MAIN_RE.search(f.read()))
+    except OSError:
+        return False
+
+
+def discover_entry(run_dir):
+    """发现构建入口：build.zig优先，否则挑一个带main的.zig文件
+
+    挑选顺序：stats.json里的metadata.build_entry > 与目录中现成二进制同名的源码 >
+    main.zig > 最大的候选文件。test_*.zig不作为入口。
+    非Zig任务的入口就是build.entry（默认提交目录本身），交给recipe处理。
+    """
+    if TOOLCHAIN != 'zig':
+        return {'kind': 'recipe', 'entry': BUILD_SPEC.get('entry', '.')}
+    if os.path.exists(os.path.join(run_dir, 'build.zig')):
+        return {'kind': 'build.zig', 'entry': 'build.zig'}
+
+    stats_file = os.path.join(run_dir, 'stats.json')
+    if os.path.exists(stats_file):
+        with open(stats_file, 'r', encoding='utf-8') as f:
+            entry = json.load(f).get('metadata', {}).get('build_entry')
+        if entry:
+            return {'kind': 'build-exe', 'entry': entry}
+
+    candidates = []
+    for path in source_files(run_dir):
+        name = os.path.basename(path)
+        if name.startswith('test') or not has_main(path):
+            continue
+        candidates.append(os.path.relpath(path, run_dir))
+    if not candidates:
+        return None
+
+    def rank(rel):
+        stem = os.path.splitext(os.path.basename(rel))[0]
+        existing_binary = os.path.isfile(os.path.join(run_dir, stem))
+        return (not existing_binary, stem != 'main',
+                -os.path.getsize(os.path.join(run_dir, rel)), rel)
+
+    return {'kind': 'build-exe', 'entry': sorted(candidates, key=rank)[0]}
+
+
+def build_command(zig, run_dir, entry, mode, out_dir):
+    """生成构建命令和最终二进制路径（None表示构建后到bin/里找）"""
+    if entry['kind'] == 'recipe':
+        fields = {'out_dir': out_dir, 'bin_dir': os.path.join(out_dir, 'bin'), 'mode': mode, 'entry': entry['entry']}
+        return [part.format(**fields) for part in BUILD_SPEC['recipe']], None
+    local_cache = os.path.join(out_dir, '.zig-cache')
+    if entry['kind'] == 'build.zig':
+        cmd = [zig, 'build', f'-Doptimize={mode}', '--prefix', out_dir,
+               '--cache-dir', local_cache, '--global-cache-dir', str(GLOBAL_CACHE_DIR)]
+        return cmd, None
+    stem = os.path.splitext(os.path.basename(entry['entry']))[0]
+    binary = os.path.join(out_dir, 'bin', stem)
+    cmd = [zig, 'build-exe', entry['entry'], '-O', mode, f'-femit-bin={binary}',
+           '--cache-dir', local_cache, '--global-cache-dir', str(GLOBAL_CACHE_DIR)]
+    return cmd, binary
+
+
+def find_binary(out_dir):
+    """zig build（或recipe）安装到<prefix>/bin的可执行文件，取最大的一个"""
+    bin_dir = os.path.join(out_dir, 'bin')
+    if not os.path.isdir(bin_dir):
+        return None
+    files = [os.path.join(bin_dir, f) for f in os.listdir(bin_dir)]
+    files = [f for f in files if os.path.isfile(f) and os.access(f, os.X_OK)]
+    return max(files, key=os.path.getsize) if files else None
+
+
+def build_one(zig, run_dir, entry, mode):
+    """构建单个提交的一个优化模式（在工作进程中运行）
+
+    任何失败（超时、工具链或recipe命令不存在、输出目录无法清理）都只记在这个目标的
+    结果里，不能让异常逃出工作进程中断整个进程池。
+    """
+    test_dir = os.path.basename(run_dir)
+    out_dir = str(BUILD_DIR / test_dir / mode)
+    result = {'project': PROJECT, 'test_dir': test_dir, 'mode': mode, 'kind': entry['kind'],
+              'entry': entry['entry'], 'ok': False}
+    start = time.perf_counter()
+    try:
+        if os.path.exists(out_dir):
+            shutil.rmtree(out_dir)
+        os.makedirs(os.path.join(out_dir, 'bin'))
+        cmd, binary = build_command(zig, run_dir, entry, mode, out_dir)
+        proc = subprocess.run(cmd, cwd=run_dir, capture_output=True, text=True,
+                              timeout=BUILD_TIMEOUT)
+        result['seconds'] = round(time.perf_counter() - start, 3)
+        binary = binary or find_binary(out_dir)
+        if proc.returncode == 0 and binary and os.path.isfile(binary):
+            result['ok'] = True
+            result['binary'] = os.path.relpath(binary, PROJECT_ROOT)
+            result['size_bytes'] = os.path.getsize(binary)
+            result['binary_sha256'] = hash_file(binary)
+        else:
+            result['error'] = (proc.stderr or proc.stdout).strip()[-2000:]
+    except subprocess.TimeoutExpired:
+        result['seconds'] = round(time.perf_counter() - start, 3)
+        result['error'] = f'build timed out after {BUILD_TIMEOUT}s'
+    except OSError as e:
+        result['seconds'] = round(time.perf_counter() - start, 3)
+        result['error'] = str(e)
+    return result
+
+
+def load_build_results():
+    """读取上一次的构建结果（按test_dir+mode索引）"""
+    if not BUILD_RESULTS_FILE.exists():
+        return {}
+    with open(BUILD_RESULTS_FILE, 'r', encoding='utf-8') as f:
+        return {(r['test_dir'], r['mode']): r for r in json.load(f)}
+
+
+def save_build_results(results):
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    ordered = sorted(results.values(), key=lambda r: (r['test_dir'], r['mode']))
+    tmp = str(BUILD_RESULTS_FILE) + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(ordered, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, BUILD_RESULTS_FILE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild every submission from source with a shared Zig toolchain')
+    parser.add_argument('--zig', help=f'path to the zig {ZIG_VERSION} binary')
+    parser.add_argument('--modes', nargs='+', default=DEFAULT_MODES,
+                        choices=ZIG_MODES if TOOLCHAIN == 'zig' else None)
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count())
+    parser.add_argument('--force', action='store_true', help='rebuild even if the source is unchanged')
+    parser.add_argument('--any-version', action='store_true', help=f'allow a zig other than {ZIG_VERSION}')
+    parser.add_argument('test_dirs', nargs='*', help='only build these test dirs')
+    args = parser.parse_args()
+
+    if TOOLCHAIN != 'zig':
+        # recipe自己负责调用工具链，版本只作为缓存键记录
+        zig, version = None, BUILD_SPEC.get('version') or TOOLCHAIN
+        print(f"[*] Toolchain: {TOOLCHAIN} recipe ({version})")
+    else:
+        zig = find_zig(args.zig)
+        if not zig:
+            print(f"[!] Zig {ZIG_VERSION} not found (use --zig, $ZIG or toolchains/zig-{ZIG_VERSION}/)")
+            sys.exit(1)
+        version = zig_version(zig)
+        if version != ZIG_VERSION and not args.any_version:
+            print(f"[!] {zig} is version {version}, expected {ZIG_VERSION}")
+            sys.exit(1)
+        print(f"[*] Toolchain: {zig} ({version})")
+    GLOBAL_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+    previous = load_build_results()
+    results = dict(previous)
+    jobs = []
+    for run_dir in iter_run_dirs(BENCH_DIR):
+        test_dir = os.path.basename(run_dir)
+        if args.test_dirs and test_dir not in args.test_dirs:
+            continue
+        entry = discover_entry(run_dir)
+        if not entry:
+            print(f"[-] No build entry: {test_dir}")
+            continue
+        digest = source_digest(run_dir)
+        for mode in args.modes:
+            prev = previous.get((test_dir, mode))
+            if (not args.force and prev and prev.get('ok') and prev.get('source_sha256') == digest
+                    and prev.get('zig_version') == version
+                    and os.path.exists(PROJECT_ROOT / prev['binary'])):
+                print(f"[=] Up to date: {test_dir} [{mode}]")
+                continue
+            jobs.append((run_dir, entry, mode, digest))
+
+    print(f"[*] Building {len(jobs)} target(s) with {args.jobs} worker(s)...")
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = {pool.submit(build_one, zig, run_dir, entry, mode): digest
+                   for run_dir, entry, mode, digest in jobs}
+        for future in as_completed(futures):
+            r = future.result()
+            r['source_sha256'] = futures[future]
+            r['zig_version'] = version
+            results[(r['test_dir'], r['mode'])] = r
+            if r['ok']:
+                print(f"[+] Built: {r['test_dir']} [{r['mode']}] {r['seconds']:.1f}s {r['size_bytes'] // 1024}KB")
+            else:
+                print(f"[!] Failed: {r['test_dir']} [{r['mode']}] {r['error'].splitlines()[-1] if r['error'] else ''}")
+
+    save_build_results(results)
+    ok = sum(1 for r in results.values() if r['ok'])
+    print(f"\n[+] {ok}/{len(results)} builds OK, wall time {time.perf_counter() - start:.1f}s")
+    print(f"[+] Build results saved: {BUILD_RESULTS_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+主机标定 - 让不同机器上测出来的扫描速度可以比较
+评分阈值（500端口≤3秒）是按某一台机器定的，换了测试节点原始耗时就不可比。
+每次实测都记录主机指纹（CPU型号、核数、内核、ulimit -n、临时端口范围），
+并在同一负载下跑一遍reference_scanner.py；结果按指纹存在 results/calibration.json。
+
+  归一化速度 normalized.speed = 提交的吞吐量 / 本机参考扫描器的吞吐量（与机器无关）
+  基准机器上的等效值 normalized.ports_per_sec / wall_s：按 基准参考吞吐量 / 本机参考吞吐量 换算
+
+基准机器的参考吞吐量取任务规格的 perf.calibration.baseline，没有配置时取最早标定的主机。
+  calibration.py            列出已标定的主机
+"""
+import os
+import sys
+import json
+import hashlib
+import platform
+import argparse
+from datetime import datetime
+
+import tasks
+import stats_io
+import workspace
+from reference_scanner import REFERENCE_VERSION
+
+CALIBRATION_FILE = workspace.results_root() / 'calibration.json'
+REFERENCE_SCANNER = workspace.SCRIPTS_DIR / 'reference_scanner.py'
+# 指纹里参与比较的字段；参考扫描器是Python写的，解释器版本也会影响速度
+FINGERPRINT_FIELDS = ('cpu_model', 'cores', 'kernel', 'machine', 'python',
+                      'nofile_soft', 'ip_local_port_range', 'reference_version')
+
+
+def cpu_model():
+    try:
+        with open('/proc/cpuinfo', 'r', encoding='utf-8', errors='ignore') as f:
+            for line in f:
+                if line.lower().startswith(('model name', 'hardware', 'cpu model')):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def host_fingerprint(limits):
+    """主机指纹；limits是perf_harness.host_limits()的结果"""
+    host = {
+        'cpu_model': cpu_model(),
+        'cores': os.cpu_count(),
+        'kernel': platform.release(),
+        'machine': platform.machine(),
+        'python': platform.python_version(),
+        'nofile_soft': limits.get('nofile_soft'),
+        'ip_local_port_range': limits.get('ip_local_port_range'),
+        'reference_version': REFERENCE_VERSION,
+        'hostname': platform.node(),
+    }
+    key = json.dumps([host[k] for k in FINGERPRINT_FIELDS], ensure_ascii=False)
+    host['id'] = hashlib.sha256(key.encode('utf-8')).hexdigest()[:12]
+    return host
+
+
+def load():
+    if not CALIBRATION_FILE.exists():
+        return {}
+    with open(CALIBRATION_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def condition(workload, profile):
+    return f"{workload}/{profile}"
+
+
+def lookup(host_id, workload, profile):
+    """本机在某个负载/profile下的标定结果，没有返回None"""
+    return ((load().get(host_id) or {}).get('references') or {}).get(condition(workload, profile))
+
+
+def record(host, workload, profile, summary):
+    """保存一次参考扫描的结果（perf_harness.summarize_runs的汇总）"""
+    data = load()
+    entry = data.setdefault(host['id'], {'host': host, 'references': {}})
+    entry['host'] = host
+    entry['references'][condition(workload, profile)] = {
+        'ports_per_sec': summary['ports_per_sec'],
+        'wall_s_median': summary['wall_s_median'],
+        'runs': summary['runs'],
+        'calibrated_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    stats_io.write_json_atomic(CALIBRATION_FILE, data)
+    return entry['references'][condition(workload, profile)]
+
+
+def baseline(workload, profile):
+    """基准机器的参考吞吐量：perf.calibration.baseline里配置的，否则最早标定的主机"""
+    configured = ((tasks.load_spec()['perf'].get('calibration') or {}).get('baseline') or {})
+    if condition(workload, profile) in configured:
+        return configured[condition(workload, profile)]
+    refs = [entry['references'][condition(workload, profile)] for entry in load().values()
+            if condition(workload, profile) in entry.get('references', {})]
+    refs = [r for r in refs if r.get('ports_per_sec')]
+    return min(refs, key=lambda r: r['calibrated_at'])['ports_per_sec'] if refs else None
+
+
+def normalize(summary, metric, reference, base):
+    """给一个profile的汇总加上normalized字段（参考吞吐量缺失或提交失败时不加）"""
+    value = summary.get(metric)
+    if not value or not reference:
+        return summary
+    normalized = {'speed': round(value / reference, 4), 'reference': reference}
+    if base:
+        factor = base / reference
+        normalized[metric] = round(value * factor, 1)
+        normalized['wall_s'] = round(summary['wall_s_median'] / factor, 4)
+    summary['normalized'] = normalized
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='List calibrated hosts and their reference scanner speed')
+    parser.parse_args()
+    data = load()
+    if not data:
+        print("[-] No calibrated hosts yet (perf_harness.py calibrates automatically)")
+        return 0
+    for host_id, entry in sorted(data.items(), key=lambda kv: min(r['calibrated_at'] for r in kv[1]['references'].values())):
+        host = entry['host']
+        print(f"[+] {host_id} {host.get('hostname', '')}: {host['cpu_model']}, {host['cores']} cores, "
+              f"kernel {host['kernel']}, nofile {host['nofile_soft']}, ports {host['ip_local_port_range']}")
+        for name, ref in sorted(entry['references'].items()):
+            print(f"    {name:24s} {ref['ports_per_sec']:10,.0f} ports/s  ({ref['calibrated_at']})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,10 +5,18 @@ Simple Stats.json Loader and Reporter
 """
 import os
 import json
+import argparse
 from collections import defaultdict
 
-BENCH_DIR = "/home/winger/code/zig/ai-pk/benchmarks/zigscan"
-RESULTS_DIR = "/home/winger/code/zig/ai-pk/results"
+import tasks
+import ranking
+import registry
+import workspace
+import trends
+import profiling
+import regressions
+
+RESULTS_DIR = str(workspace.results_dir())
 
 # 中英文翻译映射
 TRANSLATIONS = {
@@ -35,6 +43,7 @@ TRANSLATIONS = {
     '整体可用但核心功能缺陷': 'Usable but core defects',
 }
 
+@profiling.timed('translate')
 def translate_text(text):
     """简单的中英文翻译"""
     if not text:
@@ -45,25 +54,49 @@ def translate_text(text):
     return result
 
 def load_all_stats():
-    """加载所有stats.json并按质量分数排序"""
+    """加载所有stats.json并按质量分数排序（分片模式只加载当前项目）"""
     results = []
-    for item in sorted(os.listdir(BENCH_DIR)):
-        stats_file = os.path.join(BENCH_DIR, item, 'stats.json')
-        if os.path.exists(stats_file):
-            try:
-                with open(stats_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    results.append(data)
-                    print(f"[+] Loaded: {item}")
-            except Exception as e:
-                print(f"[!] Error loading {item}: {e}")
+    for project in workspace.active_projects():
+        bench_dir = workspace.bench_dir(project)
+        for item in sorted(os.listdir(bench_dir)):
+            stats_file = os.path.join(bench_dir, item, 'stats.json')
+            if os.path.exists(stats_file):
+                try:
+                    with open(stats_file, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                        data.setdefault('project', project)
+                        results.append(data)
+                        print(f"[+] Loaded: {project}/{item}")
+                except Exception as e:
+                    print(f"[!] Error loading {project}/{item}: {e}")
     
-    # 按质量分数降序排序，同分数时SUCCESS优先
-    status_priority = {'SUCCESS': 0, 'PARTIAL': 1, 'FAILED': 2, 'UNCLEAR': 3}
-    results.sort(key=lambda x: (
-        -x.get('quality_score', 0),  # 分数降序
-        status_priority.get(x.get('completed', 'UNCLEAR'), 4)  # 同分数时SUCCESS优先
-    ))
+    # 导入时统一解析engine/client/档位，后续按整数ID聚合
+    registry.annotate(results)
+
+    # 按质量分数降序排序，同分数时SUCCESS优先，再比时间和tokens
+    results.sort(key=ranking.lexicographic_key)
+    return results
+
+def combine_project_data():
+    """合并各项目分片的benchmark_data.json，不重新读取stats.json
+
+    各分片进程各自分配engine/client的整数ID，同一个ID在不同分片里可能是不同的名称，
+    所以丢掉分片里的canonical字段，合并后在本进程里统一重新解析一次。
+    """
+    results = []
+    for project in workspace.list_projects():
+        json_file = workspace.results_dir(project) / "benchmark_data.json"
+        if not json_file.exists():
+            print(f"[!] Missing shard output: {json_file}")
+            continue
+        with open(json_file, 'r', encoding='utf-8') as f:
+            shard = json.load(f)
+        for r in shard:
+            r.pop('canonical', None)
+        results.extend(shard)
+        print(f"[+] Merged: {project}")
+    registry.annotate(results)
+    results.sort(key=ranking.lexicographic_key)
     return results
 
 def generate_report(results, lang='en'):
@@ -119,20 +152,30 @@ Total Tests: {total}
         engine_client = f"{engine} + {client}"
         report += f"{i:2d}. [{score:2d}/10] {bar} {engine_client}\n"
         report += f"    Status: {status:8s}  Time: {time_str:10s}  Tokens: {token_str:10s}\n"
+        startup = (r.get('perf') or {}).get('startup_ms')
+        if startup is not None:
+            report += f"    Startup: {startup:.2f}ms (1 port, exec to exit)\n"
+        speed = trends.normalized_speed(r)
+        if speed is not None:
+            unit = tasks.load_spec(r.get('project'))['perf']['unit']
+            report += f"    Speed: x{speed:.2f} reference scanner ({trends.measured_throughput(r):,.0f} {unit} on its host)\n"
         report += f"    Notes: {notes}\n\n"
     
     report += "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
+
+    # 同一组合的新测试和历史测试比较
+    report += regressions.report_lines(results, lang)
+    report += "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
     
     return report
 
-def main():
-    print("[*] Loading all stats.json files...")
-    results = load_all_stats()
-    print(f"[+] Loaded {len(results)} tests\n")
-    
+def save_reports(results, verbose=True):
+    """生成并保存中英文文本报告"""
+    os.makedirs(RESULTS_DIR, exist_ok=True)
     # 生成英文报告（默认）
     report_en = generate_report(results, lang='en')
-    print(report_en)
+    if verbose:
+        print(report_en)
     
     # 生成中文报告
     report_zh = generate_report(results, lang='zh')
@@ -148,12 +191,68 @@ def main():
     with open(report_file_zh, 'w', encoding='utf-8') as f:
         f.write(report_zh)
     print(f"[+] Chinese report saved: {report_file_zh}")
-    
-    # 保存JSON数据
+
+def save_data(results):
+    """保存JSON数据、注册表索引，并更新排名"""
+    os.makedirs(RESULTS_DIR, exist_ok=True)
     json_file = os.path.join(RESULTS_DIR, "benchmark_data.json")
     with open(json_file, 'w', encoding='utf-8') as f:
         json.dump(results, f, indent=2, ensure_ascii=False)
     print(f"[+] JSON data saved: {json_file}")
 
+    index_file = registry.save_index()
+    print(f"[+] Registry index saved: {index_file}")
+
+    # 只追加新出现或有变化的记录，历史趋势不重算
+    print(f"[+] Trend points appended: {trends.update(results)}")
+
+    # 更新Elo评分和多种排名
+    with profiling.stage('rankings'):
+        return ranking.write_rankings(results)
+
+def save_outputs(results, verbose=True):
+    """写出文本报告、JSON数据、注册表索引和排名（录入服务增量更新时也复用）"""
+    save_reports(results, verbose)
+    return save_data(results)
+
+def main():
+    parser = argparse.ArgumentParser(description='Load stats.json files and generate text reports')
+    parser.add_argument('--stage', choices=['all', 'ingest', 'combine', 'report'], default='all',
+                        help='ingest: only write JSON/rankings; combine: merge per-project JSON; '
+                             'report: only rebuild text reports from JSON')
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    profiling.setup(args, 'cyberpunk_analyzer')
+    try:
+        run(args.stage)
+    finally:
+        profiling.finish()
+
+def run(stage):
+    if stage == 'report':
+        with profiling.stage('load_json'):
+            with open(os.path.join(RESULTS_DIR, "benchmark_data.json"), 'r', encoding='utf-8') as f:
+                results = json.load(f)
+        with profiling.stage('reports'):
+            save_reports(results, verbose=False)
+        return
+
+    if stage == 'combine':
+        with profiling.stage('combine'):
+            results = combine_project_data()
+        with profiling.stage('save_data'):
+            save_data(results)
+        return
+
+    print("[*] Loading all stats.json files...")
+    with profiling.stage('load_stats'):
+        results = load_all_stats()
+    print(f"[+] Loaded {len(results)} tests\n")
+    if stage != 'ingest':
+        with profiling.stage('reports'):
+            save_reports(results)
+    with profiling.stage('save_data'):
+        save_data(results)
+
 if __name__ == "__main__":
     main()
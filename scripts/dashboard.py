@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+实时面板 - 在终端里显示测试工具和流水线的进度
+订阅events.py的事件流（UDP，本机），显示每个提交的进度条、最近的扫描吞吐量、
+实时排行榜、流水线阶段状态和最近的错误。面板是单独的进程，只被动接收事件，
+不会拖慢正在测量的扫描。--replay 回放 AI_PK_EVENTS_LOG 记录的JSONL文件。
+"""
+import sys
+import json
+import time
+import curses
+import select
+import argparse
+from collections import OrderedDict, deque
+
+import events
+
+REFRESH = 0.25
+THROUGHPUT_WINDOW = 10.0    # 滚动吞吐量的时间窗口（秒）
+BAR_WIDTH = 24
+RUN_EVENTS = ('run_queued', 'run_started', 'scan', 'run_finished', 'run_skipped')
+
+
+class State:
+    """由事件累积出来的面板状态"""
+
+    def __init__(self):
+        self.runs = OrderedDict()
+        self.stages = OrderedDict()
+        self.scans = deque()
+        self.errors = deque(maxlen=5)
+        self.info = {}
+        self.calibration = None
+        self.events = 0
+        self.last_ts = None
+
+    def run(self, test_dir):
+        """测试目录对应的进度；没有test_dir的事件不属于任何提交，返回None"""
+        if not test_dir:
+            return None
+        if test_dir not in self.runs:
+            self.runs[test_dir] = {'status': 'queued', 'planned': None, 'done': 0,
+                                   'profile': None, 'best': {}, 'failures': 0}
+        return self.runs[test_dir]
+
+    def apply(self, e):
+        self.events += 1
+        self.last_ts = e.get('ts', time.time())
+        kind = e.get('kind')
+        if kind == 'harness_started':
+            self.info = {k: e.get(k) for k in ('workload', 'profiles', 'repeat', 'mode')}
+        elif kind == 'calibration_scan':
+            # 参考扫描器的标定扫描不是提交，只在标题下面显示进度
+            self.calibration = {'profile': e.get('profile'), 'done': (self.calibration or {}).get('done', 0) + 1,
+                                'ports_per_sec': e.get('ports_per_sec')}
+        elif kind in RUN_EVENTS and self.run(e.get('test_dir')) is None:
+            return
+        elif kind == 'run_queued':
+            self.run(e['test_dir'])['planned'] = e.get('planned')
+        elif kind == 'run_started':
+            self.run(e['test_dir'])['status'] = 'running'
+        elif kind == 'scan':
+            r = self.run(e['test_dir'])
+            r['done'] += 1
+            r['profile'] = e.get('profile')
+            if e.get('status') != 'ok':
+                r['failures'] += 1
+            elif e.get('ports_per_sec') and e.get('recall') != 0:
+                # 和perf_harness一样，一个开放端口都没找到的扫描不算速度
+                best = r['best'].get(e['profile'])
+                if best is None or e['ports_per_sec'] > best['ports_per_sec']:
+                    r['best'][e['profile']] = {'ports_per_sec': e['ports_per_sec'], 'recall': e.get('recall'),
+                                               'normalized_speed': e.get('normalized_speed')}
+                self.scans.append((self.last_ts, e.get('work', 0), e.get('wall_s', 0)))
+        elif kind == 'run_finished':
+            self.run(e['test_dir'])['status'] = 'done'
+        elif kind == 'run_skipped':
+            r = self.run(e['test_dir'])
+            r['status'] = 'skipped'
+            self.errors.append(f"{e['test_dir']}: {e.get('reason', 'skipped')}")
+        elif kind == 'error':
+            if e.get('test_dir'):
+                self.run(e['test_dir'])['failures'] += 1
+            self.errors.append(f"{e.get('test_dir') or e.get('source', '')}: {e.get('message', '')}")
+        elif kind == 'stage_started':
+            self.stages[e['stage']] = {'status': 'running', 'seconds': None}
+        elif kind in ('stage_finished', 'stage_skipped'):
+            self.stages[e['stage']] = {'status': e.get('status', 'skipped'), 'seconds': e.get('seconds')}
+            if e.get('status') == 'failed':
+                self.errors.append(f"stage {e['stage']} failed")
+        elif kind == 'pipeline_started':
+            self.stages = OrderedDict((name, {'status': 'pending', 'seconds': None})
+                                      for name in e.get('stages', []))
+
+    def throughput(self, now=None):
+        """最近THROUGHPUT_WINDOW秒内完成的扫描：总端口数 / 总扫描耗时"""
+        now = now or self.last_ts or time.time()
+        while self.scans and self.scans[0][0] < now - THROUGHPUT_WINDOW:
+            self.scans.popleft()
+        work = sum(s[1] for s in self.scans)
+        wall = sum(s[2] for s in self.scans)
+        return work / wall if wall > 0 else None
+
+    def leaderboard(self):
+        """按loopback（没有就按任意profile）的最好成绩排序：有本机标定时按相对参考扫描器的
+        归一化速度排（换了机器也可比），没有标定的排在后面按原始吞吐量排"""
+        rows = []
+        for test_dir, r in self.runs.items():
+            if not r['best']:
+                continue
+            profile = 'loopback' if 'loopback' in r['best'] else sorted(r['best'])[0]
+            best = r['best'][profile]
+            rows.append((best['ports_per_sec'], test_dir, profile, best['recall'], best['normalized_speed']))
+        return sorted(rows, key=lambda row: (row[4] is not None, row[4] or 0, row[0]), reverse=True)
+
+
+def bar(done, planned, width=BAR_WIDTH):
+    if not planned:
+        return '[' + ('·' * width) + ']'
+    filled = min(width, int(width * done / planned))
+    return '[' + '█' * filled + '░' * (width - filled) + ']'
+
+
+def render_lines(state, width=100):
+    """面板内容（curses和--plain共用）"""
+    lines = []
+    info = state.info
+    pps = state.throughput()
+    title = 'AI-PK LIVE'
+    if info.get('workload'):
+        title += f" - workload {info['workload']}, profiles {', '.join(info.get('profiles') or [])}"
+    lines.append(title[:width])
+    lines.append(f"events {state.events}   rolling throughput "
+                 + (f"{pps:,.0f} ports/s" if pps else '-'))
+    if state.calibration:
+        cal = state.calibration
+        lines.append(f"calibration {cal['profile'] or ''}: {cal['done']} reference scan(s)"
+                     + (f", last {cal['ports_per_sec']:,.0f} ports/s" if cal['ports_per_sec'] else ''))
+    lines.append('')
+
+    if state.runs:
+        lines.append('SUBMISSIONS')
+        for test_dir, r in state.runs.items():
+            progress = f"{r['done']}/{r['planned']}" if r['planned'] else str(r['done'])
+            extra = f"  {r['failures']} failed" if r['failures'] else ''
+            lines.append(f"  {test_dir[:30]:30s} {bar(r['done'], r['planned'])} {progress:>7s} "
+                         f"{r['status']:8s} {r['profile'] or '':13s}{extra}"[:width])
+        lines.append('')
+
+    board = state.leaderboard()
+    if board:
+        lines.append('LEADERBOARD (best speed vs reference scanner, ports/s)')
+        for i, (value, test_dir, profile, recall, speed) in enumerate(board[:10], 1):
+            rec = f"recall {recall * 100:5.1f}%" if recall is not None else ''
+            norm = f"x{speed:.2f}" if speed is not None else '-'
+            lines.append(f"  {i:2d}. {test_dir[:30]:30s} {norm:>7s} {value:12,.0f}  {profile:13s} {rec}"[:width])
+        lines.append('')
+
+    if state.stages:
+        lines.append('PIPELINE')
+        cells = []
+        for name, s in state.stages.items():
+            seconds = f" {s['seconds']:.1f}s" if s.get('seconds') else ''
+            cells.append(f"{name}: {s['status']}{seconds}")
+        row = '  '
+        for cell in cells:
+            if len(row) + len(cell) + 3 > width:
+                lines.append(row)
+                row = '  '
+            row += cell + '   '
+        lines.append(row)
+        lines.append('')
+
+    if state.errors:
+        lines.append('ERRORS')
+        lines += [f"  {e}"[:width] for e in state.errors]
+    return lines
+
+
+def draw(screen, state):
+    screen.erase()
+    height, width = screen.getmaxyx()
+    for i, line in enumerate(render_lines(state, width - 1)[:height - 1]):
+        attr = curses.A_BOLD if line and not line.startswith(' ') else curses.A_NORMAL
+        try:
+            screen.addstr(i, 0, line, attr)
+        except curses.error:
+            pass
+    screen.refresh()
+
+
+def iter_replay(path, speed):
+    """按记录时的间隔（除以speed）回放JSONL事件"""
+    previous = None
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            if previous is not None and speed > 0:
+                time.sleep(max(0.0, min(event.get('ts', previous) - previous, 5.0)) / speed)
+            previous = event.get('ts', previous)
+            yield event
+
+
+def live(screen, sock, replay):
+    curses.curs_set(0)
+    screen.nodelay(True)
+    state = State()
+    while True:
+        if replay is not None:
+            event = next(replay, None)
+            if event is not None:
+                state.apply(event)
+        else:
+            select.select([sock], [], [], REFRESH)
+            for event in events.receive(sock):
+                state.apply(event)
+        draw(screen, state)
+        key = screen.getch()
+        if key in (ord('q'), ord('Q')):
+            return
+        if replay is not None and event is None:
+            time.sleep(REFRESH)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Live terminal dashboard for the perf harness and pipeline')
+    parser.add_argument('--replay', metavar='JSONL', help='replay an AI_PK_EVENTS_LOG file instead of listening')
+    parser.add_argument('--speed', type=float, default=1.0, help='replay speed factor (0 = as fast as possible)')
+    parser.add_argument('--plain', action='store_true',
+                        help='print one text snapshot (after the replay, or after --seconds of listening)')
+    parser.add_argument('--seconds', type=float, default=5.0, help='with --plain: how long to listen')
+    args = parser.parse_args()
+
+    sock = None if args.replay else events.subscribe()
+    replay = iter_replay(args.replay, args.speed) if args.replay else None
+
+    if args.plain:
+        state = State()
+        if replay is not None:
+            for event in replay:
+                state.apply(event)
+        else:
+            deadline = time.time() + args.seconds
+            while time.time() < deadline:
+                select.select([sock], [], [], max(0.0, deadline - time.time()))
+                for event in events.receive(sock):
+                    state.apply(event)
+        print('\n'.join(render_lines(state)))
+        return 0
+
+    try:
+        curses.wrapper(live, sock, replay)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
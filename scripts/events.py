@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+事件流 - 测试工具和流水线的进度事件，供实时面板（dashboard.py）订阅
+每个事件是一行JSON，用UDP发到本机端口（默认127.0.0.1:47800），发送不阻塞、
+没人监听也不报错，所以不会拖慢被测量的扫描；设置 AI_PK_EVENTS_LOG 时同时追加到JSONL文件，
+面板可以用 --replay 回放。
+
+  AI_PK_EVENTS      事件地址 host:port，设为 off 关闭
+  AI_PK_EVENTS_LOG  同时写入的JSONL文件
+"""
+import os
+import json
+import time
+import socket
+
+DEFAULT_ADDRESS = ('127.0.0.1', 47800)
+MAX_DATAGRAM = 8192
+
+_socket = None
+_address = None
+
+
+def address():
+    """事件地址，关闭时返回None"""
+    value = os.environ.get('AI_PK_EVENTS')
+    if not value:
+        return DEFAULT_ADDRESS
+    if value.lower() in ('off', '0', 'none'):
+        return None
+    host, _, port = value.rpartition(':')
+    return (host or DEFAULT_ADDRESS[0], int(port))
+
+
+def emit(kind, **fields):
+    """发出一个事件；任何错误都吞掉，事件只是观测用的"""
+    global _socket, _address
+    event = {'ts': round(time.time(), 3), 'pid': os.getpid(), 'kind': kind}
+    event.update(fields)
+    line = json.dumps(event, ensure_ascii=False, default=str)
+    try:
+        if _socket is None:
+            _address = address()
+            if _address is not None:
+                _socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                _socket.setblocking(False)
+        if _socket is not None:
+            data = line.encode('utf-8')
+            if len(data) <= MAX_DATAGRAM:
+                _socket.sendto(data, _address)
+    except OSError:
+        pass
+    log = os.environ.get('AI_PK_EVENTS_LOG')
+    if log:
+        try:
+            with open(log, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+        except OSError:
+            pass
+
+
+def subscribe(addr=None):
+    """面板一侧：绑定事件端口，返回非阻塞的UDP socket"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(addr or address() or DEFAULT_ADDRESS)
+    sock.setblocking(False)
+    return sock
+
+
+def receive(sock):
+    """取出当前已到达的所有事件"""
+    events = []
+    while True:
+        try:
+            data = sock.recv(MAX_DATAGRAM)
+        except (BlockingIOError, InterruptedError):
+            return events
+        try:
+            events.append(json.loads(data.decode('utf-8')))
+        except ValueError:
+            continue
+
+
+def main():
+    """把事件打印到终端（调试用）"""
+    import select
+    sock = subscribe()
+    print(f"[*] Listening for events on {sock.getsockname()[0]}:{sock.getsockname()[1]}")
+    try:
+        while True:
+            select.select([sock], [], [])
+            for event in receive(sock):
+                print(json.dumps(event, ensure_ascii=False))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
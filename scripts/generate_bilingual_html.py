@@ -5,9 +5,15 @@
 """
 import json
 import base64
-from pathlib import Path
+import argparse
 from datetime import datetime
 
+import workspace
+import profiling
+import regressions
+
+RESULTS_DIR = workspace.results_dir()
+
 # 翻译映射
 TRANSLATIONS = {
     '成功': 'Success',
@@ -30,6 +36,7 @@ TRANSLATIONS = {
     'token不多': 'Low token usage',
 }
 
+@profiling.timed('translate')
 def translate(text):
     if not text:
         return text
@@ -39,9 +46,10 @@ def translate(text):
     return result
 
 def load_data():
-    with open('/home/winger/code/zig/ai-pk/results/benchmark_data.json', 'r') as f:
+    with open(RESULTS_DIR / 'benchmark_data.json', 'r', encoding='utf-8') as f:
         return json.load(f)
 
+@profiling.timed('base64_charts')
 def image_to_base64(path):
     try:
         with open(path, 'rb') as f:
@@ -59,7 +67,7 @@ def generate_html(data, lang='en'):
     failed = sum(1 for r in data if r.get('completed', '').upper() == 'FAILED')
     
     # 嵌入图表
-    charts_dir = Path('/home/winger/code/zig/ai-pk/results/charts')
+    charts_dir = RESULTS_DIR / 'charts'
     charts = {}
     for chart_file in charts_dir.glob('*.png'):
         b64 = image_to_base64(chart_file)
@@ -89,7 +97,7 @@ def generate_html(data, lang='en'):
         footer_text = "Generated"
     
     # 嵌入图表
-    charts_dir = Path('/home/winger/code/zig/ai-pk/results/charts')
+    charts_dir = RESULTS_DIR / 'charts'
     charts = {}
     for chart in charts_dir.glob('*.png'):
         charts[chart.stem] = image_to_base64(chart)
@@ -311,6 +319,8 @@ tr:hover {{
     html += f'''</tbody>
 </table>
 
+{regressions.html_block(data, lang)}
+
 <h2>📊 {'可视化分析' if lang == 'zh' else 'Visual Analysis'}</h2>
 <div style="margin: 20px 0;">
 '''
@@ -320,7 +330,8 @@ tr:hover {{
         '01_success_rate': ('成功率分布', 'Success Rate Distribution'),
         '03_token_efficiency': ('Token效率分析', 'Token Efficiency Analysis'),
         '04_engine_comparison': ('引擎对比', 'Engine Comparison'),
-        '05_quality_heatmap': ('质量热力图', 'Quality Heatmap')
+        '05_quality_heatmap': ('质量热力图', 'Quality Heatmap'),
+        '06_trends': ('历史趋势', 'Trends Over Time')
     }
     
     for chart_name in sorted(charts.keys()):
@@ -380,22 +391,38 @@ function sortTable(col) {{
     return html
 
 def main():
+    parser = argparse.ArgumentParser(description='Generate English and Chinese HTML reports')
+    parser.add_argument('--lang', choices=['en', 'zh', 'all'], default='all')
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    profiling.setup(args, 'generate_bilingual_html')
+    try:
+        generate(args.lang)
+    finally:
+        profiling.finish()
+
+def generate(lang):
     print("📊 Generating bilingual HTML reports...")
-    data = load_data()
+    with profiling.stage('load_json'):
+        data = load_data()
     
     # 生成英文版
-    html_en = generate_html(data, lang='en')
-    with open('/home/winger/code/zig/ai-pk/results/REPORT_EN.html', 'w', encoding='utf-8') as f:
-        f.write(html_en)
-    print("✅ English report: REPORT_EN.html")
+    if lang in ('en', 'all'):
+        with profiling.stage('render_en'):
+            html_en = generate_html(data, lang='en')
+        with open(RESULTS_DIR / 'REPORT_EN.html', 'w', encoding='utf-8') as f:
+            f.write(html_en)
+        print("✅ English report: REPORT_EN.html")
     
     # 生成中文版
-    html_zh = generate_html(data, lang='zh')
-    with open('/home/winger/code/zig/ai-pk/results/REPORT_ZH.html', 'w', encoding='utf-8') as f:
-        f.write(html_zh)
-    print("✅ Chinese report: REPORT_ZH.html")
+    if lang in ('zh', 'all'):
+        with profiling.stage('render_zh'):
+            html_zh = generate_html(data, lang='zh')
+        with open(RESULTS_DIR / 'REPORT_ZH.html', 'w', encoding='utf-8') as f:
+            f.write(html_zh)
+        print("✅ Chinese report: REPORT_ZH.html")
     
-    print("\n🎉 Both reports generated successfully!")
+    print("\n🎉 Reports generated successfully!")
     print("   • English: xdg-open results/REPORT_EN.html")
     print("   • Chinese: xdg-open results/REPORT_ZH.html")
 
@@ -5,6 +5,7 @@
 """
 
 import json
+import argparse
 import matplotlib
 matplotlib.use('Agg')  # 无GUI后端
 import matplotlib.pyplot as plt
@@ -12,6 +13,12 @@ import numpy as np
 from pathlib import Path
 from collections import defaultdict
 
+import registry
+import workspace
+import profiling
+
+RESULTS_DIR = workspace.results_dir()
+
 # 赛博朋克配色方案
 CYBER_COLORS = {
     'bg': '#0a0e27',
@@ -39,7 +46,7 @@ def setup_cyber_style():
 
 def load_data():
     """加载JSON数据"""
-    with open('/home/winger/code/zig/ai-pk/results/benchmark_data.json', 'r') as f:
+    with open(RESULTS_DIR / 'benchmark_data.json', 'r', encoding='utf-8') as f:
         return json.load(f)
 
 def chart_1_success_rate_pie(data, output_dir):
@@ -187,9 +194,10 @@ def chart_4_engine_comparison(data, output_dir):
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 6))
     
     # 统计每个引擎
+    # 按规范化引擎ID聚合，同一引擎的不同写法/档位归到一起
     engines = defaultdict(lambda: {'total': 0, 'success': 0, 'times': []})
     for d in data:
-        engine = d['engine']
+        engine = registry.canonical(d)['engine']
         engines[engine]['total'] += 1
         status = d.get('completed', '').upper()
         if status in ['SUCCESS', '✅']:
@@ -256,20 +264,24 @@ def chart_5_quality_heatmap(data, output_dir):
     setup_cyber_style()
     fig, ax = plt.subplots(figsize=(14, 10))
     
-    # 构建矩阵
-    matrix_data = defaultdict(lambda: defaultdict(list))
-    for d in data:
-        matrix_data[d['engine']][d['client']].append(d['quality_score'])
-    
-    # 转换为矩阵
-    engines = sorted(matrix_data.keys())
-    clients = sorted(set(c for e in matrix_data.values() for c in e.keys()))
-    
-    matrix = np.zeros((len(engines), len(clients)))
-    for i, engine in enumerate(engines):
-        for j, client in enumerate(clients):
-            scores = matrix_data[engine].get(client, [])
-            matrix[i][j] = np.mean(scores) if scores else 0
+    # 按导入时解析好的整数ID构建矩阵，避免同一引擎/客户端的不同写法拆成多行
+    canon = [registry.canonical(d) for d in data]
+    engine_names = {c['engine_id']: c['engine'] for c in canon}
+    client_names = {c['client_id']: c['client'] for c in canon}
+    engine_ids = sorted(engine_names, key=lambda i: engine_names[i])
+    client_ids = sorted(client_names, key=lambda i: client_names[i])
+    row = {e: i for i, e in enumerate(engine_ids)}
+    col = {c: j for j, c in enumerate(client_ids)}
+    
+    sums = np.zeros((len(engine_ids), len(client_ids)))
+    counts = np.zeros_like(sums)
+    for d, c in zip(data, canon):
+        i, j = row[c['engine_id']], col[c['client_id']]
+        sums[i, j] += d['quality_score']
+        counts[i, j] += 1
+    matrix = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+    engines = [engine_names[e] for e in engine_ids]
+    clients = [client_names[c] for c in client_ids]
     
     im = ax.imshow(matrix, cmap='plasma', aspect='auto', vmin=0, vmax=10)
     
@@ -305,6 +317,16 @@ def chart_5_quality_heatmap(data, output_dir):
     plt.close()
 
 def main():
+    parser = argparse.ArgumentParser(description='Generate cyberpunk-style benchmark charts')
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    profiling.setup(args, 'generate_charts')
+    try:
+        generate_all()
+    finally:
+        profiling.finish()
+
+def generate_all():
     print("""
 ╔═══════════════════════════════════════════════════╗
 ║     CYBERPUNK CHART GENERATOR                    ║
@@ -312,19 +334,21 @@ def main():
 ╚═══════════════════════════════════════════════════╝
 """)
     
-    output_dir = '/home/winger/code/zig/ai-pk/results/charts'
+    output_dir = str(RESULTS_DIR / 'charts')
     Path(output_dir).mkdir(parents=True, exist_ok=True)
     
     print("[*] Loading benchmark data...")
-    data = load_data()
+    with profiling.stage('load_json'):
+        data = load_data()
     print(f"[+] Loaded {len(data)} test results")
     
     print("\n[*] Generating charts...")
-    chart_1_success_rate_pie(data, output_dir)
-    chart_2_time_comparison(data, output_dir)
-    chart_3_token_efficiency(data, output_dir)
-    chart_4_engine_comparison(data, output_dir)
-    chart_5_quality_heatmap(data, output_dir)
+    charts = [chart_1_success_rate_pie, chart_2_time_comparison, chart_3_token_efficiency,
+              chart_4_engine_comparison, chart_5_quality_heatmap]
+    for chart in charts:
+        # 每张图单独计时，dpi=300的savefig通常是大头
+        with profiling.stage(chart.__name__):
+            chart(data, output_dir)
     
     print(f"\n[+] All charts generated in: {output_dir}/")
     print("[+] Chart generation complete!")
@@ -2,16 +2,23 @@
 """
 HTML报告生成器 - 赛博朋克风格
 生成交互式HTML报告，带图表和详细信息
+--site 改为生成流式静态站点（首页 + 每个测试目录的详情页），见 static_site.py
 """
 
 import json
+import argparse
 import base64
-from pathlib import Path
 from datetime import datetime
 
+import workspace
+import profiling
+import regressions
+
+RESULTS_DIR = workspace.results_dir()
+
 def load_data():
     """加载JSON数据"""
-    with open('/home/winger/code/zig/ai-pk/results/benchmark_data.json', 'r') as f:
+    with open(RESULTS_DIR / 'benchmark_data.json', 'r', encoding='utf-8') as f:
         return json.load(f)
 
 def image_to_base64(image_path):
@@ -33,11 +40,12 @@ def generate_html_report(data):
     unclear = sum(1 for r in data if r.get('completed', '').upper() in ['UNCLEAR', '❓'])
     
     # 嵌入图表
-    charts_dir = Path('/home/winger/code/zig/ai-pk/results/charts')
+    charts_dir = RESULTS_DIR / 'charts'
     charts_base64 = {}
-    for chart_file in charts_dir.glob('*.png'):
-        chart_name = chart_file.stem
-        charts_base64[chart_name] = image_to_base64(chart_file)
+    with profiling.stage('base64_charts'):
+        for chart_file in charts_dir.glob('*.png'):
+            chart_name = chart_file.stem
+            charts_base64[chart_name] = image_to_base64(chart_file)
     
     html = f'''<!DOCTYPE html>
 <html lang="zh-CN">
@@ -357,6 +365,9 @@ def generate_html_report(data):
         </section>
 '''
     
+    # 同一组合的新测试和历史测试比较
+    html += regressions.html_block(data, 'en')
+
     # Charts
     html += '''
         <section id="charts">
@@ -368,7 +379,8 @@ def generate_html_report(data):
         '02_time_comparison': '完成时间对比',
         '03_token_efficiency': 'Token效率分析',
         '04_engine_comparison': '引擎对比',
-        '05_quality_heatmap': '质量热力图'
+        '05_quality_heatmap': '质量热力图',
+        '06_trends': '历史趋势'
     }
     
     for chart_name, base64_data in charts_base64.items():
@@ -422,13 +434,36 @@ def generate_html_report(data):
     return html
 
 def main():
+    parser = argparse.ArgumentParser(description='Generate the cyberpunk HTML report')
+    parser.add_argument('--site', action='store_true',
+                        help='write a static site with per-run pages instead of one big file')
+    parser.add_argument('--force', action='store_true', help='with --site: rebuild every page')
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    profiling.setup(args, 'generate_html_report')
+    try:
+        generate(args)
+    finally:
+        profiling.finish()
+
+def generate(args):
+    if args.site:
+        import static_site
+        with profiling.stage('static_site'):
+            rebuilt, total = static_site.build_site(args.force)
+        print(f"✅ Static site generated: {static_site.SITE_DIR / 'index.html'} ({rebuilt}/{total} pages rebuilt)")
+        return
+
     print("📊 Generating HTML report...")
-    data = load_data()
-    html = generate_html_report(data)
+    with profiling.stage('load_json'):
+        data = load_data()
+    with profiling.stage('render'):
+        html = generate_html_report(data)
     
-    output_path = '/home/winger/code/zig/ai-pk/results/REPORT.html'
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(html)
+    output_path = str(RESULTS_DIR / 'REPORT.html')
+    with profiling.stage('write'):
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(html)
     
     print(f"✅ HTML report generated: {output_path}")
     print(f"   Open with: xdg-open {output_path}")
@@ -1,52 +1,359 @@
 #!/usr/bin/env python3
 """
-手工验证脚本 - 逐个读取finish.log并显示关键信息
-用于人工核对准确性
+一致性检查 - 批量交叉核对每个测试的finish.log、start/end和stats.json
+以前这里是逐个打印finish.log再等input()的人工核对，tools/UNCLEAR_LIST.txt靠手写。
+现在并行检查所有测试目录，只把真正对不上的地方排成待核对队列：
+  - finish.log里的时间/tokens 和 stats.json的time_minutes/tokens
+  - start/end（或finish.log末尾date输出）的时间差 和 time_minutes
+  - quality_breakdown.calculation 的算式、加减分上限、基础分 和 final_score/quality_score
+    （基础分、上限和性能加分阈值来自任务规格 tasks.py）
+  - finish.log里的状态关键词 和 completed
+每条发现有严重程度，按测试汇总打分排序，结果写入 results/consistency.json，
+--list-file 可以把队列写成以前UNCLEAR_LIST.txt那样的文本，--show 打印某个测试的finish.log。
 """
-
 import os
-from pathlib import Path
+import re
+import sys
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+import tasks
+import workspace
+import stats_io
+from blob_store import iter_run_dirs
+
+BENCH_PATH = str(workspace.bench_dir())
+RESULTS_DIR = workspace.results_dir()
+REPORT_FILE = RESULTS_DIR / 'consistency.json'
+
+SEVERITY = {'high': 3, 'medium': 2, 'low': 1}
+SCORING = tasks.load_spec()['scoring']
+BASE_SCORES = SCORING['base']
+BONUS_CAP = SCORING['bonus_cap']
+PENALTY_CAP = SCORING['penalty_cap']
+
+TIME_TOLERANCE = 0.15       # 时间相差超过15%（且超过TIME_SLACK分钟）才报
+TIME_SLACK = 2.0
+TOKEN_TOLERANCE = 0.1       # 3.7M这种四舍五入的写法允许10%误差
+
+# 2025年 10月 18日 星期六 22:25:28 CST
+ZH_DATE_RE = re.compile(r'(\d{4})年\s*(\d{1,2})月\s*(\d{1,2})日\s*\S*\s+(\d{1,2}):(\d{2}):(\d{2})')
+# Sat Oct 18 22:25:28 CST 2025
+EN_DATE_RE = re.compile(r'\b(?:Mon|Tue|Wed|Thu|Fri|Sat|Sun) (\w{3}) +(\d{1,2}) (\d{2}:\d{2}:\d{2}) \w+ (\d{4})')
 
-BENCH_PATH = "/home/winger/code/zig/ai-pk/benchmarks/zigscan"
+# (正则, 换算成分钟)
+TIME_PATTERNS = [
+    (re.compile(r'Total duration \(wall\):\s*(?:(\d+)h\s*)?(?:(\d+)m\s*)?(?:(\d+)s)?'),
+     lambda m: int(m[1] or 0) * 60 + int(m[2] or 0) + int(m[3] or 0) / 60),
+    (re.compile(r'耗时\s*\n?\s*(?:(\d+)h\s*)?(\d+)m\s*(?:(\d+)s)?'),
+     lambda m: int(m[1] or 0) * 60 + int(m[2]) + int(m[3] or 0) / 60),
+    (re.compile(r'用时[：:]?\s*([\d.]+)\s*分钟'), lambda m: float(m[1])),
+    (re.compile(r'Completed in ([\d.]+) minutes', re.IGNORECASE), lambda m: float(m[1])),
+    (re.compile(r'(?<![\d.])(?:(\d+)\s*小时\s*)?(\d+(?:\.\d+)?)\s*分钟'),
+     lambda m: int(m[1] or 0) * 60 + float(m[2])),
+    # time的输出：不到1分钟的通常是给扫描器计时，不是任务时间
+    (re.compile(r'real\s+([1-9]\d*)m([\d.]+)s'), lambda m: int(m[1]) + float(m[2]) / 60),
+]
 
-def read_finish_log(log_path):
-    """读取并显示finish.log关键内容"""
+UNITS = {'': 1, 'k': 1e3, 'm': 1e6, 'b': 1e9}
+# Codex每轮都打印"[时间戳] tokens used: N"，finish.log里常把最后的汇总贴在开头，按时间戳取最新的
+CODEX_TOKENS_RE = re.compile(r'\[([\d\-T:]+)\] tokens used:\s*([\d,]+)', re.IGNORECASE)
+TOKEN_PATTERNS = [
+    re.compile(r'tokens used:\s*([\d,]+)()', re.IGNORECASE),
+    re.compile(r'Factory Token Usage[^\n]*\n\s*([\d.]+)\s*([KMB]?)\s*tokens', re.IGNORECASE),
+    re.compile(r'^\s*Tokens:\s*([\d,]+)()', re.IGNORECASE | re.MULTILINE),
+    re.compile(r'^\s*([\d,]{5,})()\s*tokens', re.IGNORECASE | re.MULTILINE),
+    re.compile(r'token[^\n\d]{0,10}?([\d.]+)\s*([KMB])\b', re.IGNORECASE),
+]
+
+# 按顺序匹配：先认明确的英文状态，再认"部分"，最后才是"成功/可用"（"部分成功"里也有"成功"）
+STATUS_KEYWORDS = [
+    ('FAILED', re.compile(r'\bFAILED\b|无法完成|完全失败|^\s*失败\s*$|^\s*Failed\s*$', re.MULTILINE)),
+    ('PARTIAL', re.compile(r'\bPARTIAL\b|部分成功|部分可用|Partially working|核心功能缺陷')),
+    ('UNCLEAR', re.compile(r'\bUNCLEAR\b|^\s*不确定\s*$', re.MULTILINE)),
+    ('SUCCESS', re.compile(r'\bSUCCESS\b|^\s*成功\s*$|完全可用|完成度很高|^\s*Success\s*$', re.MULTILINE)),
+]
+
+CALC_RE = re.compile(r'^\s*([\d.]+)\s*\+\s*([\d.]+)\s*-\s*([\d.]+)\s*=\s*(-?[\d.]+)\s*$')
+MONTHS = {m: i for i, m in enumerate(['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug',
+                                      'Sep', 'Oct', 'Nov', 'Dec'], 1)}
+
+
+def read_text(path):
     try:
-        with open(log_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-        return content
-    except Exception as e:
-        return f"ERROR: {e}"
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def parse_dates(text):
+    """文本里所有date输出（中文或英文格式），按出现顺序"""
+    found = []
+    for m in ZH_DATE_RE.finditer(text or ''):
+        found.append((m.start(), datetime(*(int(g) for g in m.groups()))))
+    for m in EN_DATE_RE.finditer(text or ''):
+        month = MONTHS.get(m.group(1))
+        if month:
+            h, mi, s = (int(x) for x in m.group(3).split(':'))
+            found.append((m.start(), datetime(int(m.group(4)), month, int(m.group(2)), h, mi, s)))
+    return [dt for _, dt in sorted(found)]
+
+
+def log_minutes(text):
+    for pattern, convert in TIME_PATTERNS:
+        m = pattern.search(text)
+        if m:
+            return round(convert(m), 2), m.group(0).strip()
+    return None, None
+
+
+def log_tokens(text):
+    stamped = CODEX_TOKENS_RE.findall(text)
+    if stamped:
+        stamp, value = max(stamped)
+        return int(value.replace(',', '')), f'[{stamp}] tokens used: {value}'
+    for pattern in TOKEN_PATTERNS:
+        matches = list(pattern.finditer(text))
+        if matches:
+            m = matches[-1]
+            value = float(m.group(1).replace(',', '')) * UNITS[m.group(2).lower()]
+            return int(value), m.group(0).strip()
+    return None, None
+
+
+def log_statuses(text):
+    return [status for status, pattern in STATUS_KEYWORDS if pattern.search(text)]
+
+
+def differs(a, b, tolerance, slack=0.0):
+    return abs(a - b) > max(tolerance * max(abs(a), abs(b)), slack)
+
+
+def finding(findings, kind, severity, message, **detail):
+    findings.append({'kind': kind, 'severity': severity, 'message': message, **detail})
+
+
+def check_log(stats, log, findings):
+    minutes, source = log_minutes(log)
+    if minutes is not None and stats.get('time_minutes') is not None:
+        if differs(minutes, stats['time_minutes'], TIME_TOLERANCE, TIME_SLACK):
+            ratio = max(minutes, stats['time_minutes']) / max(min(minutes, stats['time_minutes']), 0.01)
+            finding(findings, 'time_mismatch', 'high' if ratio >= 2 else 'medium',
+                    f"finish.log says {minutes:g} min ('{source}'), stats.json time_minutes {stats['time_minutes']:g}",
+                    log=minutes, stats=stats['time_minutes'])
+    elif minutes is not None:
+        finding(findings, 'time_missing', 'medium', f"finish.log has a time ({minutes:g} min) but time_minutes is empty",
+                log=minutes)
+
+    tokens, source = log_tokens(log)
+    if tokens is not None and stats.get('tokens') is not None:
+        if differs(tokens, stats['tokens'], TOKEN_TOLERANCE):
+            ratio = max(tokens, stats['tokens']) / max(min(tokens, stats['tokens']), 1)
+            finding(findings, 'tokens_mismatch', 'high' if ratio >= 2 else 'medium',
+                    f"finish.log says {tokens:,} tokens ('{source}'), stats.json tokens {stats['tokens']:,}",
+                    log=tokens, stats=stats['tokens'])
+    elif tokens is not None:
+        finding(findings, 'tokens_missing', 'medium', f"finish.log has a token count ({tokens:,}) but tokens is empty",
+                log=tokens)
+
+    statuses = log_statuses(log)
+    completed = stats.get('completed')
+    if statuses and completed not in statuses:
+        # 日志说失败而stats说成功（或反过来）最值得看
+        opposite = {'SUCCESS', 'FAILED'} <= set(statuses + [completed])
+        finding(findings, 'status_mismatch', 'high' if opposite else 'medium',
+                f"finish.log keywords suggest {'/'.join(statuses)}, stats.json completed is {completed}",
+                log=statuses, stats=completed)
+    elif len(statuses) > 1:
+        finding(findings, 'status_ambiguous', 'low',
+                f"finish.log has keywords for {'/'.join(statuses)} (completed {completed})", log=statuses)
+    elif not statuses:
+        finding(findings, 'status_unstated', 'low', f"finish.log has no clear status keyword (completed {completed})")
+
+
+def check_timestamps(run_dir, stats, log, findings):
+    start = parse_dates(read_text(os.path.join(run_dir, 'start')))
+    end = parse_dates(read_text(os.path.join(run_dir, 'end')))
+    end_source = 'end'
+    if start and not end:
+        # finish.log末尾通常是结束时执行的date
+        end = [dt for dt in parse_dates(log) if dt >= start[0]][-1:]
+        end_source = 'finish.log'
+    if not start or not end:
+        return
+    elapsed = (end[-1] - start[0]).total_seconds() / 60
+    if elapsed < 0:
+        finding(findings, 'end_before_start', 'high',
+                f"{end_source} ({end[-1]:%Y-%m-%d %H:%M:%S}) is before start ({start[0]:%Y-%m-%d %H:%M:%S})",
+                elapsed_minutes=round(elapsed, 1))
+        return
+    minutes = stats.get('time_minutes')
+    if minutes is None:
+        # 失败的测试常常不记时间，这时只是提示
+        finding(findings, 'time_missing', 'low' if stats.get('completed') == 'FAILED' else 'medium',
+                f"start/{end_source} span {elapsed:.1f} min but time_minutes is empty",
+                elapsed_minutes=round(elapsed, 1))
+    elif differs(elapsed, minutes, TIME_TOLERANCE, TIME_SLACK):
+        ratio = max(elapsed, minutes) / max(min(elapsed, minutes), 0.01)
+        finding(findings, 'timestamp_mismatch', 'high' if ratio >= 2 else 'medium',
+                f"start/{end_source} span {elapsed:.1f} min, stats.json time_minutes {minutes:g}",
+                elapsed_minutes=round(elapsed, 1), stats=minutes)
+
+
+def check_score(stats, findings):
+    b = stats.get('quality_breakdown')
+    if not b:
+        finding(findings, 'score_missing', 'medium', 'stats.json has no quality_breakdown')
+        return
+    final = b.get('final_score')
+    if stats.get('quality_score') != final:
+        finding(findings, 'score_mismatch', 'high',
+                f"quality_score {stats.get('quality_score')} != quality_breakdown.final_score {final}")
+    bonus, penalty = b.get('bonus') or {}, b.get('penalty') or {}
+    for name, part, cap in (('bonus', bonus, BONUS_CAP), ('penalty', penalty, PENALTY_CAP)):
+        items = sum(v for k, v in part.items() if k != 'total' and isinstance(v, (int, float)))
+        total = part.get('total')
+        if total is not None and abs(abs(items) - abs(total)) > 1e-6:
+            finding(findings, 'score_items', 'medium', f"{name} items add up to {items:g}, total says {total:g}")
+        if total is not None and abs(total) > cap:
+            finding(findings, 'score_cap', 'medium', f"{name} total {total:g} exceeds the cap of {cap:g}")
+    expected_base = BASE_SCORES.get(stats.get('completed'))
+    if expected_base is not None and b.get('base_score') != expected_base:
+        finding(findings, 'score_base', 'medium',
+                f"base_score {b.get('base_score')} but {stats.get('completed')} is worth {expected_base}")
+
+    check_performance(stats, bonus, findings)
+
+    m = CALC_RE.match(b.get('calculation') or '')
+    if not m:
+        if b.get('calculation'):
+            finding(findings, 'score_calculation', 'low', f"cannot parse calculation '{b['calculation']}'")
+        return
+    base, plus, minus, result = (float(x) for x in m.groups())
+    if abs(base + plus - minus - result) > 1e-6:
+        finding(findings, 'score_calculation', 'high', f"'{b['calculation']}' is wrong ({base + plus - minus:g})")
+    for label, value, stated in (('base_score', base, b.get('base_score')),
+                                 ('bonus.total', plus, bonus.get('total')),
+                                 ('penalty.total', minus, abs(penalty['total']) if penalty.get('total') is not None else None)):
+        if stated is not None and abs(value - stated) > 1e-6:
+            finding(findings, 'score_calculation', 'medium', f"calculation uses {value:g} for {label}, field says {stated:g}")
+    clamped = max(0.0, min(10.0, result))
+    if final is not None and abs(final - clamped) >= 1:
+        # reasoning里写明了"调整为N"的是评分人有意的调整，只提示
+        adjusted = re.search(rf'调整为\s*{final:g}(?![\d.])', b.get('reasoning') or '')
+        finding(findings, 'score_final', 'low' if adjusted else 'high',
+                f"final_score {final} but '{b['calculation']}' clamps to {clamped:g} (0-10)"
+                + (' - manual adjustment noted in reasoning' if adjusted else ''))
+
+
+def check_performance(stats, bonus, findings):
+    """人工记录的性能测试按scoring.performance阈值该得几分；评分人会酌情调整，只提示"""
+    given = bonus.get('performance')
+    parsed = tasks.parse_manual((stats.get('metadata') or {}).get('performance_test'))
+    if not isinstance(given, (int, float)) or not parsed or stats.get('completed') not in ('SUCCESS', 'PARTIAL'):
+        return
+    expected = tasks.performance_bonus(*parsed)
+    if abs(given - expected) > 1e-6:
+        finding(findings, 'score_performance', 'low',
+                f"performance bonus {given:g}, thresholds give {expected:g} for "
+                f"{parsed[0]} in {parsed[1]:g}s", expected=expected)
+
+
+def check_run(run_dir):
+    """检查一个测试目录，返回{test_dir, score, findings}"""
+    test_dir = os.path.basename(run_dir)
+    findings = []
+    try:
+        stats = stats_io.load_stats(test_dir, os.path.dirname(run_dir))
+    except ValueError as e:
+        stats = None
+        finding(findings, 'stats_invalid', 'high', f"stats.json is not valid JSON: {e}")
+    log = read_text(os.path.join(run_dir, 'finish.log'))
+    if stats is None:
+        if not findings:
+            finding(findings, 'stats_missing', 'high', 'finish.log but no stats.json')
+    else:
+        if log is None:
+            finding(findings, 'log_missing', 'medium', 'stats.json but no finish.log')
+        else:
+            check_log(stats, log, findings)
+            check_timestamps(run_dir, stats, log, findings)
+        check_score(stats, findings)
+    findings.sort(key=lambda f: -SEVERITY[f['severity']])
+    return {
+        'test_dir': test_dir,
+        'completed': (stats or {}).get('completed'),
+        'score': sum(SEVERITY[f['severity']] for f in findings),
+        'findings': findings,
+    }
+
+
+def triage(results):
+    """最严重的发现优先，其次是发现的总分"""
+    queue = [r for r in results if r['findings']]
+    queue.sort(key=lambda r: (-max(SEVERITY[f['severity']] for f in r['findings']), -r['score'], r['test_dir']))
+    return queue
+
+
+def format_queue(queue, min_severity='low'):
+    floor = SEVERITY[min_severity]
+    lines = []
+    n = 0
+    for r in queue:
+        shown = [f for f in r['findings'] if SEVERITY[f['severity']] >= floor]
+        if not shown:
+            continue
+        n += 1
+        lines.append(f"{n}. {r['test_dir']} ({r['completed']}) - score {r['score']}")
+        lines.append(f"   {os.path.join(BENCH_PATH, r['test_dir'], 'finish.log')}")
+        for f in shown:
+            lines.append(f"   [{f['severity']:6s}] {f['kind']}: {f['message']}")
+        lines.append('')
+    return lines
+
 
 def main():
-    logs = []
-    for root, dirs, files in os.walk(BENCH_PATH):
-        if 'finish.log' in files:
-            log_path = os.path.join(root, 'finish.log')
-            if 'start-org' in root:
-                continue
-            test_dir = os.path.basename(root)
-            logs.append((test_dir, log_path))
-    
-    logs.sort()
-    
-    print("=" * 80)
-    print("手工验证 - 所有finish.log内容")
-    print("=" * 80)
-    print()
-    
-    for i, (test_dir, log_path) in enumerate(logs, 1):
-        print(f"\n{'='*80}")
-        print(f"[{i}/{len(logs)}] {test_dir}")
-        print(f"{'='*80}")
-        content = read_finish_log(log_path)
-        print(content[:1500])  # 显示前1500字符
-        print(f"\n{'...' if len(content) > 1500 else ''}")
-        print(f"文件大小: {len(content)} 字符")
-        
-        # 等待用户确认
-        response = input(f"\n判断 {test_dir}：[S]uccess / [P]artial / [F]ailed / [U]nclear / [N]ext? ")
-        print()
+    parser = argparse.ArgumentParser(description='Cross-check finish.log, start/end and stats.json for every run')
+    parser.add_argument('test_dirs', nargs='*', help='only check these test dirs')
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count())
+    parser.add_argument('--min-severity', choices=list(SEVERITY), default='low',
+                        help='hide findings below this severity in the printed queue')
+    parser.add_argument('--list-file', help='also write the queue as text (e.g. tools/UNCLEAR_LIST.txt)')
+    parser.add_argument('--show', metavar='TEST_DIR', help='print the finish.log of one run and exit')
+    args = parser.parse_args()
+
+    if args.show:
+        log = read_text(os.path.join(BENCH_PATH, args.show, 'finish.log'))
+        print(log if log is not None else f"[!] No finish.log for {args.show}")
+        return 0 if log is not None else 1
+
+    run_dirs = [d for d in iter_run_dirs(BENCH_PATH)
+                if (not args.test_dirs or os.path.basename(d) in args.test_dirs) and 'start-org' not in d]
+    print(f"[*] Checking {len(run_dirs)} run(s) with {args.jobs} worker(s)...")
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        results = list(pool.map(check_run, run_dirs, chunksize=max(1, len(run_dirs) // (args.jobs * 4) or 1)))
+
+    queue = triage(results)
+    stats_io.write_json_atomic(REPORT_FILE, {
+        'checked': len(results),
+        'flagged': len(queue),
+        'queue': queue,
+    })
+    lines = format_queue(queue, args.min_severity)
+    print('\n'.join(lines) if lines else '[+] No inconsistencies found')
+    if args.list_file:
+        header = ['需要人工确认的测试（manual_verification.py 自动生成，按严重程度排序）', '=' * 80, '']
+        with open(args.list_file, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(header + lines) + '\n')
+        print(f"[+] Queue written: {args.list_file}")
+
+    high = sum(1 for r in queue if any(f['severity'] == 'high' for f in r['findings']))
+    print(f"[+] {len(results)} run(s) checked, {len(queue)} flagged, {high} with high-severity findings")
+    print(f"[+] Consistency report saved: {REPORT_FILE}")
+    return 0
+
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+网络条件模拟 - 不需要root和tc，在用户态给本地扫描目标加上丢包、限速和应答延迟
+回环地址上每个端口的握手由内核立即完成，所以这里只能利用内核自己的行为：
+  - 丢包：端口上放一个accept队列已满的监听socket，内核直接丢弃SYN，
+    扫描器只能靠自己的超时/重传（正好复现"75秒TCP超时"问题）
+  - 限速防火墙：受限端口开始时都处于丢SYN状态，按accept_rate逐个放行
+    （开放端口恢复正常监听，关闭端口撤掉监听回RST），来不及放行的探测要等SYN重传
+  - 应答延迟/抖动：只作用在连接建立之后（首字节、转发到--upstream的数据）。
+    握手本身的RTT无法在用户态模拟，connect扫描的耗时不受它影响，
+    所以profile按实际模拟的内容命名（丢SYN的比例），不叫wan/lan，免得结果像是在某个RTT下测的
+规则按端口范围配置，第一条匹配的规则生效。
+"""
+import os
+import sys
+import time
+import json
+import socket
+import random
+import asyncio
+import argparse
+import resource
+import multiprocessing
+
+DEFAULT_RULE = {
+    'reply_delay_ms': 0.0,     # 连接建立后、首字节/转发前的延迟（不影响握手）
+    'reply_jitter_ms': 0.0,    # 应答延迟的标准差
+    'drop': 0.0,               # 端口的SYN被丢弃（表现为filtered）的概率
+    'accept_rate': None,       # 限速：每秒放行的端口数，None表示不限
+    'burst': 10,               # 限速开始时立即放行的端口数
+    'banner': None,            # 开放端口建立连接后发送的内容
+}
+
+PROFILES = {
+    'loopback': {
+        'description': 'plain loopback, no emulation',
+        'rules': [],
+    },
+    'reply-delay': {
+        'description': 'no loss; replies delayed 0.5 ms +-0.2 ms after connect (handshake not delayed)',
+        'rules': [{'ports': '1-65535', 'reply_delay_ms': 0.5, 'reply_jitter_ms': 0.2}],
+    },
+    'syn-drop': {
+        'description': '0.5% of ports drop SYNs; replies delayed 80 ms +-20 ms after connect',
+        'rules': [{'ports': '1-65535', 'reply_delay_ms': 80, 'reply_jitter_ms': 20, 'drop': 0.005}],
+    },
+    'syn-drop-heavy': {
+        'description': '5% of ports drop SYNs; replies delayed 40 ms +-30 ms after connect',
+        'rules': [{'ports': '1-65535', 'reply_delay_ms': 40, 'reply_jitter_ms': 30, 'drop': 0.05}],
+    },
+    'rate-limited': {
+        'description': 'firewall passing 200 SYN/s, well-known ports filtered',
+        'rules': [{'ports': '1-1023', 'drop': 1.0},
+                  {'ports': '1024-65535', 'reply_delay_ms': 5, 'accept_rate': 200, 'burst': 20}],
+    },
+}
+
+READY_TIMEOUT = 30
+HOLD_TIMEOUT = 10.0
+
+
+def parse_ports(spec):
+    """"80,443,1000-2000" -> 排序后的端口列表"""
+    ports = set()
+    for part in str(spec).split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            lo, hi = part.split('-', 1)
+            lo, hi = int(lo), int(hi)
+        else:
+            lo = hi = int(part)
+        if not 1 <= lo <= hi <= 65535:
+            raise ValueError(f'invalid port range: {part}')
+        ports.update(range(lo, hi + 1))
+    return sorted(ports)
+
+
+def parse_hosts(spec):
+    """"127.0.0.1-127.0.0.16,::1" -> 地址列表（IPv4范围只允许最后一段变化）"""
+    hosts = []
+    for part in str(spec).split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part and ':' not in part:
+            lo, hi = part.split('-', 1)
+            prefix, first = lo.rsplit('.', 1)
+            last = hi.rsplit('.', 1)[-1]
+            hosts += [f'{prefix}.{i}' for i in range(int(first), int(last) + 1)]
+        else:
+            hosts.append(part)
+    return hosts
+
+
+def load_profile(name_or_path):
+    """内置profile名，或者JSON文件路径（格式同PROFILES里的一项）"""
+    if name_or_path in PROFILES:
+        profile = dict(PROFILES[name_or_path], name=name_or_path)
+    else:
+        with open(name_or_path, 'r', encoding='utf-8') as f:
+            profile = json.load(f)
+        profile.setdefault('name', os.path.splitext(os.path.basename(name_or_path))[0])
+    rules = []
+    for rule in profile.get('rules', []):
+        unknown = set(rule) - set(DEFAULT_RULE) - {'ports'}
+        if unknown:
+            raise ValueError(f"profile {profile['name']}: unknown rule keys {', '.join(sorted(unknown))}")
+        merged = dict(DEFAULT_RULE)
+        merged.update(rule)
+        merged['port_set'] = frozenset(parse_ports(rule['ports']))
+        rules.append(merged)
+    profile['compiled'] = rules
+    return profile
+
+
+def rule_for(port, profile):
+    for rule in profile['compiled']:
+        if port in rule['port_set']:
+            return rule
+    return DEFAULT_RULE
+
+
+def plan(ports, open_ports, profile, seed=0):
+    """决定每个端口的状态：open / closed / dropped，以及受限速的端口
+
+    在父进程里算好（同一个seed对每个提交都一样），
+    测试工具据此知道扫描器"应该"看到哪些开放端口。
+    """
+    rng = random.Random(seed)
+    open_ports = set(open_ports)
+    layout = {}
+    gated = []
+    for port in ports:
+        rule = rule_for(port, profile)
+        state = 'open' if port in open_ports else 'closed'
+        if rule['drop'] and rng.random() < rule['drop']:
+            state = 'dropped'
+        elif rule['accept_rate']:
+            gated.append(port)
+        layout[port] = state
+    return {'layout': layout, 'gated': gated,
+            'visible_open': sorted(p for p, s in layout.items() if s == 'open')}
+
+
+def fd_budget(layout, gated):
+    """估算需要的文件描述符：开放端口一个监听，丢SYN/限速端口一个监听加一个填充连接"""
+    gated = set(gated)
+    need = 0
+    for port, state in layout.items():
+        if state == 'dropped' or port in gated:
+            need += 2
+        elif state == 'open':
+            need += 1
+    return need
+
+
+def raise_fd_limit(need):
+    """把软限制提到硬限制；仍然不够时明确报错，而不是跑到一半EMFILE"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        soft = hard
+    if need + 64 > soft:
+        raise OSError(f'need ~{need} file descriptors for this layout, RLIMIT_NOFILE is {soft}')
+
+
+def listener(host, port, backlog):
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.setblocking(False)
+    return sock
+
+
+def blackhole(host, port):
+    """accept队列已满的监听socket：之后到达的SYN都会被内核丢弃"""
+    sock = listener(host, port, 0)
+    filler = socket.socket(sock.family, socket.SOCK_STREAM)
+    filler.settimeout(1.0)
+    filler.connect((host, port))
+    return sock, filler
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.tokens = float(burst)
+        self.burst = burst
+        self.last = time.monotonic()
+
+    async def take(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class NetemProxy:
+    """按plan()的结果在各个目标地址上搭建监听，在一个asyncio事件循环里处理连接"""
+
+    def __init__(self, targets, profile, upstream=None, seed=0):
+        self.targets = targets      # {host: plan}
+        self.profile = profile
+        self.upstream = upstream
+        self.rng = random.Random(seed)
+        self.holes = []
+        self.tasks = []
+        self.unbound = []
+
+    def delay(self, rule):
+        if not rule['reply_delay_ms'] and not rule['reply_jitter_ms']:
+            return 0.0
+        return max(0.0, self.rng.gauss(rule['reply_delay_ms'], rule['reply_jitter_ms'])) / 1000
+
+    def try_bind(self, make, host, port):
+        """绑定失败（<1024端口没有权限、端口已被占用）的端口按关闭处理，报告给父进程"""
+        try:
+            return make(host, port)
+        except OSError as e:
+            self.unbound.append((host, port, e.errno))
+            return None
+
+    async def serve(self, ready=None, stop=None):
+        by_rule = {}
+        for host, p in self.targets.items():
+            gated = set(p['gated'])
+            for port, state in sorted(p['layout'].items()):
+                if port in gated:
+                    rule = rule_for(port, self.profile)
+                    by_rule.setdefault(id(rule), (rule, []))[1].append((port, host))
+                elif state == 'dropped':
+                    hole = self.try_bind(blackhole, host, port)
+                    if hole:
+                        self.holes.append(hole)
+                elif state == 'open':
+                    sock = self.try_bind(lambda h, p: listener(h, p, 128), host, port)
+                    if sock:
+                        self.start_accepting(sock, host, port)
+        # 限速端口先全部丢SYN，再按速率逐个放行（同一条规则的所有目标共用一个令牌桶）
+        for rule, entries in by_rule.values():
+            holes = []
+            for port, host in sorted(entries):
+                hole = self.try_bind(blackhole, host, port)
+                if hole:
+                    holes.append((host, port, hole))
+            self.tasks.append(asyncio.ensure_future(self.release(rule, holes)))
+        if ready is not None:
+            ready.send(self.unbound)
+        while stop is None or not stop.is_set():
+            await asyncio.sleep(0.05)
+
+    def start_accepting(self, sock, host, port):
+        rule = rule_for(port, self.profile)
+        self.tasks.append(asyncio.ensure_future(self.accept_loop(sock, rule)))
+
+    async def release(self, rule, holes):
+        bucket = TokenBucket(rule['accept_rate'], rule['burst'])
+        loop = asyncio.get_running_loop()
+        for host, port, (sock, filler) in holes:
+            await bucket.take()
+            if self.targets[host]['layout'][port] == 'open':
+                # 取走填充连接，队列腾出位置，重传的SYN就能完成握手
+                conn, _ = await loop.sock_accept(sock)
+                conn.close()
+                filler.close()
+                self.start_accepting(sock, host, port)
+            else:
+                # 关闭端口：撤掉监听，之后的SYN得到RST
+                filler.close()
+                sock.close()
+
+    async def accept_loop(self, sock, rule):
+        loop = asyncio.get_running_loop()
+        while True:
+            conn, _ = await loop.sock_accept(sock)
+            port = sock.getsockname()[1]
+            self.tasks.append(asyncio.ensure_future(self.handle(conn, port, rule)))
+            if len(self.tasks) > 1024:
+                self.tasks = [t for t in self.tasks if not t.done()]
+
+    async def handle(self, conn, port, rule):
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.sleep(self.delay(rule))
+            if self.upstream:
+                await self.relay(conn, port, rule)
+                return
+            if rule['banner']:
+                await loop.sock_sendall(conn, rule['banner'].encode('utf-8'))
+            # 等扫描器断开（connect扫描通常立刻close）
+            await asyncio.wait_for(loop.sock_recv(conn, 1), HOLD_TIMEOUT)
+        except (OSError, asyncio.TimeoutError):
+            pass
+        finally:
+            conn.close()
+
+    async def relay(self, conn, port, rule):
+        """转发到上游同端口的真实服务，每个数据块都加一次延迟"""
+        loop = asyncio.get_running_loop()
+        up = socket.socket(conn.family, socket.SOCK_STREAM)
+        up.setblocking(False)
+        try:
+            await loop.sock_connect(up, (self.upstream, port))
+
+            async def pump(src, dst):
+                while True:
+                    data = await loop.sock_recv(src, 65536)
+                    if not data:
+                        break
+                    await asyncio.sleep(self.delay(rule))
+                    await loop.sock_sendall(dst, data)
+                try:
+                    dst.shutdown(socket.SHUT_WR)
+                except OSError:
+                    pass
+
+            await asyncio.gather(pump(conn, up), pump(up, conn))
+        finally:
+            up.close()
+
+
+def serve_process(targets, profile, upstream, seed, ready, stop):
+    try:
+        raise_fd_limit(sum(fd_budget(p['layout'], p['gated']) for p in targets.values()))
+    except OSError as e:
+        ready.send(e)
+        return
+    proxy = NetemProxy(targets, profile, upstream, seed)
+    asyncio.run(proxy.serve(ready, stop))
+
+
+class Emulation:
+    """在子进程里运行代理，不和被测扫描器、测试工具抢同一个解释器
+
+    hosts可以是多个回环地址（127.0.0.0/8里的任意地址、::1），每个地址独立规划，
+    visible_open是扫描器应该报告的(host, port)集合。
+    """
+
+    def __init__(self, hosts, ports, open_ports, profile_name, seed=0, upstream=None):
+        self.profile = load_profile(profile_name)
+        self.hosts = [hosts] if isinstance(hosts, str) else list(hosts)
+        self.seed = seed
+        self.upstream = upstream
+        self.plans = {host: plan(ports, open_ports, self.profile, seed + i)
+                      for i, host in enumerate(self.hosts)}
+        self.unbound = []
+        self.process = None
+
+    @property
+    def visible_open(self):
+        return {(host, port) for host, p in self.plans.items() for port in p['visible_open']}
+
+    def count(self, state):
+        return sum(1 for p in self.plans.values() for s in p['layout'].values() if s == state)
+
+    def start(self):
+        ctx = multiprocessing.get_context('fork')
+        receiver, sender = ctx.Pipe(duplex=False)
+        self.stop_event = ctx.Event()
+        self.process = ctx.Process(
+            target=serve_process, daemon=True,
+            args=(self.plans, self.profile, self.upstream, self.seed, sender, self.stop_event))
+        self.process.start()
+        sender.close()
+        message = receiver.recv() if receiver.poll(READY_TIMEOUT) else None
+        receiver.close()
+        if isinstance(message, Exception) or message is None or not self.process.is_alive():
+            self.stop()
+            raise RuntimeError(f"network emulation '{self.profile['name']}' failed to start"
+                               + (f': {message}' if message else ''))
+        self.unbound = message
+        for host, port, _errno in self.unbound:
+            p = self.plans[host]
+            p['layout'][port] = 'closed'
+            if port in p['visible_open']:
+                p['visible_open'].remove(port)
+        return self
+
+    def stop(self):
+        if self.process is None:
+            return
+        self.stop_event.set()
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.process = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Userspace network-condition emulation for local scan targets')
+    parser.add_argument('--profile', default='syn-drop', help=f"one of {', '.join(PROFILES)} or a JSON file")
+    parser.add_argument('--hosts', default='127.0.0.1',
+                        help='target addresses, e.g. 127.0.0.1-127.0.0.16,::1')
+    parser.add_argument('--ports', default='20001-20500', help='port range covered by the emulation')
+    parser.add_argument('--open', default='', help='open ports (default: every 10th port)')
+    parser.add_argument('--upstream', help='relay accepted connections to this host (same port)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--list', action='store_true', help='list built-in profiles')
+    args = parser.parse_args()
+
+    if args.list:
+        for name, profile in PROFILES.items():
+            print(f"  {name:14s} {profile['description']}")
+        return 0
+
+    hosts = parse_hosts(args.hosts)
+    ports = parse_ports(args.ports)
+    open_ports = parse_ports(args.open) if args.open else ports[::10]
+    emulation = Emulation(hosts, ports, open_ports, args.profile, args.seed, args.upstream)
+    print(f"[*] Profile {emulation.profile['name']}: {emulation.profile.get('description', '')}")
+    with emulation:
+        gated = sum(len(p['gated']) for p in emulation.plans.values())
+        print(f"[*] {len(ports)} ports on {len(hosts)} host(s): {len(emulation.visible_open)} open, "
+              f"{emulation.count('dropped')} dropping SYNs, {gated} rate-limited")
+        if emulation.unbound:
+            print(f"[!] {len(emulation.unbound)} port(s) could not be bound and are closed")
+        print("[+] Emulation running, Ctrl-C to stop")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print("\n[*] Stopped")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
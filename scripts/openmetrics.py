@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+OpenMetrics导出 - 把测试结果和工具自身的运行情况写成node_exporter textfile collector能读的文本
+  results/metrics/benchmarks.prom  每个测试（engine/client/档位）的用时、tokens、费用、评分、
+                                   实测吞吐量、扫描耗时分位数、扫描时的资源占用，
+                                   以及按engine/client/档位汇总的用时和tokens直方图；
+                                   性能测试工具的失败次数和各脚本的剖析数据
+  results/metrics/pipeline.prom    最近一次流水线运行：总耗时、各阶段耗时和状态
+benchmarks.prom是流水线的metrics阶段，输入没变就不重写；pipeline.prom每次运行流水线后重写。
+文件先写临时文件再rename，collector不会读到半个文件。AI_PK_METRICS_DIR 可以改输出目录，
+直接指向node_exporter的 --collector.textfile.directory。
+只用gauge/summary/histogram，不用counter：counter的_total后缀在旧版Prometheus文本格式里对不上TYPE行。
+"""
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import tempfile
+from collections import defaultdict
+from pathlib import Path
+
+import tasks
+import registry
+import trends
+import workspace
+
+RESULTS_DIR = workspace.results_root()
+METRICS_DIR = Path(os.environ.get('AI_PK_METRICS_DIR') or RESULTS_DIR / 'metrics')
+BENCHMARKS_FILE = METRICS_DIR / 'benchmarks.prom'
+PIPELINE_FILE = METRICS_DIR / 'pipeline.prom'
+PREFIX = 'aipk_'
+
+DURATION_BUCKETS = [300, 600, 1200, 1800, 3600, 7200, 14400]
+TOKEN_BUCKETS = [1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7]
+STATUS_VALUES = {'SUCCESS': 1.0, 'PARTIAL': 0.5, 'FAILED': 0.0}
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def number(value):
+    if value is None:
+        return None
+    value = float(value)
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+class Registry:
+    """按metric family收集样本，同一family的样本在输出里必须连续"""
+
+    def __init__(self):
+        self.families = {}
+
+    def family(self, name, kind, help_text, unit=None):
+        name = PREFIX + name
+        if name not in self.families:
+            self.families[name] = {'type': kind, 'help': help_text, 'unit': unit, 'samples': []}
+        return name
+
+    def add(self, name, kind, help_text, labels, value, unit=None, suffix=''):
+        if value is None:
+            return
+        family = self.family(name, kind, help_text, unit)
+        self.families[family]['samples'].append((family + suffix, labels, value))
+
+    def gauge(self, name, help_text, labels, value, unit=None):
+        self.add(name, 'gauge', help_text, labels, value, unit)
+
+    def summary(self, name, help_text, labels, quantiles, count=None, unit=None):
+        for q, value in quantiles:
+            self.add(name, 'summary', help_text, dict(labels, quantile=number(q)), value, unit)
+        self.add(name, 'summary', help_text, labels, count, unit, '_count')
+
+    def histogram(self, name, help_text, labels, values, buckets, unit=None):
+        values = [v for v in values if v is not None]
+        if not values:
+            return
+        for bound in buckets + [math.inf]:
+            self.add(name, 'histogram', help_text, dict(labels, le=number(bound)),
+                     sum(1 for v in values if v <= bound), unit, '_bucket')
+        self.add(name, 'histogram', help_text, labels, len(values), unit, '_count')
+        self.add(name, 'histogram', help_text, labels, sum(values), unit, '_sum')
+
+    def render(self):
+        lines = []
+        for name, family in self.families.items():
+            if not family['samples']:
+                continue
+            lines.append(f"# TYPE {name} {family['type']}")
+            if family['unit']:
+                lines.append(f"# UNIT {name} {family['unit']}")
+            lines.append(f"# HELP {name} {escape(family['help'])}")
+            for sample, labels, value in family['samples']:
+                label_text = ','.join(f'{k}="{escape(v)}"' for k, v in labels.items() if v is not None)
+                lines.append(f"{sample}{{{label_text}}} {number(value)}" if label_text
+                             else f"{sample} {number(value)}")
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+
+def write_atomic(path, text):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix='.' + path.name, suffix='.tmp', dir=path.parent)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def run_labels(record):
+    c = registry.canonical(record)
+    return {'project': record.get('project'), 'engine': c['engine'], 'client': c['client'],
+            'config': c['level'], 'test_dir': record['test_dir']}
+
+
+def add_record(reg, record):
+    labels = run_labels(record)
+    meta = record.get('metadata') or {}
+    status = record.get('completed') or 'UNKNOWN'
+    reg.gauge('run_info', 'One series per benchmark run', dict(labels, status=status,
+              test_date=meta.get('test_date') or registry.canonical(record)['run_date']), 1)
+    reg.gauge('run_success', 'Task outcome: 1 success, 0.5 partial, 0 failed', labels, STATUS_VALUES.get(status))
+    if record.get('time_minutes') is not None:
+        reg.gauge('run_duration_seconds', 'Time the agent took to finish the task', labels,
+                  record['time_minutes'] * 60, 'seconds')
+    reg.gauge('run_tokens', 'Tokens used for the task', dict(labels, kind='total'), record.get('tokens'))
+    for key, kind in (('input_tokens', 'input'), ('output_tokens', 'output'), ('cache_read', 'cache_read')):
+        reg.gauge('run_tokens', 'Tokens used for the task', dict(labels, kind=kind), meta.get(key))
+    reg.gauge('run_cost', 'API cost as recorded in metadata.total_cost', labels, meta.get('total_cost'))
+    reg.gauge('quality_score', 'Final quality score', labels, record.get('quality_score'))
+
+    # 实测值和人工记录分开打标签，不混成一个数
+    reg.gauge('scanner_ports_per_second', 'Scanner throughput measured by perf_harness or parsed from the manual note',
+              dict(labels, source='measured'), trends.measured_throughput(record))
+    reg.gauge('scanner_ports_per_second', 'Scanner throughput measured by perf_harness or parsed from the manual note',
+              dict(labels, source='manual'), trends.manual_throughput(record))
+
+    perf = record.get('perf') or {}
+    # stats.json里主负载的结果直接在perf.profiles下，其余负载在perf.workloads.<名称>
+    primary = tasks.load_spec(record.get('project'))['perf']['primary']['workload']
+    sections = [(primary, perf)] + sorted((perf.get('workloads') or {}).items())
+    for workload, section in sections:
+        for profile, s in (section.get('profiles') or {}).items():
+            plabels = dict(labels, workload=workload, profile=profile)
+            reg.gauge('scan_throughput_ports_per_second', 'Measured scan throughput per workload and network profile',
+                      plabels, s.get('ports_per_sec'))
+            reg.summary('scan_duration_seconds', 'Wall time of one scan (min/median/max over repeats)', plabels,
+                        [(0, s.get('wall_s_min')), (0.5, s.get('wall_s_median')), (1, s.get('wall_s_max'))],
+                        s['runs'] - s['failures'] if 'runs' in s else None, 'seconds')
+            reg.gauge('scan_recall_ratio', 'Share of open ports the scanner reported', plabels, s.get('recall'))
+            reg.gauge('scan_false_positives', 'Closed or dropped ports reported as open', plabels,
+                      s.get('false_positives'))
+            reg.gauge('scan_time_wait_sockets', 'TIME_WAIT sockets left behind by one scan', plabels,
+                      s.get('time_wait_max'))
+            reg.gauge('harness_scan_failures', 'Scans that failed during perf measurement', plabels, s.get('failures'))
+            reg.gauge('scan_normalized_speed', 'Throughput relative to the reference scanner on the same host',
+                      plabels, (s.get('normalized') or {}).get('speed'))
+    startup = perf.get('startup') or {}
+    for n, st in (startup.get('sizes') or {}).items():
+        slabels = dict(labels, ports=n)
+        reg.gauge('scanner_startup_seconds', 'Median exec-to-exit time of a small scan', slabels,
+                  st['exit_ms_median'] / 1000 if 'exit_ms_median' in st else None, 'seconds')
+        reg.gauge('scanner_first_connect_seconds', 'Median exec-to-first-connect time', slabels,
+                  st['first_connect_ms_median'] / 1000 if 'first_connect_ms_median' in st else None, 'seconds')
+        reg.gauge('scanner_minor_page_faults', 'Median minor page faults of one small scan', slabels,
+                  st.get('minflt_median'))
+    reg.gauge('scanner_binary_size_bytes', 'Size of the measured scanner binary', labels,
+              startup.get('binary_bytes'), 'bytes')
+    soak = perf.get('soak') or {}
+    for check, v in (soak.get('checks') or {}).items():
+        slabels = dict(labels, check=check, verdict=v.get('verdict'))
+        reg.gauge('soak_leak', 'Soak test verdict: 1 leak, 0.5 suspect, 0 ok', slabels,
+                  {'leak': 1, 'suspect': 0.5, 'ok': 0}.get(v.get('verdict')))
+        reg.gauge('soak_growth_per_second', 'Fitted growth rate during the soak test', slabels, v.get('slope_per_s'))
+    if soak.get('max_rss_kb'):
+        reg.gauge('scanner_memory_rss_bytes', 'Peak scanner RSS over the soak iterations', labels,
+                  max(soak['max_rss_kb']) * 1024, 'bytes')
+    if soak.get('series'):
+        reg.gauge('scanner_open_fds', 'Peak scanner open fds during the soak test', labels,
+                  max(point[2] for point in soak['series']))
+
+
+def add_histograms(reg, records):
+    groups = defaultdict(list)
+    for record in records:
+        c = registry.canonical(record)
+        groups[(record.get('project'), c['engine'], c['client'], c['level'])].append(record)
+    for (project, engine, client, level), runs in sorted(groups.items(), key=lambda kv: [str(k) for k in kv[0]]):
+        labels = {'project': project, 'engine': engine, 'client': client, 'config': level}
+        reg.histogram('task_duration_seconds', 'Task time across all runs of an engine/client/config', labels,
+                      [r['time_minutes'] * 60 for r in runs if r.get('time_minutes') is not None],
+                      DURATION_BUCKETS, 'seconds')
+        reg.histogram('task_tokens', 'Tokens across all runs of an engine/client/config', labels,
+                      [r.get('tokens') for r in runs], TOKEN_BUCKETS)
+
+
+def add_script_profiles(reg, path=RESULTS_DIR / 'profile.json'):
+    """profiling.py记录的各脚本最近一次运行"""
+    if not path.exists():
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        scripts = json.load(f).get('scripts', {})
+    for key, p in sorted(scripts.items()):
+        labels = {'script': p.get('script'), 'invocation': key, 'project': p.get('project')}
+        reg.gauge('harness_script_duration_seconds', 'Wall time of the last profiled run of a pipeline script',
+                  labels, p.get('wall_s'), 'seconds')
+        reg.gauge('harness_script_cpu_seconds', 'CPU time of the last profiled run of a pipeline script',
+                  labels, p.get('cpu_s'), 'seconds')
+        reg.gauge('harness_script_peak_memory_bytes', 'tracemalloc peak of the last profiled run',
+                  labels, p.get('peak_bytes'), 'bytes')
+
+
+def benchmark_metrics(records):
+    reg = Registry()
+    for record in records:
+        add_record(reg, record)
+    add_histograms(reg, records)
+    add_script_profiles(reg)
+    reg.gauge('export_timestamp_seconds', 'When this file was generated', {}, round(time.time(), 3), 'seconds')
+    return reg.render()
+
+
+def pipeline_metrics(summary, wall, state):
+    """pipeline.run_pipeline每次运行后调用"""
+    reg = Registry()
+    reg.gauge('pipeline_last_run_timestamp_seconds', 'When the pipeline last ran', {}, round(time.time(), 3), 'seconds')
+    reg.gauge('pipeline_last_run_duration_seconds', 'Wall time of the last pipeline run', {}, round(wall, 3), 'seconds')
+    reg.gauge('pipeline_last_run_failed_stages', 'Stages that failed or were blocked in the last run', {},
+              sum(1 for s in summary.values() if s['status'] in ('failed', 'blocked')))
+    for name, s in sorted(summary.items()):
+        labels = {'stage': name}
+        reg.gauge('pipeline_stage_duration_seconds', 'Stage wall time in the last run (0 when skipped)', labels,
+                  round(s['seconds'], 3), 'seconds')
+        reg.gauge('pipeline_stage_status', 'Stage status in the last run', dict(labels, status=s['status']), 1)
+    for name, s in sorted(state.get('stages', {}).items()):
+        reg.gauge('pipeline_stage_last_success_timestamp_seconds', 'When the stage last ran successfully',
+                  {'stage': name}, s.get('finished'), 'seconds')
+    return reg.render()
+
+
+def write_pipeline_metrics(summary, wall, state):
+    try:
+        write_atomic(PIPELINE_FILE, pipeline_metrics(summary, wall, state))
+    except OSError as e:
+        print(f"[!] Could not write {PIPELINE_FILE}: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export benchmark and harness metrics as an OpenMetrics textfile')
+    parser.add_argument('--output', '-o', help=f'output file (default: {BENCHMARKS_FILE})')
+    parser.add_argument('--stdout', action='store_true', help='print instead of writing the file')
+    args = parser.parse_args()
+
+    with open(RESULTS_DIR / 'benchmark_data.json', 'r', encoding='utf-8') as f:
+        records = json.load(f)
+    text = benchmark_metrics(records)
+    if args.stdout:
+        sys.stdout.write(text)
+        return
+    output = Path(args.output) if args.output else BENCHMARKS_FILE
+    write_atomic(output, text)
+    series = sum(1 for line in text.splitlines() if line and not line.startswith('#'))
+    print(f"[+] {series} series for {len(records)} run(s)")
+    print(f"[+] Metrics saved: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1008 @@
+#!/usr/bin/env python3
+"""
+扫描器实测 - 用统一的本地负载测每个提交的扫描速度和准确率
+不再只看stats.json里手写的"500 ports in 5s"：在本机搭好目标端口（默认每10个端口开一个），
+在不同网络条件（netem_proxy.py的profile：loopback/reply-delay/syn-drop/syn-drop-heavy/rate-limited）下
+多次运行扫描器，记录耗时中位数、端口/秒、漏报和误报，结果按profile写入
+stats.json的perf字段（perf.ports_per_sec取loopback结果，趋势表直接使用）
+和 results/perf_results.json。
+
+扫描器命令默认是 COMMAND_TEMPLATE，参数格式不同的提交在stats.json里用
+metadata.scan_command 覆盖，二进制用 metadata.scan_binary 指定（相对测试目录）。
+
+命令模板、额外负载、主负载/主profile和指标名来自任务规格（tasks.py）；
+任务带了测量插件时，每个负载交给插件的measure()，结果按同样的结构写入perf字段。
+
+每次测量都记录主机指纹（perf.host），扫描器任务还会在同样的负载和profile下跑一遍
+reference_scanner.py标定本机（按指纹缓存，见calibration.py），每个profile的结果
+带上normalized（相对参考扫描器的速度和换算到基准机器的等效值）。
+
+--startup RUNS 是冷启动测试：1/10/100个端口各跑RUNS次，记录exec到第一个连接、
+exec到退出的耗时，二进制大小和缺页次数，写入perf.startup，
+1个端口的退出耗时中位数是perf.startup_ms（排行榜的Startup列）。
+"""
+import os
+import re
+import sys
+import json
+import time
+import math
+import shlex
+import select
+import socket
+import hashlib
+import argparse
+import resource
+import threading
+import subprocess
+import statistics
+from datetime import date
+
+import tasks
+import workspace
+import stats_io
+import events
+import netem_proxy
+import calibration
+from blob_store import iter_run_dirs
+from build_submissions import BUILD_RESULTS_FILE, DEFAULT_MODES as BUILD_MODES, discover_entry
+
+PROJECT_ROOT = workspace.root()
+RESULTS_DIR = workspace.results_dir()
+PERF_RESULTS_FILE = RESULTS_DIR / 'perf_results.json'
+
+HARNESS_VERSION = 2
+CALIBRATION_REPEAT = 5
+TASK = tasks.load_spec()
+PLUGIN = tasks.load_plugin()
+COMMAND_TEMPLATE = TASK['perf']['command']
+PRIMARY = TASK['perf']['primary']
+METRIC = TASK['perf']['metric']
+DEFAULT_PROFILES = ['loopback', 'reply-delay', 'syn-drop', 'syn-drop-heavy', 'rate-limited']
+
+# acceptance与README验收标准一致：500端口、并发200；用高位端口，不需要root
+WORKLOADS = {
+    'acceptance': {'hosts': '127.0.0.1', 'ports': '20001-20500', 'open_every': 10, 'concurrency': 200},
+    'full-range': {'hosts': '127.0.0.1', 'ports': '1-65535', 'open_every': 100, 'concurrency': 500},
+    'multi-host': {'hosts': '127.0.0.1-127.0.0.8,::1', 'ports': '20001-22000', 'open_every': 50,
+                   'concurrency': 500},
+    # 浸泡测试默认用的大负载：一次扫描尽量跑得久，采样点才够拟合
+    'soak': {'hosts': '127.0.0.1-127.0.0.16', 'ports': '1-65535', 'open_every': 500, 'concurrency': 500},
+}
+# 任务规格里的负载：带插件的任务只用自己的负载，扫描器任务可以追加或覆盖内置负载
+WORKLOADS = dict(TASK['perf']['workloads']) if PLUGIN else dict(WORKLOADS, **TASK['perf']['workloads'])
+# 扩展性测试：总工作量（主机数 x 端口数）逐级放大，直到出错或超时；
+# 大规模时开放端口更稀疏，模拟端的监听数量保持在几千个以内
+SCALING_STEPS = [
+    ('127.0.0.1', '20001-20500', 10),
+    ('127.0.0.1', '20001-25000', 10),
+    ('127.0.0.1', '1-65535', 100),
+    ('127.0.0.1-127.0.0.4', '1-65535', 200),
+    ('127.0.0.1-127.0.0.16', '1-65535', 500),
+]
+
+ELF_MAGIC = b'\x7fELF'
+PORT_RE = re.compile(r'\b(\d{1,5})\b')
+OPEN_RE = re.compile(r'\bopen\b', re.IGNORECASE)
+BARE_PORT_RE = re.compile(r'^\s*(?:port\s*)?(\d{1,5})(?:/tcp)?\s*$', re.IGNORECASE)
+# "Open ports: 50" / "Found 50 open ports" 是计数，不是端口号
+COUNT_RE = re.compile(r'\d+\s+open\s+ports?\b|open\s+ports?\s*(?:found)?\s*[:=]\s*\d+\s*$', re.IGNORECASE)
+
+# 明确报告的失败模式：扫描器输出里的错误信息（含Zig的错误名）
+FAILURE_PATTERNS = [
+    ('fd_exhaustion', re.compile(r'Too many open files|ProcessFdQuotaExceeded|SystemFdQuotaExceeded'
+                                 r'|\bEMFILE\b|\bENFILE\b', re.IGNORECASE)),
+    ('ephemeral_ports', re.compile(r'Cannot assign requested address|AddressNotAvailable|EADDRNOTAVAIL'
+                                   r'|AddressInUse|EADDRINUSE', re.IGNORECASE)),
+    ('invalid_target', re.compile(r'InvalidIPAddressFormat|InvalidIpv[46]|invalid (?:ip|address|target|host)'
+                                  r'|pars\w* (?:ip|address|target|host)|unknown host', re.IGNORECASE)),
+    ('crash', re.compile(r'panic:|Segmentation fault|reached unreachable code|integer overflow', re.IGNORECASE)),
+]
+
+
+def is_executable(path):
+    if not (os.path.isfile(path) and os.access(path, os.X_OK)):
+        return False
+    with open(path, 'rb') as f:
+        return f.read(4) == ELF_MAGIC
+
+
+def load_build_results():
+    if not BUILD_RESULTS_FILE.exists():
+        return {}
+    with open(BUILD_RESULTS_FILE, 'r', encoding='utf-8') as f:
+        return {(r['test_dir'], r['mode']): r for r in json.load(f)}
+
+
+def find_binary(run_dir, stats, builds):
+    """被测二进制：metadata.scan_binary > 统一重新构建的（按build.modes顺序，zigscan先ReleaseFast）> 测试目录里现成的"""
+    test_dir = os.path.basename(run_dir)
+    explicit = (stats.get('metadata') or {}).get('scan_binary')
+    if explicit:
+        path = os.path.join(run_dir, explicit)
+        return path if is_executable(path) else None
+    for mode in BUILD_MODES:
+        build = builds.get((test_dir, mode))
+        if build and build.get('ok') and is_executable(str(PROJECT_ROOT / build['binary'])):
+            return str(PROJECT_ROOT / build['binary'])
+    entry = discover_entry(run_dir)
+    if entry and entry['kind'] == 'build-exe':
+        stem = os.path.splitext(os.path.basename(entry['entry']))[0]
+        for candidate in (os.path.join(run_dir, stem), os.path.join(run_dir, 'zig-out', 'bin', stem)):
+            if is_executable(candidate):
+                return candidate
+    for bin_dir in (os.path.join(run_dir, 'zig-out', 'bin'), run_dir):
+        if os.path.isdir(bin_dir):
+            found = [os.path.join(bin_dir, f) for f in sorted(os.listdir(bin_dir))]
+            found = [f for f in found if is_executable(f)]
+            if found:
+                return max(found, key=os.path.getsize)
+    return None
+
+
+def scan_commands(stats, binary, workload):
+    """生成扫描命令：模板里有{hosts}就一次扫全部目标，否则每个目标各跑一次
+
+    返回[(命令, 这次命令负责的目标列表)]
+    """
+    template = (stats.get('metadata') or {}).get('scan_command') or COMMAND_TEMPLATE
+    hosts = netem_proxy.parse_hosts(workload['hosts'])
+    fields = dict(workload, binary=shlex.quote(binary), hosts=','.join(hosts))
+    if '{hosts}' in template:
+        return [(shlex.split(template.format(**dict(fields, host=hosts[0]))), hosts)]
+    return [(shlex.split(template.format(**dict(fields, host=host))), [host]) for host in hosts]
+
+
+def host_limits():
+    """影响大规模扫描的系统限制：文件描述符上限和临时端口范围"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    limits = {'nofile_soft': soft, 'nofile_hard': hard}
+    try:
+        with open('/proc/sys/net/ipv4/ip_local_port_range', 'r') as f:
+            lo, hi = map(int, f.read().split())
+        limits['ip_local_port_range'] = f'{lo}-{hi}'
+        limits['ephemeral_ports'] = hi - lo + 1
+    except (OSError, ValueError):
+        pass
+    return limits
+
+
+def time_wait_sockets():
+    """/proc/net/sockstat里处于TIME_WAIT的TCP连接数（临时端口压力）"""
+    try:
+        with open('/proc/net/sockstat', 'r') as f:
+            for line in f:
+                if line.startswith('TCP:'):
+                    fields = line.split()
+                    return int(fields[fields.index('tw') + 1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def foreign_listeners():
+    """测试开始前本机已有的监听端口（/proc/net/tcp*），扫描到它们不算误报"""
+    ports = set()
+    for name in ('/proc/net/tcp', '/proc/net/tcp6'):
+        try:
+            with open(name, 'r') as f:
+                next(f, None)
+                for line in f:
+                    fields = line.split()
+                    if len(fields) > 3 and fields[3] == '0A':
+                        ports.add(int(fields[1].rsplit(':', 1)[1], 16))
+        except OSError:
+            pass
+    return ports
+
+
+def parse_open_ports(output, scanned, hosts):
+    """从扫描器输出里取开放端口(host, port)：先试JSON，再按行找"open"或单独一个端口号的行
+
+    多目标时端口归到最近一次出现的目标地址下。
+    """
+    host_re = re.compile('|'.join(re.escape(h) for h in sorted(hosts, key=len, reverse=True)))
+    current = hosts[0]
+    found = set()
+    for line in output.splitlines():
+        line = line.strip()
+        if line.startswith('{') or line.startswith('['):
+            try:
+                data = json.loads(line)
+            except ValueError:
+                data = None
+            if data is not None:
+                found |= ports_in_json(data, current, hosts)
+                continue
+        m = host_re.search(line)
+        if m:
+            current = m.group(0)
+            line = host_re.sub(' ', line)
+        m = BARE_PORT_RE.match(line)
+        if m:
+            found.add((current, int(m.group(1))))
+        elif OPEN_RE.search(line):
+            line = COUNT_RE.sub(' ', line)
+            found.update((current, int(p)) for p in PORT_RE.findall(line))
+    return {(h, p) for h, p in found if p in scanned}
+
+
+def ports_in_json(data, host, hosts):
+    if isinstance(data, int):
+        return {(host, data)}
+    if isinstance(data, list):
+        return set().union(*(ports_in_json(d, host, hosts) for d in data)) if data else set()
+    if isinstance(data, dict):
+        for key in ('target', 'host', 'ip', 'address'):
+            if data.get(key) in hosts:
+                host = data[key]
+                break
+        if 'port' in data and str(data.get('state', data.get('status', 'open'))).lower() == 'open':
+            return {(host, data['port'])} if isinstance(data['port'], int) else set()
+        ports = set()
+        for key, value in data.items():
+            if 'open' in key.lower() or key in ('results', 'hosts', 'targets'):
+                ports |= ports_in_json(value, host, hosts)
+        return ports
+    return set()
+
+
+def classify(output, returncode):
+    modes = [name for name, pattern in FAILURE_PATTERNS if pattern.search(output)]
+    if returncode is not None and returncode < 0 and 'crash' not in modes:
+        modes.append('crash')
+    return modes
+
+
+def run_scan(cmd, scanned, hosts, timeout, nofile=None):
+    """运行一次扫描，返回耗时、退出状态、报告的开放端口和失败模式"""
+    def limit_fds():
+        if nofile:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (nofile, nofile))
+
+    start = time.perf_counter()
+    try:
+        proc = subprocess.run(cmd, capture_output=True, timeout=timeout, preexec_fn=limit_fds)
+    except subprocess.TimeoutExpired as e:
+        output = (e.stdout or b'').decode('utf-8', 'replace') + (e.stderr or b'').decode('utf-8', 'replace')
+        return {'status': 'timeout', 'wall_s': round(time.perf_counter() - start, 4), 'open': set(),
+                'failure_modes': ['timeout'] + classify(output, None)}
+    except OSError as e:
+        return {'status': 'error', 'wall_s': 0.0, 'open': set(), 'error': str(e), 'failure_modes': []}
+    wall = time.perf_counter() - start
+    output = proc.stdout.decode('utf-8', 'replace') + '\n' + proc.stderr.decode('utf-8', 'replace')
+    result = {'status': 'ok' if proc.returncode == 0 else 'exit',
+              'returncode': proc.returncode, 'wall_s': round(wall, 4),
+              'open': parse_open_ports(output, scanned, hosts),
+              'failure_modes': classify(output, proc.returncode)}
+    if proc.returncode != 0:
+        result['error'] = output.strip()[-300:]
+    return result
+
+
+def measure_profile(commands, workload, profile, repeat, timeout, seed, nofile=None, label=None, event='scan',
+                    reference=None):
+    """同一个profile跑repeat次，每次新起一个模拟代理（限速放行是一次性的）
+    label是实时面板上显示的测试目录名，每次扫描结束（计时之外）发一个event事件；
+    给了本机参考扫描器的吞吐量reference时，事件里带上归一化速度供面板排名"""
+    hosts = netem_proxy.parse_hosts(workload['hosts'])
+    ports = netem_proxy.parse_ports(workload['ports'])
+    scanned = set(ports)
+    open_ports = ports[::workload['open_every']]
+    foreign = foreign_listeners()
+    work = len(hosts) * len(ports)
+    runs = []
+    for i in range(repeat):
+        emulation = netem_proxy.Emulation(hosts, ports, open_ports, profile, seed + i)
+        with emulation:
+            expected = emulation.visible_open
+            tw_before = time_wait_sockets()
+            parts = [run_scan(cmd, scanned, targets, timeout, nofile) for cmd, targets in commands]
+            tw_after = time_wait_sockets()
+        r = merge_parts(parts)
+        r['missed'] = len(expected - r['open'])
+        r['false_positives'] = len({(h, p) for h, p in r['open'] - expected if p not in foreign})
+        r['expected'] = len(expected)
+        if tw_before is not None and tw_after is not None:
+            r['time_wait'] = tw_after - tw_before
+        runs.append(r)
+        pps = round(work / r['wall_s'], 1) if r['status'] == 'ok' and r['wall_s'] > 0 else None
+        events.emit(event, test_dir=label, profile=emulation.profile['name'], index=i, status=r['status'],
+                    wall_s=r['wall_s'], work=work, ports_per_sec=pps,
+                    normalized_speed=round(pps / reference, 4) if pps and reference else None,
+                    recall=round(1 - r['missed'] / r['expected'], 4) if r['expected'] else None,
+                    failure_modes=r['failure_modes'])
+    return summarize_runs(runs, work)
+
+
+def merge_parts(parts):
+    """逐个目标运行时，把各次结果合成一次扫描（耗时相加）"""
+    statuses = [p['status'] for p in parts]
+    merged = {
+        'status': next((s for s in statuses if s != 'ok'), 'ok'),
+        'wall_s': round(sum(p['wall_s'] for p in parts), 4),
+        'open': set().union(*(p['open'] for p in parts)),
+        'failure_modes': sorted({m for p in parts for m in p['failure_modes']}),
+    }
+    errors = [p['error'] for p in parts if p.get('error')]
+    if errors:
+        merged['error'] = errors[-1]
+    return merged
+
+
+def summarize_runs(runs, work):
+    ok = [r for r in runs if r['status'] == 'ok']
+    summary = {
+        'runs': len(runs),
+        'work': work,
+        'failures': len(runs) - len(ok),
+        'statuses': sorted({r['status'] for r in runs}),
+        'failure_modes': sorted({m for r in runs for m in r['failure_modes']}),
+    }
+    if ok:
+        walls = [r['wall_s'] for r in ok]
+        median = statistics.median(walls)
+        expected = sum(r['expected'] for r in ok)
+        summary.update({
+            'wall_s_median': round(median, 4),
+            'wall_s_min': round(min(walls), 4),
+            'wall_s_max': round(max(walls), 4),
+            'ports_per_sec': round(work / median, 1) if median > 0 else None,
+            'recall': round(1 - sum(r['missed'] for r in ok) / expected, 4) if expected else None,
+            'false_positives': max(r['false_positives'] for r in ok),
+        })
+    tw = [r['time_wait'] for r in runs if 'time_wait' in r]
+    if tw:
+        summary['time_wait_max'] = max(tw)
+    errors = [r['error'] for r in runs if r.get('error')]
+    if errors:
+        summary['error'] = errors[-1]
+    return summary
+
+
+def linear_fit(xs, ys):
+    """最小二乘直线拟合，返回(斜率, 截距, R²)，点数不够返回None"""
+    n = len(xs)
+    if n < 2:
+        return None
+    mx, my = sum(xs) / n, sum(ys) / n
+    sxx = sum((x - mx) ** 2 for x in xs)
+    if sxx == 0:
+        return None
+    slope = sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / sxx
+    intercept = my - slope * mx
+    ss_tot = sum((y - my) ** 2 for y in ys)
+    ss_res = sum((y - intercept - slope * x) ** 2 for x, y in zip(xs, ys))
+    r2 = 1 - ss_res / ss_tot if ss_tot > 0 else 0.0
+    return slope, intercept, r2
+
+
+def fit_exponent(points):
+    """log(耗时)对log(工作量)的最小二乘斜率：1表示线性，明显大于1说明规模上去后变慢"""
+    pts = [(math.log(p['work']), math.log(p['wall_s_median'])) for p in points
+           if p.get('wall_s_median') and p['wall_s_median'] > 0]
+    fit = linear_fit([x for x, _ in pts], [y for _, y in pts])
+    return round(fit[0], 3) if fit else None
+
+
+def measure_scaling(stats, binary, base, profile, repeat, timeout, seed, nofile=None, label=None):
+    """逐级放大主机x端口工作量，找出扫描器的极限和对应的失败模式"""
+    points = []
+    limit = None
+    for hosts, ports, open_every in SCALING_STEPS:
+        workload = dict(base, hosts=hosts, ports=ports, open_every=open_every)
+        try:
+            s = measure_profile(scan_commands(stats, binary, workload), workload, profile,
+                                repeat, timeout, seed, nofile, label=label)
+        except (OSError, RuntimeError) as e:
+            # 测试端自己的资源不够（例如监听数超过RLIMIT_NOFILE），更大的规模也不用试了
+            print(f"[!] Scaling stopped at {hosts} x {ports}: {e}")
+            break
+        point = {'hosts': len(netem_proxy.parse_hosts(hosts)), 'ports': len(netem_proxy.parse_ports(ports))}
+        point.update({k: s[k] for k in ('work', 'wall_s_median', 'ports_per_sec', 'recall',
+                                        'failure_modes', 'statuses', 'time_wait_max') if k in s})
+        points.append(point)
+        degraded = s['failure_modes'] or s.get('recall') is None or s['recall'] < 0.99
+        print(f"    work {point['work']:>9,d}  {s.get('wall_s_median', float('nan')):8.3f}s  "
+              f"{s.get('ports_per_sec') or 0:10,.0f} ports/s  recall {s.get('recall') or 0:.3f}"
+              + (f"  [{', '.join(s['failure_modes'])}]" if s['failure_modes'] else ''))
+        if degraded and limit is None:
+            limit = {'work': point['work'], 'hosts': point['hosts'], 'ports': point['ports'],
+                     'failure_modes': s['failure_modes'] or ['missed_ports'], 'recall': s.get('recall')}
+        if 'ok' not in s['statuses']:
+            break
+    good = [p for p in points if 'ok' in p['statuses']]
+    return {'profile': profile, 'points': points, 'exponent': fit_exponent(good), 'limit': limit}
+
+
+# ---- 浸泡测试：长时间运行时采样RSS、fd和socket状态，判断有没有泄漏 ----
+
+TCP_STATES = {
+    '01': 'ESTABLISHED', '02': 'SYN_SENT', '03': 'SYN_RECV', '04': 'FIN_WAIT1',
+    '05': 'FIN_WAIT2', '06': 'TIME_WAIT', '07': 'CLOSE', '08': 'CLOSE_WAIT',
+    '09': 'LAST_ACK', '0A': 'LISTEN', '0B': 'CLOSING',
+}
+SOAK_INTERVAL = 0.1
+SOAK_WARMUP = 0.2           # 每次运行的前20%时间是建立并发的过程，不参与拟合
+SOAK_MIN_POINTS = 10        # 合并各次运行稳态样本拟合时至少要这么多点
+SOAK_MIN_ITERATIONS = 5     # 按运行次数拟合时至少要这么多次运行
+MAX_SERIES_POINTS = 120     # 写进stats.json的时间序列最多这么多点
+LEAK_R2 = 0.8
+SUSPECT_R2 = 0.5
+
+
+def process_tree(pid):
+    """pid及其所有子进程（扫描器可能调用外部工具）"""
+    pids = [pid]
+    i = 0
+    while i < len(pids):
+        try:
+            for tid in os.listdir(f'/proc/{pids[i]}/task'):
+                with open(f'/proc/{pids[i]}/task/{tid}/children', 'r') as f:
+                    pids += [int(c) for c in f.read().split()]
+        except OSError:
+            pass
+        i += 1
+    return pids
+
+
+def socket_states(inodes):
+    """按inode统计这些socket在/proc/net/tcp*里的状态"""
+    counts = {}
+    if not inodes:
+        return counts
+    for name in ('/proc/net/tcp', '/proc/net/tcp6'):
+        try:
+            with open(name, 'r') as f:
+                next(f, None)
+                for line in f:
+                    fields = line.split()
+                    if len(fields) > 9 and fields[9] in inodes:
+                        state = TCP_STATES.get(fields[3], fields[3])
+                        counts[state] = counts.get(state, 0) + 1
+        except OSError:
+            pass
+    return counts
+
+
+def sample_process(pid):
+    """一次采样：进程树的RSS和RSS峰值（VmHWM，KB）、打开的fd数和socket状态"""
+    rss = 0
+    hwm = 0
+    fds = 0
+    inodes = set()
+    for p in process_tree(pid):
+        try:
+            with open(f'/proc/{p}/status', 'r') as f:
+                for line in f:
+                    if line.startswith('VmHWM:'):
+                        hwm += int(line.split()[1])
+                    elif line.startswith('VmRSS:'):
+                        rss += int(line.split()[1])
+                        break
+            for fd in os.listdir(f'/proc/{p}/fd'):
+                fds += 1
+                try:
+                    link = os.readlink(f'/proc/{p}/fd/{fd}')
+                except OSError:
+                    continue
+                if link.startswith('socket:['):
+                    inodes.add(link[8:-1])
+        except OSError:
+            continue
+    return {'rss_kb': rss, 'hwm_kb': hwm, 'fds': fds, 'sockets': socket_states(inodes)}
+
+
+def soak_iteration(cmd, interval, limit_s):
+    """运行一次扫描器并定时采样，超过limit_s就结束（浸泡时间到了）"""
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    start = time.perf_counter()
+    samples = []
+    while True:
+        pid, status = os.waitpid(proc.pid, os.WNOHANG)
+        if pid:
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            break
+        elapsed = time.perf_counter() - start
+        if elapsed > limit_s:
+            proc.kill()
+            _, status = os.waitpid(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            break
+        s = sample_process(proc.pid)
+        s['t'] = round(elapsed, 3)
+        samples.append(s)
+        time.sleep(interval)
+    # 峰值取采样到的VmHWM：vfork/exec之后rusage的ru_maxrss包含测试工具自己的RSS
+    return {'wall_s': round(time.perf_counter() - start, 3), 'returncode': proc.returncode,
+            'max_rss_kb': max((s['hwm_kb'] or s['rss_kb'] for s in samples), default=None),
+            'samples': samples}
+
+
+def growth_verdict(ts, values, floor, relative):
+    """拟合增长斜率并给出结论：持续增长且超过阈值判为leak，趋势较弱判为suspect"""
+    fit = linear_fit(ts, values)
+    if fit is None:
+        return {'verdict': 'insufficient_data'}
+    slope, _, r2 = fit
+    growth = slope * (ts[-1] - ts[0])
+    base = max(values[0], 1)
+    result = {'slope_per_s': round(slope, 3), 'r2': round(r2, 3), 'growth': round(growth, 1)}
+    if r2 >= LEAK_R2 and growth > max(floor, relative * base):
+        result['verdict'] = 'leak'
+    elif r2 >= SUSPECT_R2 and growth > max(floor, relative * base) / 2:
+        result['verdict'] = 'suspect'
+    else:
+        result['verdict'] = 'ok'
+    return result
+
+
+VERDICT_ORDER = ['insufficient_data', 'ok', 'suspect', 'leak']
+
+
+def steady_samples(iteration):
+    """一次运行去掉预热段（前SOAK_WARMUP的时间，至少去掉exec后的第一个样本）的样本"""
+    warmup = SOAK_WARMUP * iteration['wall_s']
+    return [s for s in iteration['samples'][1:] if s['t'] >= warmup]
+
+
+def soak_checks(points, concurrency, method):
+    """points是按时间排好的(t, rss_kb, fds, close_wait)，对三项分别拟合"""
+    ts = [p[0] for p in points]
+    checks = {
+        'memory': growth_verdict(ts, [p[1] for p in points], 1024, 0.2),
+        'fds': growth_verdict(ts, [p[2] for p in points], 32, 0.1 * concurrency / max(points[0][2], 1)),
+        # 对端已关闭、自己没close的socket越积越多，是典型的socket泄漏
+        'close_wait': growth_verdict(ts, [p[3] for p in points], 16, 0),
+    }
+    for v in checks.values():
+        v['method'] = method
+    return checks
+
+
+def analyze_soak(iterations, concurrency):
+    """判断内存、fd和socket有没有泄漏，两种拟合取更严重的结论：
+
+    pooled  各次运行的稳态样本合在一起，横轴是进程启动后的时间（一次运行很长或很短都适用）
+    across  每次运行一个点（RSS峰值、结束前的fd数和CLOSE_WAIT），横轴是这次运行开始的时间
+    两种都没有足够的点才是insufficient_data。
+    """
+    pooled = sorted((s['t'], s['rss_kb'], s['fds'], s['sockets'].get('CLOSE_WAIT', 0))
+                    for it in iterations for s in steady_samples(it))
+    across = [(it['started'], it['max_rss_kb'], it['samples'][-1]['fds'],
+               it['samples'][-1]['sockets'].get('CLOSE_WAIT', 0))
+              for it in iterations if it['samples']]
+    candidates = []
+    if len(pooled) >= SOAK_MIN_POINTS:
+        candidates.append(soak_checks(pooled, concurrency, 'pooled'))
+    if len(across) >= SOAK_MIN_ITERATIONS:
+        candidates.append(soak_checks(across, concurrency, 'across'))
+    result = {}
+    for check in ('memory', 'fds', 'close_wait'):
+        result[check] = max((c[check] for c in candidates), key=lambda v: VERDICT_ORDER.index(v['verdict']),
+                            default={'verdict': 'insufficient_data'})
+    return result
+
+
+def downsample(samples, limit=MAX_SERIES_POINTS):
+    if len(samples) <= limit:
+        return samples
+    step = len(samples) / limit
+    return [samples[int(i * step)] for i in range(limit)] + [samples[-1]]
+
+
+def measure_soak(commands, workload, profile, duration, interval, seed):
+    """在同一个模拟环境里反复运行扫描器，直到浸泡时间用完"""
+    hosts = netem_proxy.parse_hosts(workload['hosts'])
+    ports = netem_proxy.parse_ports(workload['ports'])
+    iterations = []
+    with netem_proxy.Emulation(hosts, ports, ports[::workload['open_every']], profile, seed):
+        start = time.perf_counter()
+        deadline = start + duration
+        while time.perf_counter() < deadline:
+            for cmd, _targets in commands:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                started = time.perf_counter() - start
+                iterations.append(dict(soak_iteration(cmd, interval, remaining), started=round(started, 3)))
+    verdicts = analyze_soak(iterations, workload['concurrency'])
+    longest = max(iterations, key=lambda it: len(it['samples']), default={'samples': []})
+    overall = 'leak' if any(v['verdict'] == 'leak' for v in verdicts.values()) else \
+        'suspect' if any(v['verdict'] == 'suspect' for v in verdicts.values()) else \
+        'ok' if all(v['verdict'] == 'ok' for v in verdicts.values()) else 'insufficient_data'
+    return {
+        'profile': profile,
+        'duration_s': duration,
+        'workload': workload,
+        'iterations': len(iterations),
+        'exit_codes': sorted({it['returncode'] for it in iterations}),
+        'max_rss_kb': [it['max_rss_kb'] for it in iterations],
+        'verdict': overall,
+        'checks': verdicts,
+        'series': [[s['t'], s['rss_kb'], s['fds'], s['sockets']] for s in downsample(longest['samples'])],
+    }
+
+
+# ---- 冷启动：自动化里扫描器常常只扫一个目标的几个端口，固定开销比吞吐量更重要 ----
+
+STARTUP_SIZES = [1, 10, 100]
+STARTUP_BASE_PORT = 20001
+STARTUP_OPEN_EVERY = 10
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def startup_run(cmd, listeners, timeout):
+    """运行一次，返回(exec到退出秒数, exec到第一个连接秒数或None, 退出码, rusage)
+
+    第一个连接是任一监听端口变为可accept的时刻（后台线程select）；
+    用os.wait4回收进程，拿到这个子进程自己的缺页次数（ru_maxrss在vfork/exec后
+    包含父进程的内存，不可用）。
+    """
+    stop_r, stop_w = os.pipe()
+    first = []
+
+    def watch():
+        ready, _, _ = select.select(listeners + [stop_r], [], [])
+        if any(r is not stop_r for r in ready):
+            first.append(time.perf_counter())
+
+    watcher = threading.Thread(target=watch, daemon=True)
+    watcher.start()
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    killer = threading.Timer(timeout, proc.kill)
+    killer.start()
+    _, status, usage = os.wait4(proc.pid, 0)
+    end = time.perf_counter()
+    killer.cancel()
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    os.write(stop_w, b'x')
+    watcher.join()
+    os.close(stop_r)
+    os.close(stop_w)
+    for sock in listeners:
+        try:
+            while True:
+                sock.accept()[0].close()
+        except (BlockingIOError, OSError):
+            pass
+    return end - start, (first[0] - start) if first else None, proc.returncode, usage
+
+
+def summarize_startup(n, samples):
+    ok = [s for s in samples if s['returncode'] == 0]
+    summary = {'ports': n, 'runs': len(samples), 'failures': len(samples) - len(ok)}
+    if ok:
+        exits = [s['exit_s'] * 1000 for s in ok]
+        summary.update({
+            'exit_ms_median': round(statistics.median(exits), 3),
+            'exit_ms_p90': round(percentile(exits, 0.9), 3),
+            'exit_ms_min': round(min(exits), 3),
+            'minflt_median': statistics.median(s['minflt'] for s in ok),
+            'majflt_max': max(s['majflt'] for s in ok),
+        })
+        connects = [s['connect_s'] * 1000 for s in ok if s['connect_s'] is not None]
+        if connects:
+            summary.update({
+                'first_connect_ms_median': round(statistics.median(connects), 3),
+                'first_connect_ms_p90': round(percentile(connects, 0.9), 3),
+                'connected_runs': len(connects),
+            })
+    return summary
+
+
+def measure_startup(stats, binary, runs, timeout, label=None):
+    """1/10/100个端口各跑runs次（先跑一次不计时预热页缓存），每10个端口开一个（第一个端口总是开放的）"""
+    result = {'runs': runs, 'binary_bytes': os.path.getsize(binary), 'sizes': {}}
+    for n in STARTUP_SIZES:
+        ports = list(range(STARTUP_BASE_PORT, STARTUP_BASE_PORT + n))
+        workload = {'hosts': '127.0.0.1', 'ports': f'{ports[0]}-{ports[-1]}' if n > 1 else str(ports[0]),
+                    'open_every': STARTUP_OPEN_EVERY, 'concurrency': n}
+        cmd, _targets = scan_commands(stats, binary, workload)[0]
+        listeners = []
+        try:
+            for port in ports[::STARTUP_OPEN_EVERY]:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                sock.bind(('127.0.0.1', port))
+                sock.listen(128)
+                sock.setblocking(False)
+                listeners.append(sock)
+            startup_run(cmd, listeners, timeout)
+            samples = []
+            for i in range(runs):
+                exit_s, connect_s, returncode, usage = startup_run(cmd, listeners, timeout)
+                samples.append({'exit_s': exit_s, 'connect_s': connect_s, 'returncode': returncode,
+                                'minflt': usage.ru_minflt, 'majflt': usage.ru_majflt})
+                events.emit('scan', test_dir=label, profile=f'startup-{n}', index=i,
+                            status='ok' if returncode == 0 else 'exit', wall_s=round(exit_s, 6), work=n,
+                            ports_per_sec=None, recall=None, failure_modes=[])
+        finally:
+            for sock in listeners:
+                sock.close()
+        result['sizes'][str(n)] = summarize_startup(n, samples)
+        if n == STARTUP_SIZES[0]:
+            result['command'] = ' '.join(shlex.quote(c) for c in cmd)
+    return result
+
+
+def calibrate(host, name, workload, profile, args):
+    """在同样的负载和profile下跑参考扫描器，标定结果按主机指纹缓存；失败返回None"""
+    key = netem_proxy.load_profile(profile)['name']
+    ref = None if args.calibrate else calibration.lookup(host['id'], name, key)
+    if ref is not None:
+        return ref
+    commands = [([sys.executable, str(calibration.REFERENCE_SCANNER), '-t', h, '-p', str(workload['ports']),
+                  '-c', str(workload['concurrency'])], [h]) for h in netem_proxy.parse_hosts(workload['hosts'])]
+    s = measure_profile(commands, workload, profile, max(args.repeat, CALIBRATION_REPEAT), args.timeout,
+                        args.seed, event='calibration_scan')
+    if not s.get('ports_per_sec') or not s.get('recall'):
+        print(f"[!] Calibration under {key} failed: {', '.join(s['statuses'] + s['failure_modes'])}")
+        return None
+    ref = calibration.record(host, name, key, s)
+    print(f"[*] Calibrated {host['id']} under {name}/{key}: reference scanner {ref['ports_per_sec']:,.0f} ports/s")
+    return ref
+
+
+def measure_plugin(run_dir, stats, binary, name, workload, profiles, args):
+    """插件任务：一次measure()测完一个负载的所有profile，返回{profile: 汇总}"""
+    context = {
+        'test_dir': os.path.basename(run_dir),
+        'run_dir': run_dir,
+        'binary': binary,
+        'stats': stats,
+        'workload': dict(workload, name=name),
+        'profiles': profiles,
+        'spec': TASK,
+        'repeat': args.repeat,
+        'timeout': args.timeout,
+        'seed': args.seed,
+    }
+    results = PLUGIN.measure(context) or {}
+    for profile, s in results.items():
+        events.emit('scan', test_dir=context['test_dir'], profile=profile, index=s.get('runs', 1) - 1,
+                    status='ok' if 'wall_s_median' in s else 'failed', wall_s=s.get('wall_s_median'),
+                    work=s.get('work'), ports_per_sec=s.get(METRIC), recall=s.get('recall'),
+                    failure_modes=s.get('failure_modes', []))
+    return results
+
+
+def update_stats(test_dir, stats, perf):
+    """合并到stats.json的perf字段：只覆盖这次测过的负载和profile
+
+    主负载（zigscan是acceptance）的结果在perf.profiles，其余负载在perf.workloads.<名称>，
+    扩展性测试在perf.scaling。perf.<指标>取主负载主profile的结果。
+    """
+    old = stats.get('perf') or {}
+    merged = json.loads(json.dumps(old))
+    for key in ('harness_version', 'measured_at', 'binary', 'limits', 'host'):
+        merged[key] = perf[key]
+    for name, section in perf['workloads'].items():
+        target = merged if name == PRIMARY['workload'] else merged.setdefault('workloads', {}).setdefault(name, {})
+        target['command'] = section['command']
+        target['workload'] = section['workload']
+        target.setdefault('profiles', {}).update(section['profiles'])
+    for key in ('scaling', 'soak', 'startup'):
+        if key in perf:
+            merged[key] = perf[key]
+    one_port = ((merged.get('startup') or {}).get('sizes') or {}).get(str(STARTUP_SIZES[0])) or {}
+    if one_port.get('exit_ms_median') is not None:
+        merged['startup_ms'] = one_port['exit_ms_median']
+    primary = (merged.get('profiles') or {}).get(PRIMARY['profile']) or {}
+    # 一个开放端口都没找到的不算有效吞吐量（不是扫描器或参数不对）；插件不报recall时不检查
+    if primary.get(METRIC) and primary.get('recall', True):
+        merged[METRIC] = primary[METRIC]
+    else:
+        merged.pop(METRIC, None)
+    if (primary.get('normalized') or {}).get('speed') and METRIC in merged:
+        merged['normalized_speed'] = primary['normalized']['speed']
+    else:
+        merged.pop('normalized_speed', None)
+    if merged != old:
+        stats['perf'] = merged
+        stats_io.write_json_atomic(stats_io.stats_path(test_dir, workspace.bench_dir()), stats)
+    return merged
+
+
+def print_row(test_dir, profile, s):
+    modes = f"  [{', '.join(s['failure_modes'])}]" if s['failure_modes'] else ''
+    if 'wall_s_median' not in s:
+        print(f"[!] {test_dir:32s} {profile:13s} FAILED ({', '.join(s['statuses'])}){modes}")
+        return
+    recall = f"{s['recall'] * 100:5.1f}%" if s.get('recall') is not None else '  N/A'
+    accuracy = f"  recall {recall}  fp {s['false_positives']}" if 'false_positives' in s else ''
+    normalized = f"  x{s['normalized']['speed']:.2f} ref" if s.get('normalized') else ''
+    print(f"[+] {test_dir:32s} {profile:13s} {s['wall_s_median']:8.3f}s "
+          f"{s.get(METRIC) or 0:10,.0f} {TASK['perf']['unit']}{normalized}{accuracy}"
+          + (f"  ({s['failures']} failed)" if s['failures'] else '') + modes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure scanner speed and accuracy under emulated network conditions')
+    parser.add_argument('test_dirs', nargs='*', help='only measure these test dirs')
+    parser.add_argument('--workload', '-w', choices=list(WORKLOADS),
+                        help='acceptance (default): 500 ports; full-range: 1-65535; '
+                             'multi-host: 127.0.0.1-8 and ::1; soak (default with --soak): 16 x 65535')
+    parser.add_argument('--profiles', nargs='+',
+                        help=f"network profiles (built-in: {', '.join(netem_proxy.PROFILES)}) or JSON files; "
+                             "default: all, syn-drop for --soak (timeouts keep each scan running long enough "
+                             "to sample), loopback for --scaling")
+    parser.add_argument('--hosts', help='override target addresses, e.g. 127.0.0.1-127.0.0.4,::1')
+    parser.add_argument('--ports', help='override port range')
+    parser.add_argument('--open-every', type=int, help='every Nth port in the range is open')
+    parser.add_argument('--concurrency', '-c', type=int)
+    parser.add_argument('--scaling', action='store_true',
+                        help='grow hosts x ports until the scanner fails (first profile only)')
+    parser.add_argument('--soak', type=float, metavar='SECONDS',
+                        help='run the scanner repeatedly for this long and check for memory/fd leaks')
+    parser.add_argument('--startup', type=int, metavar='RUNS',
+                        help='cold-start benchmark: exec-to-first-connect and exec-to-exit for 1/10/100 ports, '
+                             'RUNS times each')
+    parser.add_argument('--sample-interval', type=float, default=SOAK_INTERVAL,
+                        help='soak sampling interval (seconds)')
+    parser.add_argument('--nofile', type=int, help="cap the scanner's RLIMIT_NOFILE")
+    parser.add_argument('--repeat', '-n', type=int, default=3)
+    parser.add_argument('--timeout', type=float, default=120.0, help='per-scan timeout (seconds)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--calibrate', action='store_true', help='re-run the reference scanner even if this host is calibrated')
+    parser.add_argument('--no-calibration', action='store_true', help='skip the reference scanner (no normalized scores)')
+    parser.add_argument('--dry-run', action='store_true', help='do not write stats.json or perf_results.json')
+    args = parser.parse_args()
+
+    args.workload = args.workload or ('soak' if args.soak else PRIMARY['workload'])
+    if PLUGIN and (args.soak or args.scaling or args.startup):
+        parser.error(f"--soak/--scaling/--startup measure port scanners; task {TASK['name']} uses its own plugin")
+    if not args.profiles:
+        args.profiles = (list(getattr(PLUGIN, 'PROFILES', ['default'])) if PLUGIN else
+                         ['syn-drop'] if args.soak else ['loopback'] if args.scaling else DEFAULT_PROFILES)
+    if args.workload not in WORKLOADS:
+        parser.error(f"task {TASK['name']} defines no workload {args.workload!r} (perf.workloads in task.json)")
+    workload = dict(WORKLOADS[args.workload])
+    for key in ('hosts', 'ports', 'open_every', 'concurrency'):
+        if getattr(args, key) is not None:
+            workload[key] = getattr(args, key)
+    limits = host_limits()
+    if args.nofile:
+        limits['scanner_nofile'] = args.nofile
+    if PLUGIN:
+        print(f"[*] Task {TASK['name']}: workload {args.workload} via plugin {PLUGIN.__file__}; "
+              f"nofile {limits['nofile_soft']}")
+    else:
+        print(f"[*] Workload {args.workload}: {workload['hosts']} x {workload['ports']}, "
+              f"concurrency {workload['concurrency']}; nofile {limits['nofile_soft']}, "
+              f"ephemeral ports {limits.get('ip_local_port_range', '?')}")
+    host = calibration.host_fingerprint(limits)
+    # 标定的负载名：命令行改过负载参数时带上参数哈希，不和标准负载的标定混用
+    cal_name = args.workload
+    if workload != WORKLOADS[args.workload]:
+        cal_name += '~' + hashlib.sha256(json.dumps(workload, sort_keys=True).encode()).hexdigest()[:8]
+    references = {}
+    if not (PLUGIN or args.soak or args.scaling or args.startup or args.no_calibration):
+        for profile in args.profiles:
+            name = netem_proxy.load_profile(profile)['name']
+            ref = calibrate(host, cal_name, workload, profile, args)
+            references[name] = (ref and ref['ports_per_sec'], calibration.baseline(cal_name, name))
+
+    builds = load_build_results()
+    summary = {}
+    if PERF_RESULTS_FILE.exists():
+        with open(PERF_RESULTS_FILE, 'r', encoding='utf-8') as f:
+            summary = json.load(f)
+
+    run_dirs = [d for d in iter_run_dirs(workspace.bench_dir())
+                if not args.test_dirs or os.path.basename(d) in args.test_dirs]
+    mode = 'soak' if args.soak else 'scaling' if args.scaling else 'startup' if args.startup else 'profiles'
+    events.emit('harness_started', workload=args.workload, profiles=args.profiles, repeat=args.repeat, mode=mode)
+    planned = {'profiles': len(args.profiles) * args.repeat, 'startup': len(STARTUP_SIZES) * (args.startup or 0)}
+    for run_dir in run_dirs:
+        events.emit('run_queued', test_dir=os.path.basename(run_dir), planned=planned.get(mode))
+
+    for run_dir in run_dirs:
+        test_dir = os.path.basename(run_dir)
+        stats = stats_io.load_stats(test_dir, workspace.bench_dir())
+        if stats is None:
+            events.emit('run_skipped', test_dir=test_dir, reason='no stats.json')
+            continue
+        binary = find_binary(run_dir, stats, builds)
+        if not binary:
+            print(f"[-] No scanner binary: {test_dir}")
+            events.emit('run_skipped', test_dir=test_dir, reason='no scanner binary')
+            continue
+        try:
+            commands = [([binary], [])] if PLUGIN else scan_commands(stats, binary, workload)
+        except (KeyError, ValueError) as e:
+            print(f"[!] Bad metadata.scan_command in {test_dir}: {e}")
+            events.emit('error', test_dir=test_dir, message=f'bad metadata.scan_command: {e}')
+            continue
+        events.emit('run_started', test_dir=test_dir, binary=os.path.relpath(binary, PROJECT_ROOT))
+
+        section = {
+            'command': ' '.join(shlex.quote(c) for c in commands[0][0]),
+            'workload': workload,
+            'profiles': {},
+        }
+        perf = {
+            'harness_version': HARNESS_VERSION,
+            'measured_at': date.today().isoformat(),
+            'binary': os.path.relpath(binary, PROJECT_ROOT),
+            'limits': limits,
+            'host': host,
+            'workloads': {args.workload: section},
+        }
+        if args.startup:
+            startup = measure_startup(stats, binary, args.startup, args.timeout, label=test_dir)
+            perf['startup'] = startup
+            perf['workloads'] = {}
+            for n, s in startup['sizes'].items():
+                if 'exit_ms_median' not in s:
+                    print(f"[!] {test_dir:32s} {n:>3s} port(s)  FAILED ({s['failures']}/{s['runs']})")
+                    continue
+                connect = (f"first connect {s['first_connect_ms_median']:7.2f}ms  "
+                           if 'first_connect_ms_median' in s else 'no connect          ')
+                print(f"[+] {test_dir:32s} {n:>3s} port(s)  exit {s['exit_ms_median']:7.2f}ms "
+                      f"(p90 {s['exit_ms_p90']:.2f})  {connect}minflt {s['minflt_median']:g}  "
+                      f"{startup['binary_bytes'] // 1024}KB"
+                      + (f"  ({s['failures']} failed)" if s['failures'] else ''))
+        elif args.soak:
+            print(f"[*] {test_dir}: soaking for {args.soak:g}s under {args.profiles[0]}")
+            soak = measure_soak(commands, workload, args.profiles[0], args.soak, args.sample_interval, args.seed)
+            perf['soak'] = soak
+            perf['workloads'] = {}
+            checks = ', '.join(f"{k} {v['verdict']}" + (f" ({v['slope_per_s']:+g}/s)" if 'slope_per_s' in v else '')
+                               for k, v in soak['checks'].items())
+            print(f"[{'!' if soak['verdict'] in ('leak', 'suspect') else '+'}] {test_dir}: "
+                  f"{soak['verdict'].upper()} after {soak['iterations']} run(s) - {checks}")
+        elif PLUGIN:
+            try:
+                results = measure_plugin(run_dir, stats, binary, args.workload, workload, args.profiles, args)
+            except Exception as e:
+                # 插件是任务自带的代码，出错只跳过这个提交
+                print(f"[!] {test_dir}: plugin failed: {e}")
+                events.emit('error', test_dir=test_dir, message=f'plugin failed: {e}')
+                continue
+            for name, s in results.items():
+                section['profiles'][name] = s
+                print_row(test_dir, name, s)
+        elif args.scaling:
+            print(f"[*] {test_dir}: scaling under {args.profiles[0]}")
+            perf['scaling'] = measure_scaling(stats, binary, workload, args.profiles[0], args.repeat,
+                                              args.timeout, args.seed, args.nofile, label=test_dir)
+            scaling = perf['scaling']
+            limit = scaling['limit']
+            print(f"[+] {test_dir}: exponent {scaling['exponent']}, "
+                  + (f"limit at {limit['work']:,d} ({', '.join(limit['failure_modes'])})" if limit else 'no limit hit'))
+            perf['workloads'] = {}
+        else:
+            for profile in args.profiles:
+                name = netem_proxy.load_profile(profile)['name']
+                reference, base = references.get(name, (None, None))
+                try:
+                    s = measure_profile(commands, workload, profile, args.repeat, args.timeout,
+                                        args.seed, args.nofile, label=test_dir, reference=reference)
+                except (OSError, RuntimeError) as e:
+                    print(f"[!] {test_dir}: profile {profile} not measured: {e}")
+                    events.emit('error', test_dir=test_dir, message=f'profile {profile} not measured: {e}')
+                    continue
+                section['profiles'][name] = calibration.normalize(s, METRIC, reference, base)
+                print_row(test_dir, name, s)
+
+        if not args.dry_run:
+            perf = update_stats(test_dir, stats, perf)
+        summary[test_dir] = perf
+        events.emit('run_finished', test_dir=test_dir, ports_per_sec=perf.get(METRIC))
+
+    if args.dry_run:
+        print("[*] Dry run: stats.json and perf_results.json not written")
+        return 0
+    stats_io.write_json_atomic(PERF_RESULTS_FILE, summary)
+    print(f"[+] Perf results saved: {PERF_RESULTS_FILE}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
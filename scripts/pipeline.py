@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+流水线调度器 - 替代顺序执行的run_all.sh
+每个阶段声明输入/输出，按依赖关系组成DAG：输入没变的阶段直接跳过，
+互不依赖的阶段（文本报告、图表、两种语言的HTML）并行执行，最后打印各阶段耗时。
+"""
+import os
+import sys
+import glob
+import json
+import time
+import hashlib
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import events
+import workspace
+import openmetrics
+
+PROJECT_ROOT = workspace.root()
+SCRIPTS_DIR = workspace.SCRIPTS_DIR
+RESULTS_DIR = workspace.results_root()
+STATE_FILE = RESULTS_DIR / '.pipeline_state.json'
+
+# 各阶段共同依赖的脚本
+COMMON_SCRIPTS = [str(SCRIPTS_DIR / n) for n in ('cyberpunk_analyzer.py', 'ranking.py',
+                                                 'registry.py', 'trends.py', 'regressions.py',
+                                                 'tasks.py', 'workspace.py')]
+
+
+def build_stages(projects=None):
+    """阶段定义：name -> 命令、依赖、输入/输出（相对工作区根目录的glob）、环境变量
+
+    每个项目一个ingest:<project>分片，只读自己的stats.json，输出到results/<project>/；
+    ingest把各分片合并成results/下的总数据，后面的报告阶段都依赖它。
+    只改了一个项目的结果时，其他分片的指纹不变，直接跳过。
+    """
+    projects = workspace.list_projects() if projects is None else projects
+    bench = workspace.load_config()['benchmarks_dir']
+    res = workspace.load_config()['results_dir']
+    tasks_dir = workspace.load_config()['projects_dir']
+    data = f'{res}/benchmark_data.json'
+    charts = f'{res}/charts/*.png'
+    stages = {}
+    for project in projects:
+        stages[f'ingest:{project}'] = {
+            'cmd': ['cyberpunk_analyzer.py', '--stage', 'ingest'],
+            'env': {'AI_PK_PROJECT': project},
+            'deps': [],
+            'inputs': [f'{bench}/{project}/*/stats.json', f'{tasks_dir}/{project}/task.json'] + COMMON_SCRIPTS,
+            'outputs': [f'{res}/{project}/benchmark_data.json'],
+        }
+        if len(projects) > 1:
+            stages[f'text:{project}'] = {
+                'cmd': ['cyberpunk_analyzer.py', '--stage', 'report'],
+                'env': {'AI_PK_PROJECT': project},
+                'deps': [f'ingest:{project}'],
+                'inputs': [f'{res}/{project}/benchmark_data.json', COMMON_SCRIPTS[0],
+                           str(SCRIPTS_DIR / 'regressions.py')],
+                'outputs': [f'{res}/{project}/BENCHMARK_REPORT.txt'],
+            }
+    stages.update({
+        'ingest': {
+            'cmd': ['cyberpunk_analyzer.py', '--stage', 'combine'],
+            'deps': [f'ingest:{p}' for p in projects],
+            'inputs': [f'{res}/{p}/benchmark_data.json' for p in projects] + COMMON_SCRIPTS,
+            'outputs': [data, f'{res}/rankings.json'],
+        },
+        'text': {
+            'cmd': ['cyberpunk_analyzer.py', '--stage', 'report'],
+            'deps': ['ingest'],
+            'inputs': [data, COMMON_SCRIPTS[0], str(SCRIPTS_DIR / 'regressions.py'), str(SCRIPTS_DIR / 'trends.py')],
+            'outputs': [f'{res}/BENCHMARK_REPORT.txt', f'{res}/BENCHMARK_REPORT_ZH.txt'],
+        },
+        'regressions': {
+            'cmd': ['regressions.py'],
+            'deps': ['ingest'],
+            'inputs': [data, str(SCRIPTS_DIR / 'regressions.py'), str(SCRIPTS_DIR / 'trends.py')],
+            'outputs': [f'{res}/regressions.json'],
+        },
+        'charts': {
+            'cmd': ['generate_charts.py'],
+            'deps': ['ingest'],
+            'inputs': [data, str(SCRIPTS_DIR / 'generate_charts.py')],
+            'outputs': [charts],
+        },
+        'html': {
+            'cmd': ['generate_html_report.py'],
+            'deps': ['charts', 'trends'],
+            'inputs': [data, charts, str(SCRIPTS_DIR / 'generate_html_report.py'),
+                       str(SCRIPTS_DIR / 'regressions.py'), str(SCRIPTS_DIR / 'trends.py')],
+            'outputs': [f'{res}/REPORT.html'],
+        },
+        'trends': {
+            'cmd': ['trends.py'],
+            'deps': ['ingest'],
+            'inputs': [f'{res}/trends.jsonl', str(SCRIPTS_DIR / 'trends.py')],
+            'outputs': [f'{res}/TRENDS.md', f'{res}/charts/06_trends.png'],
+        },
+        'snapshot': {
+            'cmd': ['snapshots.py', 'take'],
+            'deps': ['ingest'],
+            'inputs': [data, f'{res}/rankings.json', str(SCRIPTS_DIR / 'snapshots.py')],
+            'outputs': [f'{res}/history/index.jsonl'],
+        },
+        'metrics': {
+            'cmd': ['openmetrics.py'],
+            'deps': ['ingest'],
+            'inputs': [data, f'{res}/profile.json', str(SCRIPTS_DIR / 'openmetrics.py')],
+            'outputs': [str(openmetrics.BENCHMARKS_FILE)],
+        },
+        'site': {
+            'cmd': ['generate_html_report.py', '--site'],
+            'deps': ['charts', 'trends'],
+            'inputs': [data, charts, f'{res}/build_results.json', f'{res}/*/build_results.json',
+                       str(SCRIPTS_DIR / 'static_site.py'), str(SCRIPTS_DIR / 'trends.py')],
+            'outputs': [f'{res}/site/index.html'],
+        },
+        'html_en': {
+            'cmd': ['generate_bilingual_html.py', '--lang', 'en'],
+            'deps': ['charts', 'trends'],
+            'inputs': [data, charts, str(SCRIPTS_DIR / 'generate_bilingual_html.py'),
+                       str(SCRIPTS_DIR / 'regressions.py'), str(SCRIPTS_DIR / 'trends.py')],
+            'outputs': [f'{res}/REPORT_EN.html'],
+        },
+        'html_zh': {
+            'cmd': ['generate_bilingual_html.py', '--lang', 'zh'],
+            'deps': ['charts', 'trends'],
+            'inputs': [data, charts, str(SCRIPTS_DIR / 'generate_bilingual_html.py'),
+                       str(SCRIPTS_DIR / 'regressions.py'), str(SCRIPTS_DIR / 'trends.py')],
+            'outputs': [f'{res}/REPORT_ZH.html'],
+        },
+    })
+    return stages
+
+
+STAGES = build_stages()
+
+
+def refresh_stages():
+    """重新发现项目（监视模式下可能新增了项目）"""
+    global STAGES
+    STAGES = build_stages()
+    return STAGES
+
+
+def expand(patterns, root=PROJECT_ROOT):
+    """展开glob，返回排序后的相对路径列表（绝对路径的模式原样展开）"""
+    files = set()
+    for pattern in patterns:
+        for path in glob.glob(os.path.join(root, pattern)):
+            if os.path.isfile(path):
+                files.add(os.path.relpath(path, root))
+    return sorted(files)
+
+
+class FileHasher:
+    """按(size, mtime)缓存文件内容哈希，没改动的文件不重读"""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def digest(self, rel):
+        path = PROJECT_ROOT / rel
+        st = path.stat()
+        cached = self.cache.get(rel)
+        if cached and cached['size'] == st.st_size and cached['mtime_ns'] == st.st_mtime_ns:
+            return cached['sha256']
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        self.cache[rel] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha256': h.hexdigest()}
+        return h.hexdigest()
+
+
+def stage_key(name, stage, hasher):
+    """阶段指纹 = 命令 + 所有输入文件内容"""
+    h = hashlib.sha256(json.dumps([stage['cmd'], stage.get('env')]).encode('utf-8'))
+    for rel in expand(stage['inputs']):
+        h.update(rel.encode('utf-8'))
+        h.update(hasher.digest(rel).encode('ascii'))
+    return h.hexdigest()
+
+
+def load_state():
+    if not STATE_FILE.exists():
+        return {'stages': {}, 'files': {}}
+    with open(STATE_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_state(state):
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = str(STATE_FILE) + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, STATE_FILE)
+
+
+def select(targets):
+    """目标阶段及其全部上游依赖"""
+    selected = set()
+    stack = list(targets or STAGES)
+    while stack:
+        name = stack.pop()
+        if name not in STAGES:
+            raise SystemExit(f"[!] Unknown stage: {name} (available: {', '.join(STAGES)})")
+        if name not in selected:
+            selected.add(name)
+            stack.extend(STAGES[name]['deps'])
+    return [n for n in STAGES if n in selected]
+
+
+def downstream(names):
+    """给定阶段及所有（直接或间接）依赖它们的下游阶段"""
+    selected = set(names)
+    grown = True
+    while grown:
+        grown = False
+        for name in STAGES:
+            if name not in selected and any(d in selected for d in STAGES[name]['deps']):
+                selected.add(name)
+                grown = True
+    return [n for n in STAGES if n in selected]
+
+
+def run_stage(name, stage, profile=False):
+    """在子进程中运行一个阶段，返回(返回码, 耗时, 输出)"""
+    cmd = [sys.executable, str(SCRIPTS_DIR / stage['cmd'][0])] + stage['cmd'][1:]
+    env = dict(os.environ, AI_PK_ROOT=str(PROJECT_ROOT), **stage.get('env', {}))
+    if profile:
+        env['AI_PK_PROFILE'] = '1'
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=PROJECT_ROOT, env=env, capture_output=True, text=True)
+    return proc.returncode, time.perf_counter() - start, proc.stdout + proc.stderr
+
+
+def run_pipeline(targets=None, force=False, jobs=4, dry_run=False, verbose=False, profile=False,
+                 upstream=True):
+    """按DAG执行，返回{阶段: 结果}；任一阶段失败时其下游标记为blocked
+
+    upstream=False时只运行targets本身（调用方已确定上游没变，例如录入服务只重导入一个项目分片）。
+    """
+    names = select(targets) if upstream else [n for n in STAGES if n in set(targets)]
+    state = load_state()
+    hasher = FileHasher(state['files'])
+    summary = {}
+    done = set()
+    pending = set(names)
+    running = {}
+
+    start = time.perf_counter()
+
+    def ready(name):
+        return all(d in done or d not in names for d in STAGES[name]['deps'])
+
+    if not dry_run:
+        events.emit('pipeline_started', stages=list(names))
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            progressed = False
+            for name in sorted(n for n in pending if ready(n)):
+                progressed = True
+                pending.discard(name)
+                stage = STAGES[name]
+                key = stage_key(name, stage, hasher)
+                prev = state['stages'].get(name, {})
+                outputs_exist = all(expand([p]) for p in stage['outputs'])
+                if not force and prev.get('key') == key and outputs_exist:
+                    summary[name] = {'status': 'skipped', 'seconds': 0.0}
+                    done.add(name)
+                    if not dry_run:
+                        events.emit('stage_skipped', stage=name, status='skipped')
+                    continue
+                if dry_run:
+                    summary[name] = {'status': 'would run', 'seconds': 0.0}
+                    done.add(name)
+                    continue
+                print(f"[*] Running stage: {name}")
+                events.emit('stage_started', stage=name)
+                running[pool.submit(run_stage, name, stage, profile)] = (name, key)
+
+            if not running:
+                if progressed:
+                    # 刚跳过的阶段可能让下游变为可执行
+                    continue
+                if pending:
+                    # 剩下的阶段上游失败了
+                    for name in pending:
+                        summary[name] = {'status': 'blocked', 'seconds': 0.0}
+                        events.emit('stage_finished', stage=name, status='blocked')
+                    break
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, key = running.pop(future)
+                code, seconds, output = future.result()
+                if verbose or code != 0:
+                    print(output.rstrip())
+                if code == 0:
+                    done.add(name)
+                    # 输出文件已经变化，指纹按运行前的输入记录
+                    state['stages'][name] = {'key': key, 'seconds': round(seconds, 3),
+                                             'finished': time.time()}
+                    summary[name] = {'status': 'ran', 'seconds': seconds}
+                else:
+                    state['stages'].pop(name, None)
+                    summary[name] = {'status': 'failed', 'seconds': seconds}
+                    print(f"[!] Stage failed: {name} (exit {code})")
+                events.emit('stage_finished', stage=name, status=summary[name]['status'], seconds=round(seconds, 3))
+
+    if not dry_run:
+        save_state(state)
+        openmetrics.write_pipeline_metrics(summary, time.perf_counter() - start, state)
+    return summary
+
+
+def print_summary(summary, wall):
+    width = max([12] + [len(n) for n in summary])
+    print(f"\n┌─{'─' * width}─┬────────────┬──────────┐")
+    print(f"│ {'Stage':{width}s} │ Status     │   Time   │")
+    print(f"├─{'─' * width}─┼────────────┼──────────┤")
+    for name in STAGES:
+        if name in summary:
+            s = summary[name]
+            print(f"│ {name:{width}s} │ {s['status']:10s} │ {s['seconds']:7.2f}s │")
+    print(f"└─{'─' * width}─┴────────────┴──────────┘")
+    total = sum(s['seconds'] for s in summary.values())
+    print(f"Wall time: {wall:.2f}s (stage time {total:.2f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Dependency-tracked AI-PK report pipeline')
+    parser.add_argument('targets', nargs='*', help=f"stages to bring up to date ({', '.join(STAGES)})")
+    parser.add_argument('--force', action='store_true', help='run stages even if inputs are unchanged')
+    parser.add_argument('--jobs', '-j', type=int, default=4)
+    parser.add_argument('--dry-run', action='store_true')
+    parser.add_argument('--verbose', '-v', action='store_true', help='show stage output')
+    parser.add_argument('--list', action='store_true', help='list stages and exit')
+    parser.add_argument('--profile', action='store_true',
+                        help='profile every stage that runs (results/profile.json)')
+    parser.add_argument('--watch', action='store_true',
+                        help='keep running and rebuild whenever benchmark files change')
+    args = parser.parse_args()
+
+    if args.watch:
+        import watch
+        watch.watch(args.targets or None, jobs=args.jobs)
+        return
+
+    if args.list:
+        for name, stage in STAGES.items():
+            deps = ', '.join(stage['deps']) or '-'
+            env = ' '.join(f'{k}={v}' for k, v in stage.get('env', {}).items())
+            print(f"{name:16s} deps: {deps:16s} cmd: {env + ' ' if env else ''}{' '.join(stage['cmd'])}")
+        return
+
+    start = time.perf_counter()
+    summary = run_pipeline(args.targets, args.force, args.jobs, args.dry_run, args.verbose,
+                           args.profile)
+    print_summary(summary, time.perf_counter() - start)
+    if any(s['status'] in ('failed', 'blocked') for s in summary.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+流水线脚本的性能剖析 - 各脚本共用的 --profile 选项
+按阶段记录墙钟时间、CPU时间和tracemalloc峰值内存，可选cProfile转储，
+写入 results/profile.json（每个脚本保留最近一次，带git commit便于跨提交对比），
+同时追加到 results/profile_history.jsonl。
+pipeline.py --profile 通过环境变量 AI_PK_PROFILE=1 让每个阶段的脚本都开启剖析。
+"""
+import os
+import sys
+import json
+import time
+import fcntl
+import functools
+import subprocess
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+import workspace
+
+PROFILE_FILE = workspace.results_root() / 'profile.json'
+HISTORY_FILE = workspace.results_root() / 'profile_history.jsonl'
+
+
+def add_arguments(parser):
+    group = parser.add_argument_group('profiling')
+    group.add_argument('--profile', action='store_true',
+                       help='record per-stage wall/CPU time and peak memory to results/profile.json')
+    group.add_argument('--cprofile', metavar='FILE',
+                       help='also dump cProfile stats to FILE (implies --profile)')
+
+
+def git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=workspace.CODE_ROOT,
+                             capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+
+
+class Profiler:
+    """按阶段记录耗时和内存；未开启时所有方法都是空操作"""
+
+    def __init__(self):
+        self.enabled = False
+        self.script = None
+        self.stages = {}
+        self.order = []
+        self.peaks = []
+        self.total_peak = 0
+        self.cprofile = None
+        self.cprofile_path = None
+
+    def start(self, script, cprofile_path=None):
+        self.enabled = True
+        self.script = script
+        self.started = (time.perf_counter(), time.process_time())
+        tracemalloc.start()
+        if cprofile_path:
+            import cProfile
+            self.cprofile_path = cprofile_path
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+
+    def entry(self, name):
+        if name not in self.stages:
+            self.stages[name] = {'name': name, 'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0}
+            self.order.append(name)
+        return self.stages[name]
+
+    @contextmanager
+    def stage(self, name):
+        """一个阶段：墙钟/CPU时间累加，峰值内存取各次调用的最大值（嵌套阶段计入外层）"""
+        if not self.enabled:
+            yield
+            return
+        current_peak = tracemalloc.get_traced_memory()[1]
+        self.total_peak = max(self.total_peak, current_peak)
+        if self.peaks:
+            self.peaks[-1] = max(self.peaks[-1], current_peak)
+        tracemalloc.reset_peak()
+        self.peaks.append(0)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            e = self.entry(name)
+            e['calls'] += 1
+            e['wall_s'] += time.perf_counter() - wall
+            e['cpu_s'] += time.process_time() - cpu
+            peak = max(self.peaks.pop(), tracemalloc.get_traced_memory()[1])
+            e['peak_bytes'] = max(e.get('peak_bytes', 0), peak)
+            self.total_peak = max(self.total_peak, peak)
+            if self.peaks:
+                self.peaks[-1] = max(self.peaks[-1], peak)
+
+    def timed(self, name):
+        """装饰器：频繁调用的小函数（如翻译）只累加时间，不跟踪内存"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                wall, cpu = time.perf_counter(), time.process_time()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    e = self.entry(name)
+                    e['calls'] += 1
+                    e['wall_s'] += time.perf_counter() - wall
+                    e['cpu_s'] += time.process_time() - cpu
+            return wrapper
+        return decorator
+
+    def report(self):
+        wall, cpu = self.started
+        stages = []
+        for name in self.order:
+            e = dict(self.stages[name])
+            e['wall_s'] = round(e['wall_s'], 6)
+            e['cpu_s'] = round(e['cpu_s'], 6)
+            stages.append(e)
+        return {
+            'script': self.script,
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'argv': sys.argv[1:],
+            'project': workspace.current_project(),
+            'python': sys.version.split()[0],
+            'wall_s': round(time.perf_counter() - wall, 6),
+            'cpu_s': round(time.process_time() - cpu, 6),
+            'peak_bytes': max(self.total_peak, tracemalloc.get_traced_memory()[1]),
+            'stages': stages,
+            'cprofile': self.cprofile_path,
+        }
+
+    def finish(self):
+        """停止剖析并写出结果（带文件锁，流水线并行阶段不会互相覆盖）"""
+        if not self.enabled:
+            return None
+        if self.cprofile:
+            self.cprofile.disable()
+            self.cprofile.dump_stats(self.cprofile_path)
+        report = self.report()
+        tracemalloc.stop()
+        self.enabled = False
+
+        PROFILE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(str(PROFILE_FILE) + '.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            data = {'scripts': {}}
+            if PROFILE_FILE.exists():
+                with open(PROFILE_FILE, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            key = script_key(self.script, report['argv'])
+            if report['project']:
+                key += f" @{report['project']}"
+            data['scripts'][key] = report
+            tmp = str(PROFILE_FILE) + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp, PROFILE_FILE)
+            with open(HISTORY_FILE, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(report, ensure_ascii=False) + '\n')
+        print_report(report)
+        return report
+
+
+def script_key(script, argv):
+    """profile.json里的键：脚本名 + 去掉剖析选项后的参数"""
+    args = []
+    skip = False
+    for a in argv:
+        if skip:
+            skip = False
+        elif a == '--cprofile':
+            skip = True
+        elif a != '--profile' and not a.startswith('--cprofile='):
+            args.append(a)
+    return script + (f" [{' '.join(args)}]" if args else '')
+
+
+def print_report(report):
+    print(f"\n[*] Profile: {report['script']} wall {report['wall_s']:.3f}s, "
+          f"cpu {report['cpu_s']:.3f}s, peak {report['peak_bytes'] / 1024 / 1024:.1f} MB")
+    for s in report['stages']:
+        peak = f"{s['peak_bytes'] / 1024 / 1024:8.1f} MB" if 'peak_bytes' in s else ' ' * 11
+        print(f"    {s['name']:24s} x{s['calls']:<5d} wall {s['wall_s']:8.3f}s  cpu {s['cpu_s']:8.3f}s  {peak}")
+    print(f"[+] Profile saved: {PROFILE_FILE}")
+
+
+profiler = Profiler()
+stage = profiler.stage
+timed = profiler.timed
+
+
+def setup(args, script):
+    """根据命令行参数（或AI_PK_PROFILE环境变量）开启剖析"""
+    if args.profile or args.cprofile or os.environ.get('AI_PK_PROFILE'):
+        profiler.start(script, args.cprofile)
+
+
+def finish():
+    return profiler.finish()
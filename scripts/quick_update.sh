@@ -6,11 +6,12 @@ set -e
 cd "$(dirname "$0")/.."
 
 echo "🔍 Scanning for new results..."
-python3 scripts/analyze_results.py
+# 只更新数据和文本报告（与run_all.sh同一条流水线，输入未变时直接跳过）
+python3 scripts/pipeline.py ingest text
 
 echo ""
 echo "📊 Results updated!"
-echo "   - View: results/ZIGSCAN_RESULTS.md"
-echo "   - JSON: results/zigscan_results.json"
+echo "   - View: results/BENCHMARK_REPORT.txt"
+echo "   - JSON: results/benchmark_data.json"
 echo ""
 echo "✅ Done!"
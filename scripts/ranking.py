@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+排行榜计算 - 字典序 / Pareto前沿 / Bradley-Terry评分
+所有排名都从同一个预加载的结果数组计算。评分按项目分开：同一项目里不同组合的
+每两次测试按字典序比一局，胜场矩阵持久化在 results/ratings.json。
+新增或修改一次测试只更新它自己的对局（对每个其他组合二分查找，O(组合数·log n)），
+评分再从胜场矩阵拟合Bradley-Terry（Elo同量纲），和测试到达的先后顺序无关。
+"""
+import os
+import json
+import math
+import bisect
+import hashlib
+from collections import defaultdict
+
+import registry
+import workspace
+
+RESULTS_DIR = workspace.results_dir()
+RATINGS_FILE = RESULTS_DIR / 'ratings.json'
+RANKINGS_FILE = RESULTS_DIR / 'rankings.json'
+
+STATUS_PRIORITY = {'SUCCESS': 0, 'PARTIAL': 1, 'FAILED': 2, 'UNCLEAR': 3}
+ELO_BASE = 1500.0
+BT_ITERATIONS = 200
+STATE_VERSION = 2
+
+INF = float('inf')
+
+
+def pair_key(record):
+    """评分按规范化后的engine+client+档位聚合同一组合的多次测试"""
+    return registry.pair_label(record)
+
+
+def project_key(record):
+    """不同项目的测试不互相比较"""
+    return record.get('project') or workspace.default_project()
+
+
+def perf_tuple(record):
+    """(分数, 状态优先级, 时间, tokens)，缺失的时间/tokens视为无穷大"""
+    return (
+        record.get('quality_score') or 0,
+        STATUS_PRIORITY.get(record.get('completed', 'UNCLEAR'), 4),
+        record.get('time_minutes') or INF,
+        record.get('tokens') or INF,
+    )
+
+
+def lexicographic_key(record):
+    """字典序排序键：分数降序 > SUCCESS优先 > 时间升序 > tokens升序"""
+    score, status, time_min, tokens = perf_tuple(record)
+    return (-score, status, time_min, tokens)
+
+
+def build_table(records):
+    """一次性把结果数组转换成紧凑的比较表，后续所有排名复用它"""
+    return [perf_tuple(r) for r in records]
+
+
+def lexicographic(table):
+    """返回按字典序排好的下标列表"""
+    return sorted(range(len(table)), key=lambda i: (-table[i][0], table[i][1], table[i][2], table[i][3]))
+
+
+def dominates(a, b):
+    """a在(质量高, 时间短, tokens少)三个维度上支配b"""
+    return (a[0] >= b[0] and a[2] <= b[2] and a[3] <= b[3] and
+            (a[0] > b[0] or a[2] < b[2] or a[3] < b[3]))
+
+
+def pareto_fronts(table):
+    """非支配排序：返回前沿列表，每个前沿是下标列表
+
+    先按(分数降序, 时间, tokens)排序，后面的点不可能支配前面的点，
+    所以每个点只需要检查已有前沿里有没有支配它的成员。
+    """
+    order = sorted(range(len(table)), key=lambda i: (-table[i][0], table[i][2], table[i][3]))
+    fronts = []
+    for i in order:
+        for front in fronts:
+            if not any(dominates(table[j], table[i]) for j in front):
+                front.append(i)
+                break
+        else:
+            fronts.append([i])
+    return fronts
+
+
+def to_json_perf(perf):
+    """无穷大不是合法JSON，存盘时用null代替"""
+    return [None if v == INF else v for v in perf]
+
+
+def from_json_perf(perf):
+    return tuple(INF if v is None else v for v in perf)
+
+
+def match_key(perf):
+    """对局用的比较键，越小越好（与lexicographic_key一致）"""
+    score, status, time_min, tokens = from_json_perf(perf)
+    return (-score, status, time_min, tokens)
+
+
+def compare(a, b):
+    """两次测试对局结果：a胜1.0，平0.5，负0.0"""
+    ka, kb = match_key(a), match_key(b)
+    if ka == kb:
+        return 0.5
+    return 1.0 if ka < kb else 0.0
+
+
+def score_against(key, keys):
+    """一次测试对一个组合所有测试的得分（keys已排序）：胜场 + 平局记半场"""
+    lo = bisect.bisect_left(keys, key)
+    hi = bisect.bisect_right(keys, key)
+    return (len(keys) - hi) + 0.5 * (hi - lo)
+
+
+def record_fingerprint(record):
+    """参与排名字段的指纹，用来判断已计入的测试是否被修改"""
+    data = json.dumps([pair_key(record), perf_tuple(record)], default=str)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def empty_state():
+    return {'version': STATE_VERSION, 'projects': {}}
+
+
+def load_state():
+    if not RATINGS_FILE.exists():
+        return empty_state()
+    with open(RATINGS_FILE, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    # 旧版本是顺序Elo的状态，换成胜场矩阵后从头计一遍
+    return state if state.get('version') == STATE_VERSION else empty_state()
+
+
+def save_state(state):
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = str(RATINGS_FILE) + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, RATINGS_FILE)
+
+
+class ProjectRatings:
+    """一个项目的胜场矩阵；各组合已计入测试的比较键按序保存在内存里，供二分查找"""
+
+    def __init__(self, pstate):
+        self.runs = pstate.setdefault('runs', {})
+        self.wins = pstate.setdefault('wins', {})
+        self.keys = defaultdict(list)
+        for run in self.runs.values():
+            self.keys[run['pair']].append(match_key(run['perf']))
+        for keys in self.keys.values():
+            keys.sort()
+
+    def play(self, pair, key, sign):
+        """把一次测试与其他组合所有测试的对局加进(sign=1)或减出(sign=-1)胜场矩阵"""
+        for other, keys in self.keys.items():
+            if other == pair or not keys:
+                continue
+            won = score_against(key, keys)
+            mine = self.wins.setdefault(pair, {})
+            theirs = self.wins.setdefault(other, {})
+            mine[other] = mine.get(other, 0.0) + sign * won
+            theirs[pair] = theirs.get(pair, 0.0) + sign * (len(keys) - won)
+            # 胜场都是0.5的倍数，浮点加减是精确的；没有对局了就删掉
+            if not mine[other] and not theirs[pair]:
+                del mine[other], theirs[pair]
+
+    def add(self, test_dir, record):
+        pair = pair_key(record)
+        perf = to_json_perf(perf_tuple(record))
+        key = match_key(perf)
+        self.play(pair, key, 1)
+        bisect.insort(self.keys[pair], key)
+        self.runs[test_dir] = {'pair': pair, 'perf': perf, 'fingerprint': record_fingerprint(record)}
+
+    def remove(self, test_dir):
+        run = self.runs.pop(test_dir)
+        key = match_key(run['perf'])
+        keys = self.keys[run['pair']]
+        del keys[bisect.bisect_left(keys, key)]
+        self.play(run['pair'], key, -1)
+
+    def games(self, pair):
+        return sum(w + self.wins[q][pair] for q, w in self.wins.get(pair, {}).items())
+
+
+def update_ratings(records, state=None):
+    """增量更新：只重算新增、修改或删除的测试自己的对局，返回(状态, 变化的测试数)"""
+    state = state or load_state()
+    current = defaultdict(dict)
+    for r in records:
+        if r.get('test_dir'):
+            current[project_key(r)][r['test_dir']] = r
+    changed = set()
+    for project in sorted(set(current) | set(state['projects'])):
+        runs = current.get(project, {})
+        book = ProjectRatings(state['projects'].setdefault(project, {}))
+        for test_dir in sorted(book.runs):
+            if test_dir not in runs or book.runs[test_dir]['fingerprint'] != record_fingerprint(runs[test_dir]):
+                book.remove(test_dir)
+                changed.add((project, test_dir))
+        for test_dir in sorted(runs):
+            if test_dir not in book.runs:
+                book.add(test_dir, runs[test_dir])
+                changed.add((project, test_dir))
+        if not book.runs:
+            del state['projects'][project]
+    return state, len(changed)
+
+
+def bradley_terry(wins):
+    """用MM迭代从胜场矩阵拟合Bradley-Terry强度，返回对数尺度(与Elo同量纲)"""
+    players = sorted(wins)
+    if not players:
+        return {}
+    strength = {p: 1.0 for p in players}
+    for _ in range(BT_ITERATIONS):
+        new = {}
+        for p in players:
+            total_wins = sum(wins[p].values())
+            denom = 0.0
+            for q, w in wins[p].items():
+                games = w + wins[q][p]
+                if games:
+                    denom += games / (strength[p] + strength[q])
+            # 先验：和强度为1的虚拟对手打一局平局，避免全胜/全负时发散
+            new[p] = (total_wins + 0.5) / (denom + 1.0 / (strength[p] + 1.0))
+        norm = math.exp(sum(math.log(v) for v in new.values()) / len(new))
+        strength = {p: v / norm for p, v in new.items()}
+    return {p: ELO_BASE + 400.0 * math.log10(s) for p, s in strength.items()}
+
+
+def rating_table(state):
+    """每个项目内按Bradley-Terry评分排序的组合列表"""
+    rows = []
+    for project, pstate in sorted(state['projects'].items()):
+        book = ProjectRatings(pstate)
+        bt = bradley_terry(book.wins)
+        runs = defaultdict(list)
+        for test_dir, run in sorted(book.runs.items()):
+            runs[run['pair']].append(test_dir)
+        for pair in sorted(runs, key=lambda p: (-bt.get(p, ELO_BASE), p)):
+            rows.append({'project': project, 'pair': pair, 'rating': round(bt.get(pair, ELO_BASE), 1),
+                         'games': int(book.games(pair)), 'runs': runs[pair]})
+    return rows
+
+
+def compute_rankings(records, state):
+    """从预加载的数组一次性算出所有排名"""
+    table = build_table(records)
+    names = [r.get('test_dir', '') for r in records]
+    return {
+        'lexicographic': [names[i] for i in lexicographic(table)],
+        'pareto_fronts': [[names[i] for i in front] for front in pareto_fronts(table)],
+        'ratings': rating_table(state),
+    }
+
+
+def write_rankings(records):
+    """更新胜场矩阵并写出results/rankings.json"""
+    state, changed = update_ratings(records)
+    save_state(state)
+    rankings = compute_rankings(records, state)
+    with open(RANKINGS_FILE, 'w', encoding='utf-8') as f:
+        json.dump(rankings, f, indent=2, ensure_ascii=False)
+    print(f"[+] Ratings updated for {changed} new/changed run(s)")
+    print(f"[+] Rankings saved: {RANKINGS_FILE}")
+    return rankings
+
+
+def main():
+    with open(RESULTS_DIR / 'benchmark_data.json', 'r', encoding='utf-8') as f:
+        records = json.load(f)
+    rankings = write_rankings(records)
+    if not records:
+        print("[-] No runs yet, nothing to rank")
+        return
+    print("\nPareto front #1:")
+    for name in rankings['pareto_fronts'][0]:
+        print(f"  - {name}")
+    print("\nBradley-Terry ratings:")
+    for i, row in enumerate(rankings['ratings'], 1):
+        print(f"  {i:2d}. {row['rating']:7.1f}  {row['project']}/{row['pair']} ({len(row['runs'])} runs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+参考扫描器 - 性能测试工具用来标定本机速度的固定负载
+只用标准库的asyncio connect扫描，实现保持不变（改了要升REFERENCE_VERSION），
+同一负载在不同机器上的耗时之比就是机器速度之比，calibration.py据此把各提交的成绩
+换算到基准机器上。参数和默认的扫描命令模板一致：-t 目标 -p 端口 -c 并发数，
+每个开放端口输出一行"<端口> open"。
+"""
+import sys
+import socket
+import asyncio
+import argparse
+
+import netem_proxy
+
+REFERENCE_VERSION = 1
+CONNECT_TIMEOUT = 1.0
+
+
+async def probe(host, port, limit):
+    async with limit:
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), CONNECT_TIMEOUT)
+        except (OSError, asyncio.TimeoutError):
+            return None
+        writer.close()
+        return port
+
+
+async def scan(host, ports, concurrency):
+    limit = asyncio.Semaphore(concurrency)
+    results = await asyncio.gather(*(probe(host, p, limit) for p in ports))
+    return [p for p in results if p is not None]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reference TCP connect scanner used for host calibration')
+    parser.add_argument('-t', '--target', required=True)
+    parser.add_argument('-p', '--ports', required=True)
+    parser.add_argument('-c', '--concurrency', type=int, default=200)
+    args = parser.parse_args()
+
+    try:
+        socket.getaddrinfo(args.target, None)
+        ports = netem_proxy.parse_ports(args.ports)
+    except (socket.gaierror, ValueError) as e:
+        print(f"invalid target or ports: {e}", file=sys.stderr)
+        return 2
+    for port in asyncio.run(scan(args.target, ports, args.concurrency)):
+        print(f"{port} open")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
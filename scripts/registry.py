@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+引擎/客户端/推理档位 规范化注册表
+stats.json里的写法五花八门（"GPT-5 (hight)"、config写成日期、目录名里dorid=Factory Droid），
+这里在导入时统一解析一次，得到稠密整数ID和规范名称，后续聚合直接按整数分组。
+"""
+import re
+import sys
+import json
+
+import workspace
+
+RESULTS_DIR = workspace.results_dir()
+INDEX_FILE = RESULTS_DIR / 'registry_index.json'
+
+# 规范名称 -> 别名（别名比较前会经过norm()归一化）
+ENGINES = [
+    ('GPT-5', ['gpt5', 'gpt-5']),
+    ('GPT-5-Codex', ['gpt5codex', 'gpt-5-codex']),
+    ('Claude Sonnet 4.5', ['sonnet4.5', 'claudesonnet4.5', 'sonnet-4.5']),
+    ('Claude Opus 4.1', ['opus4.1', 'claudeopus4.1', 'opus-4.1']),
+    ('GLM-4.6', ['glm4.6', 'glm-4.6']),
+    ('Grok Code Fast 1', ['grok', 'grokcodefast1', 'grok-code-fast-1']),
+    ('KAT-Coder', ['kat', 'katcoder']),
+    ('Qwen Coder', ['qwen', 'qwencoder', 'qwencodermodel']),
+    ('Code Supernova', ['supernova', 'codesupernova']),
+]
+
+CLIENTS = [
+    ('Codex CLI', ['codex', 'codexcli']),
+    ('Factory Droid', ['droid', 'dorid', 'factorydroid', 'factory']),
+    ('Claude Code', ['claudecode', 'claude-code']),
+    ('Kilo Code', ['kilo', 'kilocode']),
+    ('Roo Code', ['roo', 'roocode']),
+    ('Cline', ['cline']),
+    ('Qwen CLI', ['qwen-cli', 'qwencli']),
+]
+
+LEVELS = [
+    ('default', ['default', '']),
+    ('minimal', ['minimal']),
+    ('low', ['low']),
+    ('medium', ['medium', 'med']),
+    ('high', ['high', 'hight']),
+]
+
+DATE_RE = re.compile(r'(\d{4})[-_/.](\d{1,2})[-_/.](\d{1,2})')
+PAREN_RE = re.compile(r'\(([^)]*)\)')
+
+
+def norm(text):
+    """别名比较用：小写，去掉空格、下划线、连字符和括号"""
+    return re.sub(r'[\s_\-()]+', '', (text or '').lower())
+
+
+class Table:
+    """名称 <-> 稠密整数ID；已知名称按注册顺序编号，未知名称追加在后面"""
+
+    def __init__(self, entries):
+        self.names = []
+        self.ids = {}
+        self.aliases = {}
+        for name, aliases in entries:
+            idx = self.add(name)
+            for alias in aliases + [name]:
+                self.aliases[norm(alias)] = idx
+
+    def add(self, name):
+        if name not in self.ids:
+            self.ids[name] = len(self.names)
+            self.names.append(name)
+        return self.ids[name]
+
+    def lookup(self, text):
+        """按别名查找，找不到返回None"""
+        return self.aliases.get(norm(text))
+
+    def intern(self, text):
+        """按别名查找，找不到则把原始字符串登记为新条目"""
+        idx = self.lookup(text)
+        if idx is None:
+            idx = self.add(text.strip() or 'Unknown')
+            self.aliases[norm(text)] = idx
+        return idx
+
+
+engines = Table(ENGINES)
+clients = Table(CLIENTS)
+levels = Table(LEVELS)
+
+
+def extract_date(text):
+    """从字符串中提取日期，返回YYYY-MM-DD或None"""
+    m = DATE_RE.search(text or '')
+    if not m:
+        return None
+    return f"{int(m.group(1)):04d}-{int(m.group(2)):02d}-{int(m.group(3)):02d}"
+
+
+def split_level(tokens):
+    """从token列表里拿出推理档位，返回(档位ID或None, 剩余token)"""
+    level = None
+    rest = []
+    for tok in tokens:
+        idx = levels.lookup(tok) if tok else None
+        if idx is not None and level is None:
+            level = idx
+        else:
+            rest.append(tok)
+    return level, rest
+
+
+def parse_directory_name(dirname):
+    """解析测试目录名：<engine>[_<level>]-<client>[-YYYY-MM-DD]
+
+    客户端从尾部按最长别名匹配（例如qwen-qwen-cli的客户端是qwen-cli）。
+    """
+    date = extract_date(dirname)
+    base = DATE_RE.sub('', dirname).strip('-_')
+    parts = base.split('-')
+    client = None
+    engine_parts = parts
+    for n in range(min(3, len(parts) - 1), 0, -1):
+        idx = clients.lookup('-'.join(parts[-n:]))
+        if idx is not None:
+            client = idx
+            engine_parts = parts[:-n]
+            break
+    tokens = '_'.join(engine_parts).split('_')
+    level, rest = split_level(tokens)
+    engine = engines.lookup(''.join(rest))
+    if engine is None and rest:
+        engine = engines.lookup(rest[0])
+    return {'engine_id': engine, 'client_id': client, 'level_id': level, 'date': date}
+
+
+def resolve_engine(record, inner_tokens):
+    """engine字段 + 括号里的修饰 + config，从最具体到最宽泛依次匹配"""
+    base = PAREN_RE.sub('', record.get('engine') or '')
+    modifiers = ''.join(t for t in inner_tokens if levels.lookup(t) is None)
+    config = record.get('config') or ''
+    for candidate in (base + modifiers + config, base + modifiers, base + config, base):
+        idx = engines.lookup(candidate)
+        if idx is not None:
+            return idx
+    return None
+
+
+def canonicalize(record):
+    """解析单条记录，返回canonical字段（整数ID + 规范名称 + 日期）"""
+    test_dir = record.get('test_dir') or ''
+    from_dir = parse_directory_name(test_dir) if test_dir else {}
+    config = record.get('config') or ''
+
+    m = PAREN_RE.search(record.get('engine') or '')
+    inner_tokens = re.split(r'[\s_\-]+', m.group(1)) if m else []
+
+    engine = resolve_engine(record, inner_tokens)
+    if engine is None:
+        engine = from_dir.get('engine_id')
+    if engine is None:
+        engine = engines.intern(record.get('engine') or 'Unknown')
+
+    client = clients.lookup(record.get('client') or '')
+    if client is None:
+        client = from_dir.get('client_id')
+    if client is None:
+        client = clients.intern(record.get('client') or 'Unknown')
+
+    level, _ = split_level(inner_tokens)
+    if level is None:
+        level, _ = split_level(re.split(r'[\s_\-]+', config))
+    if level is None:
+        level = from_dir.get('level_id')
+    if level is None:
+        level = levels.ids['default']
+
+    date = extract_date(config) or from_dir.get('date')
+    return {
+        'engine_id': engine,
+        'client_id': client,
+        'level_id': level,
+        'engine': engines.names[engine],
+        'client': clients.names[client],
+        'level': levels.names[level],
+        'run_date': date or (record.get('metadata') or {}).get('test_date'),
+    }
+
+
+def canonical(record):
+    """取记录的canonical字段；导入时已解析过就直接复用"""
+    c = record.get('canonical')
+    if c is None:
+        c = record['canonical'] = canonicalize(record)
+    return c
+
+
+def pair_label(record):
+    """组合名称：engine + client，推理档位不同的测试不算同一组合（与trends.series_key一致）"""
+    c = canonical(record)
+    label = f"{c['engine']} + {c['client']}"
+    return label if c['level'] == 'default' else f"{label} ({c['level']})"
+
+
+def annotate(records):
+    """导入时对所有记录解析一次，写入record['canonical']"""
+    for r in records:
+        r['canonical'] = canonicalize(r)
+    return records
+
+
+def index():
+    """当前注册表的ID -> 名称映射"""
+    return {'engines': list(engines.names), 'clients': list(clients.names),
+            'levels': list(levels.names)}
+
+
+def save_index(path=None):
+    path = path or INDEX_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(index(), f, indent=2, ensure_ascii=False)
+    return path
+
+
+def main():
+    """打印每个测试目录的解析结果，方便核对别名表"""
+    bench_dir = workspace.bench_dir()
+    for stats_file in sorted(bench_dir.glob('*/stats.json')):
+        with open(stats_file, 'r', encoding='utf-8') as f:
+            record = json.load(f)
+        c = canonicalize(record)
+        print(f"{record.get('test_dir', ''):30s} -> {c['engine']:18s} | {c['client']:14s} | "
+              f"{c['level']:8s} | {c['run_date'] or '-'}")
+    if len(sys.argv) > 1 and sys.argv[1] == '--save':
+        print(f"[+] Registry index saved: {save_index()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+回归检测 - 同一项目里同一engine+client+档位的新测试和历史测试比较
+不再靠人工写"相比2025-10-10版本…节省4.5倍"：对每个有历史的测试，
+把时间、tokens和实测扫描速度和之前各次测试的分布比较。速度用相对本机参考扫描器的
+归一化值（perf.normalized_speed），换了机器也能比；不用人工记录的performance_test。
+之前至少3次时用稳健z分数（中位数/MAD），次数更少时按倍数阈值判断，
+结果写入 results/regressions.json，文本报告和HTML报告里各有一个汇总块。
+"""
+import os
+import json
+import html
+import argparse
+import statistics
+from collections import defaultdict
+
+import trends
+import workspace
+
+RESULTS_DIR = workspace.results_dir()
+REGRESSIONS_FILE = RESULTS_DIR / 'regressions.json'
+
+# (字段, 英文名, 中文名, 越小越好)
+METRICS = [
+    ('time_minutes', 'Time', '时间', True),
+    ('tokens', 'Tokens', 'Tokens', True),
+    ('normalized_speed', 'Speed vs reference', '相对参考扫描器速度', False),
+]
+
+MIN_HISTORY_Z = 3       # 历史次数达到这个数才用z分数
+Z_THRESHOLD = 3.5       # 稳健z分数的显著性阈值（Iglewicz-Hoaglin）
+RATIO_THRESHOLD = 1.5   # 历史太少时，变化超过1.5倍才算显著
+MAD_SCALE = 1.4826      # MAD换算成正态分布标准差
+
+# 文本报告每个组合的标记：只有退步、只有改进、有退步也有改进、没有显著变化
+FLAGS = {
+    frozenset({'regression'}): '▼',
+    frozenset({'improvement'}): '▲',
+    frozenset({'regression', 'improvement'}): '◆',
+    frozenset(): '=',
+}
+
+
+def build_series(records):
+    """records -> {series_key: [point...]}，按测试日期排序"""
+    series = defaultdict(list)
+    for record in records:
+        point = trends.make_point(record)
+        series[point['key']].append(point)
+    for points in series.values():
+        points.sort(key=lambda p: (p['test_date'] or '', p['test_dir']))
+    return dict(series)
+
+
+def compare_metric(value, history, lower_better):
+    """和历史值比较，返回变化描述；不显著返回None"""
+    history = [h for h in history if h]
+    if not value or not history:
+        return None
+    baseline = statistics.median(history)
+    ratio = value / baseline
+    change = {'value': value, 'baseline': baseline, 'ratio': round(ratio, 3), 'history': len(history)}
+    z = None
+    if len(history) >= MIN_HISTORY_Z:
+        mad = statistics.median(abs(h - baseline) for h in history) * MAD_SCALE
+        if mad > 0:
+            z = (value - baseline) / mad
+            change['z'] = round(z, 2)
+    if z is not None:
+        change['method'] = 'robust-z'
+        significant = abs(z) >= Z_THRESHOLD
+    else:
+        change['method'] = 'ratio'
+        significant = ratio >= RATIO_THRESHOLD or ratio <= 1 / RATIO_THRESHOLD
+    if not significant:
+        return None
+    worse = ratio > 1 if lower_better else ratio < 1
+    change['direction'] = 'regression' if worse else 'improvement'
+    return change
+
+
+def detect(records):
+    """每个有历史测试的记录都和它之前的测试比较，changes里只放显著的变化"""
+    entries = []
+    for key, points in build_series(records).items():
+        for i, point in enumerate(points[1:], 1):
+            prior = points[:i]
+            changes = {}
+            for metric, _, _, lower_better in METRICS:
+                change = compare_metric(point[metric], [p[metric] for p in prior], lower_better)
+                if change:
+                    changes[metric] = change
+            entries.append({
+                'key': key,
+                'test_dir': point['test_dir'],
+                'test_date': point['test_date'],
+                'prior_runs': [p['test_dir'] for p in prior],
+                'latest': i == len(points) - 1,
+                'changes': changes,
+            })
+    return entries
+
+
+def latest(entries):
+    """报告里只列每个组合最新一次测试的结论"""
+    return [e for e in entries if e['latest']]
+
+
+def fmt(metric, value):
+    return trends.fmt(value, metric) + (' min' if metric == 'time_minutes' else '')
+
+
+def describe(change, metric, lang):
+    label = next(m[2] if lang == 'zh' else m[1] for m in METRICS if m[0] == metric)
+    if lang == 'zh':
+        direction = '退步' if change['direction'] == 'regression' else '改进'
+    else:
+        direction = change['direction']
+    stat = f"z={change['z']:+.1f}" if 'z' in change else f"{change['history']} prior"
+    return (f"{label}: {fmt(metric, change['value'])} vs {fmt(metric, change['baseline'])} "
+            f"×{change['ratio']:.2f} {direction} ({stat})")
+
+
+def report_lines(records, lang='en'):
+    """文本报告里的汇总块"""
+    entries = latest(detect(records))
+    title = '与历史测试相比' if lang == 'zh' else 'CHANGES VS PRIOR RUNS'
+    lines = ['', f'{title:^62s}', '━' * 60, '']
+    if not entries:
+        lines.append('还没有同一组合的多次测试' if lang == 'zh' else 'No engine+client has been tested more than once yet.')
+    for e in entries:
+        n = len(e['prior_runs'])
+        flag = FLAGS[frozenset(c['direction'] for c in e['changes'].values())]
+        prior = f'{n}次历史测试' if lang == 'zh' else f"{n} prior run{'s' if n > 1 else ''}"
+        lines.append(f"{flag} {e['key']}  {e['test_date']} ({prior})")
+        if not e['changes']:
+            lines.append('    无显著变化' if lang == 'zh' else '    no significant change')
+        for metric, change in e['changes'].items():
+            lines.append('    ' + describe(change, metric, lang))
+    lines.append('')
+    return '\n'.join(lines)
+
+
+def html_block(records, lang='en'):
+    """HTML报告里的汇总块（两种HTML报告共用）"""
+    entries = latest(detect(records))
+    title = '📉 与历史测试相比' if lang == 'zh' else '📉 Changes vs Prior Runs'
+    out = [f'<section id="regressions"><h2>{title}</h2>']
+    if not entries:
+        empty = '还没有同一组合的多次测试' if lang == 'zh' else 'No engine+client has been tested more than once yet.'
+        out.append(f'<p>{empty}</p></section>')
+        return '\n'.join(out)
+    out.append('<table><thead><tr>')
+    heads = ['组合', '测试', '变化'] if lang == 'zh' else ['Project | Engine | Client | Level', 'Run', 'Changes']
+    out.append(''.join(f'<th>{h}</th>' for h in heads) + '</tr></thead><tbody>')
+    for e in entries:
+        if e['changes']:
+            items = []
+            for metric, change in e['changes'].items():
+                color = '#ff0055' if change['direction'] == 'regression' else '#00ff41'
+                items.append(f'<span style="color: {color};">{html.escape(describe(change, metric, lang))}</span>')
+            cell = '<br>'.join(items)
+        else:
+            cell = '无显著变化' if lang == 'zh' else 'no significant change'
+        out.append(f"<tr><td>{html.escape(e['key'])}</td>"
+                   f"<td>{html.escape(e['test_dir'])} ({html.escape(str(e['test_date']))})</td><td>{cell}</td></tr>")
+    out.append('</tbody></table></section>')
+    return '\n'.join(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Detect regressions/improvements against prior runs of the same pair')
+    parser.add_argument('--all', action='store_true', help='print every run with history, not only the latest')
+    args = parser.parse_args()
+
+    with open(RESULTS_DIR / 'benchmark_data.json', 'r', encoding='utf-8') as f:
+        records = json.load(f)
+    entries = detect(records)
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = str(REGRESSIONS_FILE) + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(entries, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, REGRESSIONS_FILE)
+
+    shown = entries if args.all else latest(entries)
+    regressions = sum(1 for e in shown for c in e['changes'].values() if c['direction'] == 'regression')
+    print(report_lines(records) if not args.all else '\n'.join(
+        f"{e['key']} {e['test_dir']}: " + ('; '.join(describe(c, m, 'en') for m, c in e['changes'].items())
+                                           or 'no significant change') for e in shown))
+    print(f"[+] {len(shown)} run(s) with history, {regressions} regression(s)")
+    print(f"[+] Regressions saved: {REGRESSIONS_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,519 @@
+#!/usr/bin/env python3
+"""
+离线回放 - 把录下来的模型响应交给本地的假模型服务，离线重跑一次客户端会话
+测出一次测试的墙钟时间里有多少是客户端自己的开销（执行工具、读写文件、拼上下文），
+多少是模型延迟。假服务说OpenAI/Anthropic风格的HTTP API，按录制顺序原样返回
+响应（SSE流也原样返回），默认不等待（模型延迟为0），所以客户端在每两次请求
+之间花的时间就是它自己的开销，Factory Droid、Codex CLI、Roo Code可以只比客户端效率。
+
+  replay_harness.py record TEST_DIR --upstream URL --prompt TEXT
+        客户端通过本地代理访问真实的模型API，请求和响应录进 <测试目录>/transcript.jsonl
+  replay_harness.py replay [TEST_DIR...] [--client NAME] [-n 3]
+        回放录制的会话，结果写入 results/replay_results.json
+  replay_harness.py serve TRANSCRIPT
+        只启动假服务，手动运行客户端（例如只能在IDE里运行的Roo Code）
+
+客户端命令按registry里的规范名称查CLIENTS，workspace.json的replay_clients可以覆盖或追加，
+命令里可以用 {prompt} {workdir} {base_url}。客户端通过环境变量找到假服务：
+OPENAI_BASE_URL / OPENAI_API_BASE / ANTHROPIC_BASE_URL，密钥是假的。
+回放时客户端真的会执行会话里的工具调用（写文件、跑编译），所以在临时目录里运行。
+"""
+import os
+import sys
+import json
+import time
+import shlex
+import signal
+import shutil
+import argparse
+import resource
+import tempfile
+import threading
+import statistics
+import subprocess
+import urllib.error
+import urllib.request
+from datetime import datetime
+from collections import defaultdict, deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import registry
+import stats_io
+import workspace
+from blob_store import iter_run_dirs, hash_file
+
+BENCH_DIR = workspace.bench_dir()
+RESULTS_DIR = workspace.results_dir()
+RESULTS_FILE = RESULTS_DIR / 'replay_results.json'
+TRANSCRIPT_NAME = 'transcript.jsonl'
+
+# 模型调用的路径（OpenAI chat/responses、Anthropic messages），其余请求（/models等）不算步骤
+MODEL_PATHS = ('/chat/completions', '/responses', '/messages', '/completions')
+# 不转发/不回放的逐跳头，响应体录的是解压后的内容
+HOP_HEADERS = {'host', 'connection', 'content-length', 'accept-encoding', 'content-encoding',
+               'transfer-encoding', 'keep-alive'}
+FAKE_KEY = 'sk-replay'
+
+# 无头运行的命令；Roo Code只有IDE扩展，在workspace.json的replay_clients里配置或用serve手动跑
+CLIENTS = {
+    'Codex CLI': {'cmd': ['codex', 'exec', '--skip-git-repo-check', '--full-auto', '{prompt}']},
+    'Factory Droid': {'cmd': ['droid', 'exec', '--auto', 'high', '{prompt}']},
+}
+
+
+def is_model_call(path):
+    return path.split('?', 1)[0].rstrip('/').endswith(MODEL_PATHS)
+
+
+def transcript_path(run_dir):
+    return os.path.join(run_dir, TRANSCRIPT_NAME)
+
+
+def load_transcript(path):
+    """返回(会话头, 交互列表)；第一行是{"type": "session", ...}"""
+    header, exchanges = {}, []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if item.get('type') == 'session':
+                header = item
+            else:
+                exchanges.append(item)
+    return header, exchanges
+
+
+class ReplayState:
+    """假服务的状态：按(方法, 路径)排队的录制响应和每个请求的时间点"""
+
+    def __init__(self, exchanges, latency='zero', scale=1.0):
+        self.queues = defaultdict(deque)
+        for e in exchanges:
+            self.queues[(e['method'], e['path'].split('?', 1)[0])].append(e)
+        self.latency = latency
+        self.scale = scale
+        self.lock = threading.Lock()
+        self.steps = []
+        self.unmatched = []
+
+    def next_response(self, method, path):
+        with self.lock:
+            queue = self.queues.get((method, path.split('?', 1)[0]))
+            return queue.popleft() if queue else None
+
+    def unused(self):
+        return sum(1 for (m, p), q in self.queues.items() for e in q if is_model_call(p))
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def handle_any(self):
+        state = self.server.state
+        arrive = time.perf_counter()
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        exchange = state.next_response(self.command, self.path)
+        if exchange is None:
+            # 客户端发了录制里没有的请求：会话已经和录制时不一样了
+            state.unmatched.append(f"{self.command} {self.path}")
+            status, headers = 404, {'Content-Type': 'application/json'}
+            body = json.dumps({'error': {'type': 'replay_diverged',
+                                         'message': f'no recorded response for {self.command} {self.path}'}})
+        else:
+            if state.latency == 'recorded':
+                time.sleep((exchange.get('latency_s') or 0) * state.scale)
+            status, headers, body = exchange['status'], exchange.get('headers') or {}, exchange['body']
+        data = body.encode('utf-8')
+        self.send_response(status)
+        for name, value in headers.items():
+            if name.lower() not in HOP_HEADERS:
+                self.send_header(name, value)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        self.wfile.flush()
+        with state.lock:
+            state.steps.append({'path': self.path, 'model_call': is_model_call(self.path),
+                                'matched': exchange is not None,
+                                'arrive': arrive, 'done': time.perf_counter()})
+
+    do_GET = do_POST = do_PUT = do_DELETE = handle_any
+
+
+class RecordHandler(BaseHTTPRequestHandler):
+    """录制代理：转发到上游，完整读完响应后写一条交互记录再返回给客户端"""
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def handle_any(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        payload = self.rfile.read(length) if length else None
+        headers = {k: v for k, v in self.headers.items() if k.lower() not in HOP_HEADERS}
+        request = urllib.request.Request(server.upstream + self.path, data=payload, headers=headers,
+                                         method=self.command)
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=600) as resp:
+                status, resp_headers, body = resp.status, dict(resp.headers), resp.read()
+        except urllib.error.HTTPError as e:
+            status, resp_headers, body = e.code, dict(e.headers), e.read()
+        except (urllib.error.URLError, OSError) as e:
+            status, resp_headers = 502, {'Content-Type': 'application/json'}
+            body = json.dumps({'error': {'type': 'upstream_error', 'message': str(e)}}).encode('utf-8')
+        latency = time.perf_counter() - start
+
+        kept = {k: v for k, v in resp_headers.items()
+                if k.lower() not in HOP_HEADERS and k.lower() in ('content-type', 'x-request-id', 'request-id')}
+        request_json = None
+        if payload:
+            try:
+                request_json = json.loads(payload)
+            except ValueError:
+                pass
+        with server.lock:
+            server.seq += 1
+            entry = {'type': 'exchange', 'seq': server.seq, 'method': self.command, 'path': self.path,
+                     'model': (request_json or {}).get('model'),
+                     'messages': len((request_json or {}).get('messages') or (request_json or {}).get('input') or []),
+                     'status': status, 'headers': kept, 'latency_s': round(latency, 4),
+                     'body': body.decode('utf-8', errors='replace')}
+            server.output.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            server.output.flush()
+
+        self.send_response(status)
+        for name, value in kept.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PUT = do_DELETE = handle_any
+
+
+def start_server(handler, **attrs):
+    """在后台线程里启动本机HTTP服务（端口由系统分配），返回(服务, base_url)"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    for key, value in attrs.items():
+        setattr(server, key, value)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def client_env(base_url):
+    env = dict(os.environ)
+    env.update({
+        'OPENAI_BASE_URL': base_url + '/v1',
+        'OPENAI_API_BASE': base_url + '/v1',
+        'OPENAI_API_KEY': env.get('OPENAI_API_KEY') if env.get('AI_PK_REPLAY_KEEP_KEYS') else FAKE_KEY,
+        'ANTHROPIC_BASE_URL': base_url,
+        'ANTHROPIC_API_KEY': env.get('ANTHROPIC_API_KEY') if env.get('AI_PK_REPLAY_KEEP_KEYS') else FAKE_KEY,
+    })
+    return {k: v for k, v in env.items() if v is not None}
+
+
+def client_table():
+    table = dict(CLIENTS)
+    table.update(workspace.load_config().get('replay_clients') or {})
+    return table
+
+
+def client_command(name, prompt, workdir, base_url):
+    """按客户端名称（或别名）生成命令，没有配置返回None"""
+    table = client_table()
+    spec = table.get(name)
+    if spec is None:
+        idx = registry.clients.lookup(name)
+        spec = table.get(registry.clients.names[idx]) if idx is not None else None
+    if spec is None:
+        return None
+    cmd = spec['cmd'] if isinstance(spec, dict) else spec
+    if isinstance(cmd, str):
+        cmd = shlex.split(cmd)
+    fields = {'prompt': prompt, 'workdir': workdir, 'base_url': base_url}
+    return [part.format(**fields) for part in cmd]
+
+
+def run_client(cmd, env, workdir, timeout, log_path):
+    """运行客户端直到退出，返回(开始, 结束, 状态, 退出码, 子进程CPU时间)"""
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    with open(log_path, 'wb') as log:
+        start = time.perf_counter()
+        proc = subprocess.Popen(cmd, cwd=workdir, env=env, stdin=subprocess.DEVNULL,
+                                stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+        try:
+            returncode = proc.wait(timeout=timeout)
+            status = 'ok' if returncode == 0 else 'exit'
+        except subprocess.TimeoutExpired:
+            os.killpg(proc.pid, signal.SIGKILL)
+            returncode = proc.wait()
+            status = 'timeout'
+        end = time.perf_counter()
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = {'user_s': round(after.ru_utime - before.ru_utime, 3),
+           'sys_s': round(after.ru_stime - before.ru_stime, 3)}
+    return start, end, status, returncode, cpu
+
+
+def analyze(start, end, steps):
+    """把一次回放拆成客户端时间和服务端时间
+
+    每个请求的client_s是客户端从上一个响应发完（或进程启动）到发出这个请求的时间；
+    并发请求的服务时间按区间合并，墙钟时间减去服务时间就是客户端开销。
+    """
+    steps = sorted(steps, key=lambda s: s['arrive'])
+    served, cursor, out = 0.0, start, []
+    for i, s in enumerate(steps, 1):
+        out.append({'seq': i, 'path': s['path'], 'model_call': s['model_call'], 'matched': s['matched'],
+                    'client_s': round(max(0.0, s['arrive'] - cursor), 4),
+                    'server_s': round(s['done'] - s['arrive'], 4)})
+        served += max(0.0, s['done'] - max(s['arrive'], cursor))
+        cursor = max(cursor, s['done'])
+    wall = end - start
+    client = [s['client_s'] for s in out if s['model_call']]
+    return {
+        'wall_s': round(wall, 3),
+        'server_s': round(served, 3),
+        'overhead_s': round(wall - served, 3),
+        'overhead_ratio': round((wall - served) / wall, 4) if wall > 0 else None,
+        'requests': len(out),
+        'model_calls': len(client),
+        'startup_s': round(steps[0]['arrive'] - start, 4) if steps else None,
+        'teardown_s': round(end - cursor, 4) if steps else None,
+        'step_median_s': round(statistics.median(client), 4) if client else None,
+        'step_max_s': round(max(client), 4) if client else None,
+    }, out
+
+
+def replay_once(exchanges, cmd_for, timeout, latency, scale, keep_dir=None):
+    state = ReplayState(exchanges, latency, scale)
+    server, base_url = start_server(ReplayHandler, state=state)
+    workdir = keep_dir or tempfile.mkdtemp(prefix='ai-pk-replay-')
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        cmd = cmd_for(workdir, base_url)
+        log_path = keep_dir + '.log' if keep_dir else os.devnull
+        start, end, status, returncode, cpu = run_client(cmd, client_env(base_url), workdir, timeout, log_path)
+    finally:
+        server.shutdown()
+        server.server_close()
+        if not keep_dir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    summary, steps = analyze(start, end, state.steps)
+    summary.update({'status': 'diverged' if state.unmatched and status == 'ok' else status,
+                    'returncode': returncode, 'cpu': cpu,
+                    'unmatched': state.unmatched[:10], 'unused_model_calls': state.unused()})
+    if keep_dir:
+        summary['log'] = os.path.abspath(log_path)
+    return summary, steps
+
+
+def replay_run(run_dir, client, prompt, args):
+    """回放一个测试目录的录制会话repeat次，返回结果条目（取开销中位数那一次的逐步明细）"""
+    path = transcript_path(run_dir)
+    header, exchanges = load_transcript(path)
+    prompt = prompt or header.get('prompt')
+    if not prompt:
+        raise ValueError('no prompt in the transcript header (use --prompt)')
+
+    def cmd_for(workdir, base_url):
+        cmd = client_command(client, prompt, workdir, base_url)
+        if cmd is None:
+            raise ValueError(f"no command for client '{client}' (add it to replay_clients in workspace.json)")
+        return cmd
+
+    runs = []
+    for i in range(args.repeat):
+        keep = os.path.join(args.keep, f"{os.path.basename(run_dir)}-{i}") if args.keep else None
+        runs.append(replay_once(exchanges, cmd_for, args.timeout, args.latency, args.scale, keep))
+    ok = [r for r in runs if r[0]['status'] in ('ok', 'exit')] or runs
+    median = statistics.median(r[0]['overhead_s'] for r in ok)
+    summary, steps = min(ok, key=lambda r: abs(r[0]['overhead_s'] - median))
+    recorded = sum(e.get('latency_s') or 0 for e in exchanges if is_model_call(e['path']))
+    return {
+        'test_dir': os.path.basename(run_dir),
+        'client': client,
+        'transcript_sha256': hash_file(path),
+        'replayed_at': datetime.now().isoformat(timespec='seconds'),
+        'latency': args.latency,
+        'recorded_model_s': round(recorded, 3),
+        'overhead_s_median': round(median, 3),
+        'overhead_per_call_s': round(median / summary['model_calls'], 4) if summary['model_calls'] else None,
+        'runs': [r[0] for r in runs],
+        'steps': steps,
+    }
+
+
+def print_entry(e):
+    s = min(e['runs'], key=lambda r: abs(r['overhead_s'] - e['overhead_s_median']))
+    mark = '+' if s['status'] == 'ok' else '!'
+    per_call = f"{e['overhead_per_call_s']:.3f}s/call" if e['overhead_per_call_s'] is not None else '-'
+    print(f"[{mark}] {e['test_dir']:32s} {e['client']:14s} overhead {e['overhead_s_median']:8.2f}s "
+          f"({per_call}, {s['model_calls']} calls, startup {s['startup_s'] or 0:.2f}s, "
+          f"cpu {s['cpu']['user_s'] + s['cpu']['sys_s']:.1f}s) {s['status']}"
+          + (f", {len(s['unmatched'])} unmatched" if s['unmatched'] else ''))
+
+
+def compare(results):
+    """按客户端汇总：每次模型调用的客户端开销中位数（不同会话长度可比）"""
+    by_client = defaultdict(list)
+    for e in results.values():
+        if e['overhead_per_call_s'] is not None:
+            by_client[e['client']].append(e)
+    rows = []
+    for client, entries in by_client.items():
+        rows.append((statistics.median(e['overhead_per_call_s'] for e in entries), client,
+                     len(entries), sum(e['overhead_s_median'] for e in entries)))
+    print("\n[*] Client overhead (median per model call):")
+    for per_call, client, n, total in sorted(rows):
+        print(f"    {client:16s} {per_call:8.3f}s/call  {n} session(s), {total:.1f}s total")
+
+
+def cmd_record(args):
+    run_dir = str(BENCH_DIR / args.test_dir)
+    path = transcript_path(run_dir)
+    if os.path.exists(path) and not args.force:
+        print(f"[!] {path} exists (use --force to overwrite)")
+        return 1
+    stats = stats_io.load_stats(args.test_dir, BENCH_DIR) or {'test_dir': args.test_dir}
+    client = args.client or registry.canonical(stats)['client']
+    # 先确认有客户端命令，再开临时文件和工作目录
+    if not args.serve_only and client_command(client, args.prompt, '', '') is None:
+        print(f"[!] No command for client '{client}' (use --serve-only and run it by hand)")
+        return 1
+    tmp = path + '.tmp'
+    workdir = None if args.serve_only else (args.workdir or tempfile.mkdtemp(prefix='ai-pk-record-'))
+    saved = False
+    try:
+        with open(tmp, 'w', encoding='utf-8') as output:
+            header = {'type': 'session', 'prompt': args.prompt, 'client': client, 'upstream': args.upstream,
+                      'recorded_at': datetime.now().isoformat(timespec='seconds')}
+            output.write(json.dumps(header, ensure_ascii=False) + '\n')
+            server, base_url = start_server(RecordHandler, upstream=args.upstream.rstrip('/'), output=output,
+                                            lock=threading.Lock(), seq=0)
+            try:
+                if args.serve_only:
+                    print(f"[*] Recording proxy at {base_url} -> {args.upstream}, Ctrl+C to stop")
+                    print(f"    OPENAI_BASE_URL={base_url}/v1 ANTHROPIC_BASE_URL={base_url}")
+                    try:
+                        while True:
+                            time.sleep(1)
+                    except KeyboardInterrupt:
+                        pass
+                else:
+                    cmd = client_command(client, args.prompt, workdir, base_url)
+                    print(f"[*] Recording {client} in {workdir} via {base_url}")
+                    _, _, status, returncode, _ = run_client(cmd, client_env(base_url), workdir, args.timeout,
+                                                             os.path.join(workdir, 'client.log'))
+                    print(f"[*] Client finished: {status} (exit {returncode})")
+            finally:
+                server.shutdown()
+                server.server_close()
+        os.replace(tmp, path)
+        saved = True
+    finally:
+        if not saved and os.path.exists(tmp):
+            os.remove(tmp)
+        # 自己建的临时工作目录用完就删；要保留客户端的产物和client.log请用--workdir
+        if workdir and not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    print(f"[+] Transcript saved: {path} ({server.seq} exchange(s))")
+    return 0
+
+
+def cmd_serve(args):
+    header, exchanges = load_transcript(args.transcript)
+    state = ReplayState(exchanges, args.latency, args.scale)
+    server, base_url = start_server(ReplayHandler, state=state)
+    print(f"[*] Replaying {len(exchanges)} exchange(s) at {base_url}, Ctrl+C to stop")
+    print(f"    OPENAI_BASE_URL={base_url}/v1 ANTHROPIC_BASE_URL={base_url} OPENAI_API_KEY={FAKE_KEY}")
+    if header.get('prompt'):
+        print(f"    prompt: {header['prompt']}")
+    start = time.perf_counter()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    server.shutdown()
+    summary, _ = analyze(start, time.perf_counter(), state.steps)
+    print(f"\n[+] {summary['model_calls']} model call(s), server {summary['server_s']:.2f}s, "
+          f"client {summary['overhead_s']:.2f}s (includes the time before you started the client)")
+    return 0
+
+
+def cmd_replay(args):
+    results = {}
+    if RESULTS_FILE.exists():
+        with open(RESULTS_FILE, 'r', encoding='utf-8') as f:
+            results = json.load(f)
+    run_dirs = [d for d in iter_run_dirs(BENCH_DIR)
+                if (not args.test_dirs or os.path.basename(d) in args.test_dirs)
+                and os.path.exists(transcript_path(d))]
+    if not run_dirs:
+        print(f"[-] No {TRANSCRIPT_NAME} found (record one with: replay_harness.py record TEST_DIR ...)")
+        return 1
+    for run_dir in run_dirs:
+        test_dir = os.path.basename(run_dir)
+        header, _ = load_transcript(transcript_path(run_dir))
+        stats = stats_io.load_stats(test_dir, BENCH_DIR) or {'test_dir': test_dir}
+        clients = args.client or [header.get('client') or registry.canonical(stats)['client']]
+        for client in clients:
+            try:
+                entry = replay_run(run_dir, client, args.prompt, args)
+            except (ValueError, OSError) as e:
+                print(f"[!] {test_dir} [{client}]: {e}")
+                continue
+            results[f"{test_dir}|{client}"] = entry
+            print_entry(entry)
+    stats_io.write_json_atomic(RESULTS_FILE, results)
+    compare(results)
+    print(f"[+] Replay results saved: {RESULTS_FILE}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded model responses to measure client overhead offline')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('record', help='record a session through a proxy to the real API')
+    p.add_argument('test_dir')
+    p.add_argument('--upstream', required=True, help='real API base, e.g. https://api.openai.com')
+    p.add_argument('--prompt', required=True, help='task prompt given to the client')
+    p.add_argument('--client', help='client name (default: the test dir\'s client)')
+    p.add_argument('--workdir', help='directory the client works in (default: a temp dir, removed afterwards)')
+    p.add_argument('--serve-only', action='store_true', help='only run the proxy; start the client yourself')
+    p.add_argument('--timeout', type=float, default=4 * 3600)
+    p.add_argument('--force', action='store_true')
+
+    for name, help_text in (('replay', 'replay recorded sessions and measure client overhead'),
+                            ('serve', 'serve a transcript for a client you start by hand')):
+        p = sub.add_parser(name, help=help_text)
+        if name == 'replay':
+            p.add_argument('test_dirs', nargs='*')
+            p.add_argument('--client', action='append', help='client(s) to drive (default: the recorded one)')
+            p.add_argument('--prompt', help='override the recorded prompt')
+            p.add_argument('--repeat', '-n', type=int, default=3)
+            p.add_argument('--timeout', type=float, default=3600.0, help='per-replay timeout (seconds)')
+            p.add_argument('--keep', metavar='DIR', help='keep work dirs and client logs under DIR')
+        else:
+            p.add_argument('transcript')
+        p.add_argument('--latency', choices=['zero', 'recorded'], default='zero',
+                       help='zero: answer immediately (default); recorded: wait the recorded model latency')
+        p.add_argument('--scale', type=float, default=1.0, help='multiply recorded latencies')
+    args = parser.parse_args()
+
+    return {'record': cmd_record, 'replay': cmd_replay, 'serve': cmd_serve}[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+本地结果录入服务 - 替代result_form.html的复制粘贴流程
+提供录入表单，按STATS_TEMPLATE.json校验后原子写入stats.json，
+每个项目一份结果缓存，名次在项目内直接算出来返回；合并数据、文本报告、图表和HTML
+交给流水线在后台重建：只运行被修改项目的ingest:<project>分片和它下游的阶段，不阻塞响应。
+只监听127.0.0.1，仅用标准库。
+"""
+import json
+import time
+import argparse
+import threading
+from datetime import date
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import stats_io
+import ranking
+import registry
+import pipeline
+import workspace
+
+FORM_FILE = workspace.CODE_ROOT / 'tools' / 'result_form.html'
+
+STATUS_MAP = {'success': 'SUCCESS', 'partial': 'PARTIAL', 'failed': 'FAILED', 'unclear': 'UNCLEAR'}
+
+# 结果变化后需要在后台更新的流水线阶段（按阶段名前缀匹配，ingest包括ingest:<project>分片）
+BACKGROUND_STAGES = ['ingest', 'text', 'charts', 'trends', 'html', 'html_en', 'html_zh']
+
+
+def background_stages(projects):
+    """被修改项目的导入分片及其下游里需要后台更新的阶段"""
+    pipeline.refresh_stages()
+    stages = pipeline.downstream([f'ingest:{p}' for p in projects])
+    return [name for name in stages if name.split(':', 1)[0] in BACKGROUND_STAGES]
+
+
+class ResultsState:
+    """一个项目在服务进程内的结果缓存：启动时全量加载一次，之后逐条增量更新"""
+
+    def __init__(self, project):
+        self.project = project
+        self.bench_dir = workspace.bench_dir(project)
+        self.template = stats_io.load_template(workspace.stats_template(project))
+        self.lock = threading.Lock()
+        self.records = {}
+        for stats_file in sorted(self.bench_dir.glob('*/stats.json')):
+            with open(stats_file, 'r', encoding='utf-8') as f:
+                record = json.load(f)
+            registry.canonical(record)
+            self.records[stats_file.parent.name] = record
+        print(f"[+] Loaded {project}: {len(self.records)} tests")
+
+    def ordered(self):
+        return sorted(self.records.values(), key=ranking.lexicographic_key)
+
+    def update(self, test_dir, record):
+        """写入一条记录并刷新排名，返回(名次, 总数)"""
+        with self.lock:
+            stats_io.write_stats(test_dir, record, self.bench_dir, self.template)
+            record['canonical'] = registry.canonicalize(record)
+            self.records[test_dir] = record
+            results = self.ordered()
+            names = [r['test_dir'] for r in results]
+            return names.index(test_dir) + 1, len(results)
+
+
+def load_states():
+    """每个项目一份ResultsState（默认项目即使还没有结果也加载）"""
+    projects = sorted(set(workspace.list_projects()) | {workspace.default_project()})
+    return {p: ResultsState(p) for p in projects if workspace.bench_dir(p).is_dir()}
+
+
+def resolve_project(states, form, test_dir):
+    """表单指定的项目；没指定时取包含该测试目录的项目，找不到就用默认项目"""
+    project = (form.get('project') or '').strip()
+    if project:
+        if project not in states:
+            raise ValueError(f'unknown project: {project}')
+        return project
+    owners = [p for p, s in states.items() if (s.bench_dir / test_dir).is_dir()]
+    if len(owners) > 1:
+        raise ValueError(f"test dir {test_dir} exists in several projects ({', '.join(owners)}), choose one")
+    return owners[0] if owners else workspace.default_project()
+
+
+class BackgroundRefresher:
+    """后台重建被修改项目的数据和报告；重建过程中又有新提交时只再跑一轮"""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.projects = set()
+        self.lock = threading.Lock()
+        self.pending = threading.Event()
+        self.thread = threading.Thread(target=self.loop, daemon=True)
+        self.thread.start()
+
+    def trigger(self, project):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.projects.add(project)
+        self.pending.set()
+
+    def loop(self):
+        while True:
+            self.pending.wait()
+            self.pending.clear()
+            with self.lock:
+                projects, self.projects = sorted(self.projects), set()
+            start = time.perf_counter()
+            summary = pipeline.run_pipeline(background_stages(projects), upstream=False)
+            ran = [name for name, s in summary.items() if s['status'] == 'ran']
+            failed = [name for name, s in summary.items() if s['status'] in ('failed', 'blocked')]
+            if failed:
+                print(f"[!] Background stages failed: {', '.join(failed)}")
+            print(f"[+] Background refresh ({', '.join(ran) or 'nothing to do'}) "
+                  f"done in {time.perf_counter() - start:.1f}s")
+
+
+def build_record(form, existing):
+    """把表单字段合并进已有stats.json（保留quality_breakdown、metadata等人工字段）"""
+    test_dir = (form.get('testDir') or '').strip()
+    record = dict(existing) if existing else {}
+    if not existing:
+        c = registry.canonicalize({'test_dir': test_dir})
+        record.update({
+            'engine': c['engine'],
+            'client': c['client'],
+            'config': c['run_date'] or c['level'],
+            'issues': [],
+            'metadata': {'test_date': date.today().isoformat(), 'zig_version': '0.15.1'},
+        })
+    record['test_dir'] = test_dir
+    record['completed'] = STATUS_MAP.get(form.get('status'), 'UNCLEAR')
+    record['time_minutes'] = float(form['timeMinutes']) if form.get('timeMinutes') not in (None, '') else None
+    record['tokens'] = int(form['tokens']) if form.get('tokens') not in (None, '') else None
+    record['quality_score'] = int(form.get('qualityScore', 0))
+    record['notes'] = form.get('notes') or ''
+    if form.get('comments'):
+        record['detailed_comments'] = form['comments']
+    record.setdefault('detailed_comments', '')
+    record.setdefault('issues', [])
+    record.setdefault('metadata', {})['verified'] = True
+    record.pop('canonical', None)
+    return record
+
+
+class Handler(BaseHTTPRequestHandler):
+    states = None
+    refresher = None
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path in ('/', '/index.html'):
+            body = FORM_FILE.read_bytes()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif url.path == '/api/parse':
+            dirname = parse_qs(url.query).get('dir', [''])[0]
+            self.send_json(200, registry.canonicalize({'test_dir': dirname}))
+        elif url.path == '/api/projects':
+            self.send_json(200, sorted(self.states))
+        elif url.path == '/api/runs':
+            project = parse_qs(url.query).get('project', [workspace.default_project()])[0]
+            if project not in self.states:
+                self.send_json(404, {'error': f'unknown project: {project}'})
+                return
+            self.send_json(200, [
+                {'test_dir': r['test_dir'], 'completed': r.get('completed'),
+                 'quality_score': r.get('quality_score')}
+                for r in self.states[project].ordered()
+            ])
+        else:
+            self.send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if urlparse(self.path).path != '/api/submit':
+            self.send_json(404, {'error': 'not found'})
+            return
+        start = time.perf_counter()
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            form = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(form, dict):
+                raise ValueError('request body must be a JSON object')
+            test_dir = (form.get('testDir') or '').strip()
+            if not stats_io.TEST_DIR_RE.match(test_dir):
+                raise ValueError(f'invalid test dir: {test_dir!r}')
+            project = resolve_project(self.states, form, test_dir)
+            state = self.states[project]
+            if not (state.bench_dir / test_dir).is_dir():
+                raise ValueError(f'test dir does not exist: {project}/{test_dir}')
+            record = build_record(form, stats_io.load_stats(test_dir, state.bench_dir))
+            rank, total = state.update(test_dir, record)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            self.send_json(400, {'ok': False, 'error': str(e)})
+            return
+        self.refresher.trigger(project)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"[+] Saved {project}/{test_dir}: rank {rank}/{total} ({elapsed:.0f}ms)")
+        self.send_json(200, {'ok': True, 'project': project, 'test_dir': test_dir, 'rank': rank,
+                             'total': total, 'elapsed_ms': round(elapsed, 1)})
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local results-entry service')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--no-background', action='store_true',
+                        help='do not rebuild data/reports after a submission')
+    args = parser.parse_args()
+
+    Handler.states = load_states()
+    Handler.refresher = BackgroundRefresher(enabled=not args.no_background)
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), Handler)
+    print(f"[*] Results entry form: http://127.0.0.1:{args.port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[*] Shutting down")
+
+
+if __name__ == "__main__":
+    main()
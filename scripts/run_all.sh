@@ -32,16 +32,9 @@ if ! command -v python3 &> /dev/null; then
     exit 1
 fi
 
-echo "[*] Step 1: Analyzing benchmark results..."
-python3 scripts/cyberpunk_analyzer.py
-
-echo ""
-echo "[*] Step 2: Generating visualization charts..."
-python3 scripts/generate_charts.py
-
-echo ""
-echo "[*] Step 3: Generating HTML report..."
-python3 scripts/generate_html_report.py
+# 按依赖关系执行：未变化的阶段跳过，文本报告/图表/双语HTML并行
+# 传入 --force 可强制全部重跑
+python3 scripts/pipeline.py "$@"
 
 echo ""
 echo "╔═══════════════════════════════════════════════════════════════╗"
@@ -49,8 +42,11 @@ echo "║                    ✅ ANALYSIS COMPLETE                       ║"
 echo "╚═══════════════════════════════════════════════════════════════╝"
 echo ""
 echo "📊 Generated Files:"
-echo "   ├── results/CYBERPUNK_REPORT.txt  (ASCII Art Report)"
+echo "   ├── results/BENCHMARK_REPORT.txt (Text Report, EN)"
+echo "   ├── results/BENCHMARK_REPORT_ZH.txt (Text Report, ZH)"
 echo "   ├── results/REPORT.html           (🔥 Interactive HTML Report)"
+echo "   ├── results/REPORT_EN.html        (English HTML Report)"
+echo "   ├── results/REPORT_ZH.html        (Chinese HTML Report)"
 echo "   ├── results/benchmark_data.json   (Raw JSON Data)"
 echo "   └── results/charts/"
 echo "       ├── 01_success_rate.png"
@@ -60,7 +56,7 @@ echo "       ├── 04_engine_comparison.png"
 echo "       └── 05_quality_heatmap.png"
 echo ""
 echo "🚀 Quick Commands:"
-echo "   View ASCII:   cat results/CYBERPUNK_REPORT.txt | less"
+echo "   View text:    cat results/BENCHMARK_REPORT.txt | less"
 echo "   View HTML:    xdg-open results/REPORT.html"
 echo "   View charts:  xdg-open results/charts/"
 echo ""
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+排行榜快照 - 每次流水线运行后把合并好的结果存一份，不再被下一次运行覆盖
+快照内容（benchmark_data.json + rankings.json）按sha256内容寻址、gzip压缩，
+存在 results/history/objects/ 下，内容没变就不重复存。
+results/history/index.jsonl 每个快照一行，带一份很小的未压缩排行榜
+（排名、分数、状态、时间、tokens），diff只读这个索引，不用解压任何快照。
+
+  snapshots.py take                 存当前结果（流水线的snapshot阶段）
+  snapshots.py list                 列出快照
+  snapshots.py diff [A] [B]         比较两个快照，默认上一个和最新的
+  snapshots.py show ID [-o FILE]    解压一个快照里的benchmark_data.json
+快照引用可以是序号（1开始，负数从最新往前数）或id前缀。
+"""
+import os
+import sys
+import gzip
+import json
+import hashlib
+import argparse
+from datetime import datetime
+
+import profiling
+import registry
+import workspace
+
+RESULTS_DIR = workspace.results_root()
+HISTORY_DIR = RESULTS_DIR / 'history'
+OBJECTS_DIR = HISTORY_DIR / 'objects'
+INDEX_FILE = HISTORY_DIR / 'index.jsonl'
+
+# 排行榜行的字段（index.jsonl里按位置存，省空间）
+BOARD_FIELDS = ('key', 'engine', 'client', 'status', 'score', 'time_minutes', 'tokens')
+
+
+def entry_key(record):
+    """同一个测试目录名可能出现在不同项目里"""
+    return f"{record.get('project') or ''}/{record['test_dir']}"
+
+
+def board(records):
+    """benchmark_data.json已经按排行榜顺序（ranking.lexicographic_key）排好"""
+    rows = []
+    for record in records:
+        c = registry.canonical(record)
+        rows.append([entry_key(record), c['engine'], c['client'], record.get('completed'),
+                     record.get('quality_score'), record.get('time_minutes'), record.get('tokens')])
+    return rows
+
+
+def object_path(digest):
+    return OBJECTS_DIR / digest[:2] / (digest[2:] + '.json.gz')
+
+
+def put_object(payload):
+    """紧凑JSON的sha256做地址（保留原来的键顺序，show能原样还原），gzip的mtime固定为0"""
+    data = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    digest = hashlib.sha256(data).hexdigest()
+    target = object_path(digest)
+    if not target.exists():
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(target.name + '.tmp')
+        with open(tmp, 'wb') as f:
+            f.write(gzip.compress(data, compresslevel=9, mtime=0))
+        os.chmod(tmp, 0o444)
+        os.replace(tmp, target)
+    return digest
+
+
+def get_object(digest):
+    with open(object_path(digest), 'rb') as f:
+        return json.loads(gzip.decompress(f.read()).decode('utf-8'))
+
+
+def load_index():
+    if not INDEX_FILE.exists():
+        return []
+    with open(INDEX_FILE, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def take():
+    """存当前结果；和最新快照内容相同时不追加，返回(快照, 是否新建)"""
+    with open(RESULTS_DIR / 'benchmark_data.json', 'r', encoding='utf-8') as f:
+        records = json.load(f)
+    rankings_file = RESULTS_DIR / 'rankings.json'
+    rankings = None
+    if rankings_file.exists():
+        with open(rankings_file, 'r', encoding='utf-8') as f:
+            rankings = json.load(f)
+    digest = put_object({'benchmark_data': records, 'rankings': rankings})
+
+    index = load_index()
+    if index and index[-1]['sha256'] == digest:
+        return index[-1], False
+    entry = {
+        'seq': len(index) + 1,
+        'id': digest[:12],
+        'sha256': digest,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'commit': profiling.git_commit(),
+        'runs': len(records),
+        'board': board(records),
+    }
+    HISTORY_DIR.mkdir(parents=True, exist_ok=True)
+    with open(INDEX_FILE, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    return entry, True
+
+
+def resolve(index, ref):
+    """序号（负数从最新往前数）或id前缀 -> 索引条目"""
+    if not index:
+        raise ValueError('no snapshots yet')
+    try:
+        n = int(ref)
+    except ValueError:
+        matches = [e for e in index if e['id'].startswith(ref) or e['sha256'].startswith(ref)]
+        if len(matches) != 1:
+            raise ValueError(f"{'ambiguous' if matches else 'unknown'} snapshot id: {ref}")
+        return matches[0]
+    if n < 0 and -n <= len(index):
+        return index[n]
+    if 0 < n <= len(index):
+        return index[n - 1]
+    raise ValueError(f'no snapshot #{n} (have {len(index)})')
+
+
+def diff(old, new):
+    """比较两个快照的排行榜：排名变动、新增、移除、分数和状态变化"""
+    def rows(entry):
+        return {row[0]: dict(zip(BOARD_FIELDS, row), rank=i)
+                for i, row in enumerate(entry['board'], 1)}
+
+    before, after = rows(old), rows(new)
+    changes = {'added': [], 'removed': [], 'moved': [], 'changed': []}
+    for key, row in after.items():
+        prev = before.get(key)
+        if prev is None:
+            changes['added'].append(row)
+            continue
+        if prev['rank'] != row['rank']:
+            changes['moved'].append({'key': key, 'from': prev['rank'], 'to': row['rank']})
+        fields = {f: (prev[f], row[f]) for f in ('status', 'score', 'time_minutes', 'tokens') if prev[f] != row[f]}
+        if fields:
+            changes['changed'].append({'key': key, 'fields': fields})
+    changes['removed'] = [row for key, row in before.items() if key not in after]
+    changes['moved'].sort(key=lambda m: m['to'])
+    return changes
+
+
+def label(entry):
+    return f"#{entry['seq']} {entry['id']} ({entry['created']}{', ' + entry['commit'] if entry.get('commit') else ''})"
+
+
+def print_diff(old, new, changes):
+    print(f"[*] {label(old)} -> {label(new)}")
+    if not any(changes.values()):
+        print("[+] Leaderboard unchanged")
+        return
+    for row in changes['added']:
+        print(f"  + #{row['rank']:<3d} {row['key']}  {row['status']}, score {row['score']}")
+    for row in changes['removed']:
+        print(f"  - #{row['rank']:<3d} {row['key']}")
+    for m in changes['moved']:
+        arrow = '▲' if m['to'] < m['from'] else '▼'
+        print(f"  {arrow} {m['key']}: #{m['from']} -> #{m['to']}")
+    for c in changes['changed']:
+        fields = ', '.join(f"{f} {a} -> {b}" for f, (a, b) in c['fields'].items())
+        print(f"  ~ {c['key']}: {fields}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compressed leaderboard history with fast diffs')
+    sub = parser.add_subparsers(dest='command')
+    sub.add_parser('take', help='snapshot results/benchmark_data.json and rankings.json')
+    sub.add_parser('list', help='list snapshots')
+    p = sub.add_parser('diff', help='compare two snapshots (default: previous and latest)')
+    p.add_argument('old', nargs='?', default='-2')
+    p.add_argument('new', nargs='?', default='-1')
+    p.add_argument('--json', action='store_true')
+    p = sub.add_parser('show', help="print a snapshot's benchmark_data.json")
+    p.add_argument('ref')
+    p.add_argument('--output', '-o', help='write to a file instead of stdout')
+    args = parser.parse_args()
+
+    command = args.command or 'take'
+    if command == 'take':
+        entry, created = take()
+        if created:
+            print(f"[+] Snapshot {label(entry)}: {entry['runs']} run(s)")
+        else:
+            print(f"[*] Results unchanged since snapshot {label(entry)}")
+        return 0
+
+    index = load_index()
+    if command == 'list':
+        for entry in index:
+            top = entry['board'][0][0] if entry['board'] else '-'
+            print(f"{label(entry)}  {entry['runs']:3d} runs  top: {top}")
+        return 0
+
+    try:
+        if command == 'diff':
+            if len(index) < 2 and (args.old, args.new) == ('-2', '-1'):
+                print("[!] Need at least two snapshots")
+                return 1
+            old, new = resolve(index, args.old), resolve(index, args.new)
+        else:
+            entry = resolve(index, args.ref)
+    except ValueError as e:
+        print(f"[!] {e}")
+        return 1
+
+    if command == 'diff':
+        changes = diff(old, new)
+        if args.json:
+            print(json.dumps({'old': old['id'], 'new': new['id'], **changes}, indent=2, ensure_ascii=False))
+        else:
+            print_diff(old, new, changes)
+        return 0
+
+    data = json.dumps(get_object(entry['sha256'])['benchmark_data'], indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(data + '\n')
+        print(f"[+] Snapshot {entry['id']} written to {args.output}")
+    else:
+        print(data)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+静态站点报告 - 小首页 + 每个测试目录一个详情页
+generate_html_report.py 把整份报告拼成一个大字符串；这里按模板流式写盘：
+benchmark_data.json 逐条解析，首页表格逐行写出，详情页按记录指纹增量重建，
+内存占用与测试数量无关。输出到 results/site/。
+"""
+import os
+import json
+import html
+import hashlib
+import argparse
+from string import Template
+from datetime import datetime
+
+import tasks
+import trends
+import workspace
+from blob_store import load_manifest, walk_submission
+
+RESULTS_DIR = workspace.results_dir()
+SITE_DIR = RESULTS_DIR / 'site'
+RUNS_DIR = SITE_DIR / 'runs'
+SITE_MANIFEST = SITE_DIR / '.site_manifest.json'
+BUILD_RESULTS_FILE = RESULTS_DIR / 'build_results.json'
+
+# 模板改动时递增，让所有详情页重建
+TEMPLATE_VERSION = 5
+CHUNK_SIZE = 1 << 16
+
+STYLE = """body { font-family: 'Courier New', monospace; background: #0a0e27; color: #e0e0e0;
+       line-height: 1.6; padding: 20px; }
+.container { max-width: 1200px; margin: 0 auto; border: 2px solid #00ff41; border-radius: 10px;
+             padding: 30px; background: rgba(26, 26, 46, 0.8); }
+h1 { color: #00ff41; text-shadow: 0 0 20px #00ff41; }
+h2 { color: #00f5ff; border-left: 5px solid #00f5ff; padding-left: 15px; margin-top: 30px; }
+a { color: #00ff41; }
+table { width: 100%; border-collapse: collapse; margin: 20px 0; background: rgba(0, 0, 0, 0.3); }
+th { background: linear-gradient(135deg, #00ff41 0%, #00f5ff 100%); color: #0a0e27; padding: 10px;
+     text-align: left; }
+td { padding: 8px 10px; border-bottom: 1px solid rgba(0, 255, 65, 0.2); vertical-align: top; }
+.detail-box { background: rgba(0, 0, 0, 0.5); border-left: 4px solid #ff006e; padding: 15px;
+              margin: 10px 0; border-radius: 5px; white-space: pre-wrap; }
+.charts img { width: 100%; margin: 10px 0; border: 2px solid #00f5ff; border-radius: 5px; }
+.SUCCESS { color: #00ff41; } .PARTIAL { color: #ffbe0b; } .FAILED { color: #fb5607; }
+.UNCLEAR { color: #00f5ff; }
+.timestamp { color: #888; font-size: 0.9em; text-align: center; margin-top: 30px; }
+"""
+
+INDEX_HEAD = Template("""<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>AI-PK Benchmark - $project</title>
+    <link rel="stylesheet" href="style.css">
+</head>
+<body>
+<div class="container">
+    <h1>AI Development Benchmark Report</h1>
+    <p><a href="#leaderboard">🏆 Leaderboard</a> | <a href="#charts">📈 Charts</a></p>
+    <h2 id="leaderboard">🏆 Leaderboard</h2>
+    <table>
+        <thead>
+            <tr><th>Rank</th><th>Engine + Client</th><th>Status</th><th>Time (min)</th>
+                <th>Tokens</th><th>Quality</th><th>Startup (ms)</th><th>Speed (x ref)</th><th>Notes</th></tr>
+        </thead>
+        <tbody>
+""")
+
+INDEX_ROW = Template("""            <tr><td><strong>#$rank</strong></td><td><a href="runs/$page">$engine + $client</a></td>
+                <td class="$status">$status</td><td>$time</td><td>$tokens</td><td>$quality/10</td><td>$startup</td><td>$speed</td><td>$notes</td></tr>
+""")
+
+INDEX_TAIL = Template("""        </tbody>
+    </table>
+    <p>Total: $total | Success: $success | Partial: $partial | Failed: $failed</p>
+    <h2 id="charts">📈 Charts</h2>
+    <div class="charts">
+$charts
+    </div>
+    <div class="timestamp">Generated: $generated | AI-PK Benchmark System | @gnusec</div>
+</div>
+</body>
+</html>
+""")
+
+RUN_PAGE = Template("""<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>$test_dir - AI-PK</title>
+    <link rel="stylesheet" href="../../style.css">
+</head>
+<body>
+<div class="container">
+    <p><a href="../../index.html">← Leaderboard</a></p>
+    <h1>$test_dir</h1>
+    <table>
+        <tr><th>Engine</th><td>$engine</td><th>Client</th><td>$client</td></tr>
+        <tr><th>Config</th><td>$config</td><th>Date</th><td>$date</td></tr>
+        <tr><th>Status</th><td class="$status">$status</td><th>Quality</th><td>$quality/10</td></tr>
+        <tr><th>Time (min)</th><td>$time</td><th>Tokens</th><td>$tokens</td></tr>
+    </table>
+    <h2>Score Breakdown</h2>
+$breakdown
+    <h2>Comments</h2>
+$comments
+    <h2>Measured Performance</h2>
+$perf
+    <h2>Artifacts</h2>
+$artifacts
+</div>
+</body>
+</html>
+""")
+
+
+def esc(value):
+    return html.escape('' if value is None else str(value))
+
+
+def iter_records(path):
+    """逐条解析benchmark_data.json（JSON数组），不把整个文件读进内存"""
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buf = f.read(CHUNK_SIZE).lstrip()
+        if not buf.startswith('['):
+            raise ValueError(f'{path}: expected a JSON array')
+        buf = buf[1:]
+        while True:
+            buf = buf.lstrip().lstrip(',').lstrip()
+            if buf.startswith(']'):
+                return
+            try:
+                record, end = decoder.raw_decode(buf)
+            except json.JSONDecodeError:
+                more = f.read(CHUNK_SIZE)
+                if not more:
+                    raise
+                buf += more
+                continue
+            yield record
+            buf = buf[end:]
+
+
+def fmt_time(r):
+    return f"{r['time_minutes']:.1f}" if r.get('time_minutes') else 'N/A'
+
+
+def fmt_tokens(r):
+    return f"{r['tokens'] // 1000}K" if r.get('tokens') else 'N/A'
+
+
+def fmt_startup(r):
+    """冷启动：1个端口从exec到退出的中位数（perf_harness.py --startup）"""
+    value = (r.get('perf') or {}).get('startup_ms')
+    return f"{value:.2f}" if value is not None else 'N/A'
+
+
+def fmt_speed(r):
+    """相对本机参考扫描器的速度（perf.normalized_speed），不同机器上测的结果可以直接比较"""
+    value = trends.normalized_speed(r)
+    return f"x{value:.2f}" if value is not None else 'N/A'
+
+
+def page_name(record):
+    """详情页相对runs/的路径；不同项目可以有同名测试目录，按项目分子目录"""
+    project = record.get('project') or workspace.default_project()
+    return f"{project}/{record['test_dir']}.html"
+
+
+def record_fingerprint(record, build):
+    """详情页指纹：记录内容 + 构建结果 + 产物清单 + 模板版本"""
+    payload = json.dumps([TEMPLATE_VERSION, record, build, run_manifest(record)],
+                         sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def run_dir(record):
+    return workspace.bench_dir(record.get('project')) / record['test_dir']
+
+
+def run_manifest(record):
+    path = run_dir(record)
+    return load_manifest(path)['artifacts'] if path.is_dir() else {}
+
+
+def render_breakdown(r):
+    b = r.get('quality_breakdown')
+    if not b:
+        return '    <p>N/A</p>'
+    rows = [f"<tr><th>Base</th><td>{esc(b.get('base_score'))}</td></tr>"]
+    for part in ('bonus', 'penalty'):
+        for key, value in (b.get(part) or {}).items():
+            rows.append(f"<tr><th>{part}.{esc(key)}</th><td>{esc(value)}</td></tr>")
+    rows.append(f"<tr><th>Calculation</th><td>{esc(b.get('calculation'))}</td></tr>")
+    rows.append(f"<tr><th>Final</th><td>{esc(b.get('final_score'))}</td></tr>")
+    out = '    <table>' + ''.join(rows) + '</table>'
+    if b.get('reasoning'):
+        out += f"\n    <div class=\"detail-box\">{esc(b['reasoning'])}</div>"
+    return out
+
+
+def render_comments(r):
+    parts = [r.get('notes'), r.get('detailed_comments')] + list(r.get('user_comments') or [])
+    parts = [p for p in parts if p]
+    issues = r.get('issues') or []
+    out = '\n'.join(f'    <div class="detail-box">{esc(p)}</div>' for p in parts) or '    <p>N/A</p>'
+    if issues:
+        out += '\n    <ul>' + ''.join(f'<li>{esc(i)}</li>' for i in issues) + '</ul>'
+    return out
+
+
+def render_perf(r, build):
+    meta = r.get('metadata') or {}
+    rows = []
+    if meta.get('performance_test'):
+        rows.append(f"<tr><th>Performance test</th><td>{esc(meta['performance_test'])}</td></tr>")
+    perf = r.get('perf') or {}
+    spec = tasks.load_spec(r.get('project'))['perf']
+    sections = [('', perf)] + [(f'{w}/', section) for w, section in sorted((perf.get('workloads') or {}).items())]
+    for prefix, section in sections:
+        for name, s in (section.get('profiles') or {}).items():
+            if 'wall_s_median' in s:
+                recall = f", recall {s['recall'] * 100:.0f}%" if s.get('recall') is not None else ''
+                value = f"{s['wall_s_median']:.3f}s, {s.get(spec['metric']) or 0:,.0f} {spec['unit']}{recall}"
+                if s.get('normalized'):
+                    value += f", x{s['normalized']['speed']:.2f} reference scanner"
+            else:
+                value = 'failed'
+            if s.get('failure_modes'):
+                value += f" [{', '.join(s['failure_modes'])}]"
+            rows.append(f"<tr><th>Measured ({esc(prefix + name)})</th><td>{esc(value)}</td></tr>")
+    startup = perf.get('startup')
+    if startup:
+        for n, st in sorted(startup['sizes'].items(), key=lambda kv: int(kv[0])):
+            if 'exit_ms_median' not in st:
+                value = f"failed ({st['failures']}/{st['runs']})"
+            else:
+                value = f"exit {st['exit_ms_median']:.2f}ms (p90 {st['exit_ms_p90']:.2f})"
+                if 'first_connect_ms_median' in st:
+                    value += f", first connect {st['first_connect_ms_median']:.2f}ms"
+                value += f", {st['minflt_median']:g} minor faults"
+            rows.append(f"<tr><th>Startup ({esc(n)} port{'s' if n != '1' else ''})</th><td>{esc(value)}</td></tr>")
+        rows.append(f"<tr><th>Binary size</th><td>{startup['binary_bytes'] // 1024} KB</td></tr>")
+    host = perf.get('host')
+    if host:
+        value = (f"{host['cpu_model']}, {host['cores']} cores, kernel {host['kernel']}, "
+                 f"nofile {host['nofile_soft']}, ports {host['ip_local_port_range']} ({host['id']})")
+        rows.append(f"<tr><th>Measured on</th><td>{esc(value)}</td></tr>")
+    scaling = perf.get('scaling')
+    if scaling:
+        limit = scaling.get('limit')
+        value = f"exponent {scaling['exponent']}, " + (
+            f"degrades at {limit['hosts']} x {limit['ports']} ({', '.join(limit['failure_modes'])})"
+            if limit else 'no limit reached')
+        rows.append(f"<tr><th>Scaling</th><td>{esc(value)}</td></tr>")
+    soak = perf.get('soak')
+    if soak:
+        checks = ', '.join(f"{k} {v['verdict']}" for k, v in soak['checks'].items())
+        value = f"{soak['verdict']} after {soak['duration_s']:g}s under {soak['profile']} ({checks})"
+        rows.append(f"<tr><th>Soak test</th><td>{esc(value)}</td></tr>")
+    for b in build:
+        if b.get('ok'):
+            value = f"{b['size_bytes'] // 1024} KB binary, built in {b['seconds']:.1f}s"
+        else:
+            value = 'build failed'
+        rows.append(f"<tr><th>{esc(b['mode'])}</th><td>{esc(value)}</td></tr>")
+    return '    <table>' + ''.join(rows) + '</table>' if rows else '    <p>N/A</p>'
+
+
+def render_artifacts(r):
+    path = run_dir(r)
+    if not path.is_dir():
+        return '    <p>N/A</p>'
+    rows = []
+    for root, dirs, names in walk_submission(path):
+        for name in names:
+            full = os.path.join(root, name)
+            # 提交里可能有非UTF-8的文件名
+            rel = os.path.relpath(full, path).encode('utf-8', 'surrogateescape').decode('utf-8', 'replace')
+            rows.append(f"<tr><td>{esc(rel)}</td><td>{os.path.getsize(full) // 1024} KB</td></tr>")
+    for name, entry in sorted(run_manifest(r).items()):
+        ref = entry.get('sha256', entry.get('target', ''))[:12]
+        rows.append(f"<tr><td>{esc(name)}</td><td>{esc(entry['type'])} {esc(ref)} (blob store)</td></tr>")
+    return '    <table>' + ''.join(rows) + '</table>' if rows else '    <p>N/A</p>'
+
+
+def render_run(r, build):
+    return RUN_PAGE.substitute(
+        test_dir=esc(r['test_dir']), engine=esc(r.get('engine')), client=esc(r.get('client')),
+        config=esc(r.get('config')), date=esc((r.get('metadata') or {}).get('test_date')),
+        status=esc(r.get('completed')), quality=esc(r.get('quality_score')),
+        time=fmt_time(r), tokens=esc(r.get('tokens') or 'N/A'),
+        breakdown=render_breakdown(r), comments=render_comments(r),
+        perf=render_perf(r, build), artifacts=render_artifacts(r))
+
+
+def write_text(path, text):
+    tmp = str(path) + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def load_builds():
+    """构建结果按(项目, test_dir)分组：不同项目可以有同名测试目录
+
+    读results/<project>/build_results.json和本输出目录下的build_results.json
+    （旧记录没有project字段时按文件所属的项目算），同一目标的同一模式只保留一份。
+    """
+    files = {BUILD_RESULTS_FILE: workspace.current_project() or workspace.default_project()}
+    for project in workspace.active_projects():
+        files.setdefault(workspace.results_dir(project) / 'build_results.json', project)
+    builds = {}
+    for path, project in files.items():
+        if not path.exists():
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            for b in json.load(f):
+                key = (b.get('project') or project, b['test_dir'])
+                builds.setdefault(key, {})[b['mode']] = b
+    return {key: [modes[m] for m in sorted(modes)] for key, modes in builds.items()}
+
+
+def load_site_manifest():
+    if not SITE_MANIFEST.exists():
+        return {}
+    with open(SITE_MANIFEST, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def chart_links():
+    charts_dir = RESULTS_DIR / 'charts'
+    return '\n'.join(f'        <img src="../charts/{p.name}" alt="{p.stem}">'
+                     for p in sorted(charts_dir.glob('*.png')))
+
+
+def build_site(force=False):
+    """流式生成站点，返回(重建页数, 总页数)"""
+    RUNS_DIR.mkdir(parents=True, exist_ok=True)
+    write_text(SITE_DIR / 'style.css', STYLE)
+    previous = {} if force else load_site_manifest()
+    manifest = {}
+    builds = load_builds()
+    counts = {'SUCCESS': 0, 'PARTIAL': 0, 'FAILED': 0}
+    rebuilt = 0
+
+    index_tmp = SITE_DIR / 'index.html.tmp'
+    with open(index_tmp, 'w', encoding='utf-8') as index:
+        index.write(INDEX_HEAD.substitute(project=esc(workspace.current_project() or 'all projects')))
+        for rank, r in enumerate(iter_records(RESULTS_DIR / 'benchmark_data.json'), 1):
+            test_dir = r['test_dir']
+            page = page_name(r)
+            status = r.get('completed', '')
+            counts[status] = counts.get(status, 0) + 1
+            index.write(INDEX_ROW.substitute(
+                rank=rank, page=esc(page), engine=esc(r.get('engine')), client=esc(r.get('client')),
+                status=esc(status), time=fmt_time(r), tokens=fmt_tokens(r),
+                quality=esc(r.get('quality_score')), startup=fmt_startup(r), speed=fmt_speed(r), notes=esc(r.get('notes'))))
+
+            build = builds.get((r.get('project') or workspace.default_project(), test_dir), [])
+            key = record_fingerprint(r, build)
+            manifest[page] = key
+            if previous.get(page) != key or not (RUNS_DIR / page).exists():
+                (RUNS_DIR / page).parent.mkdir(parents=True, exist_ok=True)
+                write_text(RUNS_DIR / page, render_run(r, build))
+                rebuilt += 1
+        index.write(INDEX_TAIL.substitute(
+            total=len(manifest), success=counts['SUCCESS'], partial=counts['PARTIAL'],
+            failed=counts['FAILED'], charts=chart_links(),
+            generated=datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+    os.replace(index_tmp, SITE_DIR / 'index.html')
+
+    # 已经不存在的测试目录，删掉对应页面（旧版清单的键是test_dir，页面在runs/<test_dir>.html）
+    for page in set(previous) - set(manifest):
+        stale = RUNS_DIR / (page if page.endswith('.html') else f'{page}.html')
+        if stale.exists():
+            stale.unlink()
+    write_text(SITE_MANIFEST, json.dumps(manifest, indent=2, ensure_ascii=False))
+    return rebuilt, len(manifest)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate the static-site report (index + per-run pages)')
+    parser.add_argument('--force', action='store_true', help='rebuild every detail page')
+    args = parser.parse_args()
+
+    print("📊 Generating static site...")
+    rebuilt, total = build_site(args.force)
+    print(f"✅ Static site generated: {SITE_DIR / 'index.html'}")
+    print(f"   {rebuilt}/{total} detail pages rebuilt")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+stats.json 读写与校验
+按 benchmarks/zigscan/STATS_TEMPLATE.json 校验字段和类型，原子写入（临时文件 + rename），
+录入服务和各类自动写入stats.json的工具共用。
+"""
+import os
+import re
+import json
+import tempfile
+from pathlib import Path
+
+import workspace
+
+BENCH_DIR = workspace.bench_dir()
+TEMPLATE_FILE = workspace.stats_template()
+
+STATUS_VALUES = ['SUCCESS', 'PARTIAL', 'FAILED', 'UNCLEAR']
+# 这些字段允许为null（未记录时间/tokens的失败测试）
+NULLABLE = {'time_minutes', 'tokens'}
+TEST_DIR_RE = re.compile(r'^[A-Za-z0-9][A-Za-z0-9._-]*$')
+DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+
+def load_template(path=None):
+    with open(path or TEMPLATE_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def type_ok(value, expected):
+    """数字字段int/float互通，bool不算数字"""
+    if isinstance(expected, bool):
+        return isinstance(value, bool)
+    if isinstance(expected, (int, float)):
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    return isinstance(value, type(expected))
+
+
+def validate_stats(data, template=None):
+    """按模板校验stats.json内容，返回错误列表（空列表表示通过）"""
+    template = template or load_template()
+    errors = []
+    if not isinstance(data, dict):
+        return ['stats.json must be a JSON object']
+
+    for key, expected in template.items():
+        if key not in data:
+            errors.append(f'missing field: {key}')
+            continue
+        value = data[key]
+        if value is None and key in NULLABLE:
+            continue
+        if not type_ok(value, expected):
+            errors.append(f'{key}: expected {type(expected).__name__}, got {type(value).__name__}')
+
+    test_dir = data.get('test_dir')
+    if isinstance(test_dir, str) and not TEST_DIR_RE.match(test_dir):
+        errors.append(f'test_dir: invalid directory name {test_dir!r}')
+    if data.get('completed') not in STATUS_VALUES:
+        errors.append(f"completed: must be one of {', '.join(STATUS_VALUES)}")
+    score = data.get('quality_score')
+    if type_ok(score, 0) and not 0 <= score <= 10:
+        errors.append('quality_score: must be between 0 and 10')
+    for key in NULLABLE:
+        value = data.get(key)
+        if type_ok(value, 0) and value < 0:
+            errors.append(f'{key}: must not be negative')
+
+    metadata = data.get('metadata')
+    if isinstance(metadata, dict):
+        for key, expected in template.get('metadata', {}).items():
+            if key in metadata and not type_ok(metadata[key], expected):
+                errors.append(f'metadata.{key}: expected {type(expected).__name__}')
+        test_date = metadata.get('test_date')
+        if isinstance(test_date, str) and not DATE_RE.match(test_date):
+            errors.append('metadata.test_date: expected YYYY-MM-DD')
+    return errors
+
+
+def stats_path(test_dir, bench_dir=None):
+    return Path(bench_dir or BENCH_DIR) / test_dir / 'stats.json'
+
+
+def load_stats(test_dir, bench_dir=None):
+    """读取某个测试目录的stats.json，不存在返回None"""
+    path = stats_path(test_dir, bench_dir)
+    if not path.exists():
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_json_atomic(path, data):
+    """先写同目录临时文件并fsync，再rename覆盖，读者不会看到半个文件"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix='.' + path.name, suffix='.tmp', dir=path.parent)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.write('\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def write_stats(test_dir, data, bench_dir=None, template=None):
+    """校验后原子写入stats.json，校验失败抛ValueError"""
+    errors = validate_stats(data, template)
+    if errors:
+        raise ValueError('; '.join(errors))
+    path = stats_path(test_dir, bench_dir)
+    write_json_atomic(path, data)
+    return path
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+任务规格 - projects/<task>/task.json 描述一个测试任务，核心脚本不再写死ZigScan
+  acceptance  验收标准（文字）
+  build       构建方法：toolchain为zig时用固定版本的zig编译；
+              其他语言写recipe命令，占位符 {out_dir} {bin_dir} {mode} {entry}
+  perf        性能测试：指标名和单位、主负载/主条件、各负载参数、
+              人工记录的解析正则，plugin指向任务自己的测量插件，
+              calibration.baseline是基准机器上参考扫描器的吞吐量（见calibration.py）
+  scoring     基础分、加减分上限、性能加分阈值
+没有task.json的项目用DEFAULT_SPEC（即ZigScan的规格），老工作区不受影响。
+
+插件是 projects/<task>/plugin.py（或perf.plugin指定的文件），用importlib加载，需要提供：
+  measure(context) -> {条件名: 汇总}
+      context: test_dir, run_dir, binary, stats, workload（名称+参数）, spec, repeat, timeout
+      汇总至少要有 runs、failures、failure_modes，成功时还有 wall_s_median 和 perf.metric 指定的字段
+可选：
+  PROFILES = [...]           测量条件（默认只有一个default）
+  parse_manual(text)         解析metadata.performance_test，返回(工作量, 秒数)
+没有插件的任务（ZigScan）用内置的perf_harness测量。
+"""
+import re
+import sys
+import json
+import argparse
+import importlib.util
+
+import workspace
+
+SPEC_NAME = 'task.json'
+PLUGIN_NAME = 'plugin.py'
+
+DEFAULT_SPEC = {
+    'title': 'ZigScan',
+    'acceptance': [],
+    'build': {
+        'toolchain': 'zig',
+        'version': '0.15.1',
+        'modes': ['ReleaseFast', 'ReleaseSafe'],
+        'timeout': 600,
+        'sources': ['.zig'],
+    },
+    'perf': {
+        'plugin': None,
+        'metric': 'ports_per_sec',
+        'unit': 'ports/s',
+        'primary': {'workload': 'acceptance', 'profile': 'loopback'},
+        'command': '{binary} -t {host} -p {ports} -c {concurrency}',
+        'workloads': {},
+        # "500 ports in 5s" / "65535 ports in 203ms" / "364 ports in ~1s"
+        'manual_pattern': r'(\d+)\s*ports?\s+in\s+~?\s*([\d.]+)\s*(ms|s)\b',
+    },
+    'scoring': {
+        'base': {'SUCCESS': 8, 'PARTIAL': 5, 'FAILED': 0, 'UNCLEAR': 3},
+        'bonus_cap': 3.0,
+        'penalty_cap': 5.0,
+        # 性能加分：工作量不小于work、耗时不超过seconds时给bonus，取满足条件的最高一档
+        'performance': [
+            {'work': 500, 'seconds': 3, 'bonus': 1.0},
+            {'work': 65535, 'seconds': 10, 'bonus': 1.0},
+            {'work': 500, 'seconds': 5, 'bonus': 0.5},
+        ],
+    },
+}
+
+_specs = {}
+_plugins = {}
+
+
+def merge(base, override):
+    """字典递归合并，列表和标量整体覆盖"""
+    out = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(out.get(key), dict):
+            out[key] = merge(out[key], value)
+        else:
+            out[key] = value
+    return out
+
+
+def validate(spec, path):
+    """检查几个会被核心脚本直接使用的字段，错误时抛ValueError"""
+    def need(cond, message):
+        if not cond:
+            raise ValueError(f"{path}: {message}")
+
+    build, perf, scoring = spec['build'], spec['perf'], spec['scoring']
+    need(isinstance(build.get('modes'), list) and build['modes'], 'build.modes must be a non-empty list')
+    need(build.get('toolchain') == 'zig' or isinstance(build.get('recipe'), list),
+         'build.recipe (a command list) is required unless build.toolchain is "zig"')
+    need(isinstance(perf.get('metric'), str), 'perf.metric must be a string')
+    need(isinstance(perf.get('workloads'), dict), 'perf.workloads must be an object')
+    for name, workload in perf['workloads'].items():
+        need(isinstance(workload, dict), f'perf.workloads.{name} must be an object')
+    need({'workload', 'profile'} <= set(perf.get('primary') or {}), 'perf.primary needs workload and profile')
+    try:
+        pattern = re.compile(perf['manual_pattern']) if perf.get('manual_pattern') else None
+    except re.error as e:
+        raise ValueError(f"{path}: perf.manual_pattern: {e}")
+    need(pattern is None or pattern.groups >= 2, 'perf.manual_pattern needs (work) and (seconds) groups')
+    need(set(scoring.get('base') or {}) >= {'SUCCESS', 'PARTIAL', 'FAILED'}, 'scoring.base needs SUCCESS/PARTIAL/FAILED')
+    for tier in scoring.get('performance') or []:
+        need({'work', 'seconds', 'bonus'} <= set(tier), 'scoring.performance tiers need work, seconds and bonus')
+
+
+def task_dir(project=None):
+    return workspace.projects_dir() / (project or workspace.current_project() or workspace.default_project())
+
+
+def load_spec(project=None):
+    """项目的任务规格（默认值 + task.json），按项目缓存"""
+    project = project or workspace.current_project() or workspace.default_project()
+    key = (str(workspace.root()), project)
+    if key not in _specs:
+        spec = merge(DEFAULT_SPEC, {'name': project, 'title': workspace.project_info(project)['title']})
+        path = task_dir(project) / SPEC_NAME
+        if path.exists():
+            with open(path, 'r', encoding='utf-8') as f:
+                spec = merge(spec, json.load(f))
+            validate(spec, path)
+        _specs[key] = spec
+    return _specs[key]
+
+
+def load_plugin(project=None):
+    """加载任务的测量插件，没有插件返回None"""
+    spec = load_spec(project)
+    path = task_dir(spec['name']) / (spec['perf'].get('plugin') or PLUGIN_NAME)
+    if not path.exists():
+        if spec['perf'].get('plugin'):
+            raise ValueError(f"perf.plugin not found: {path}")
+        return None
+    key = str(path)
+    if key not in _plugins:
+        module_spec = importlib.util.spec_from_file_location(f"ai_pk_task_{spec['name'].replace('-', '_')}", path)
+        module = importlib.util.module_from_spec(module_spec)
+        module_spec.loader.exec_module(module)
+        if not callable(getattr(module, 'measure', None)):
+            raise ValueError(f"{path}: plugin must define measure(context)")
+        _plugins[key] = module
+    return _plugins[key]
+
+
+def parse_manual(text, project=None):
+    """解析人工记录的性能测试（metadata.performance_test），返回(工作量, 秒数)，解析不了返回None"""
+    plugin = load_plugin(project)
+    if plugin is not None and hasattr(plugin, 'parse_manual'):
+        return plugin.parse_manual(text)
+    pattern = load_spec(project)['perf'].get('manual_pattern')
+    m = re.search(pattern, text or '', re.IGNORECASE) if pattern else None
+    if not m:
+        return None
+    work, value = int(m.group(1)), float(m.group(2))
+    unit = (m.group(3) if m.re.groups >= 3 else 's') or 's'
+    seconds = value / 1000 if unit.lower() == 'ms' else value
+    return (work, seconds) if seconds > 0 else None
+
+
+def performance_bonus(work, seconds, project=None):
+    """按scoring.performance阈值算性能加分，没有数据返回None"""
+    if not work or not seconds:
+        return None
+    tiers = load_spec(project)['scoring'].get('performance') or []
+    bonuses = [t['bonus'] for t in tiers if work >= t['work'] and seconds <= t['seconds']]
+    return max(bonuses, default=0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Show the task spec of each project')
+    parser.add_argument('projects', nargs='*', help='default: all projects')
+    args = parser.parse_args()
+
+    status = 0
+    for project in args.projects or workspace.list_projects():
+        try:
+            spec = load_spec(project)
+            plugin = load_plugin(project)
+        except (ValueError, OSError, SyntaxError) as e:
+            print(f"[!] {project}: {e}")
+            status = 1
+            continue
+        source = 'task.json' if (task_dir(project) / SPEC_NAME).exists() else 'defaults'
+        perf = spec['perf']
+        print(f"[+] {project} ({source}): {spec['title']}")
+        print(f"    build: {spec['build']['toolchain']} {spec['build'].get('version') or ''}, "
+              f"modes {', '.join(spec['build']['modes'])}")
+        print(f"    perf:  {perf['metric']} ({perf['unit']}) via "
+              f"{'plugin ' + plugin.__file__ if plugin else 'built-in perf_harness'}; "
+              f"primary {perf['primary']['workload']}/{perf['primary']['profile']}")
+        for item in spec['acceptance']:
+            print(f"    - {item}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+纵向趋势 - 同一项目里同一engine+client+档位在不同测试日期上的表现
+导入时把每条记录追加到只增不改的 results/trends.jsonl（按项目和规范化的
+engine/client/档位分组，不同项目的测试不放在同一条趋势里），已经记录过且内容没变的测试不会重复追加，历史不需要重算。
+报告阶段按 metadata.test_date 输出时间、tokens、评分和扫描吞吐量的趋势表和趋势图。
+吞吐量只用perf_harness.py的实测值，人工记录的metadata.performance_test不参与比较
+（测试条件不同，和实测值不可比）；不同机器上测的原始吞吐量也不可比，
+所以同时记录相对本机参考扫描器的归一化速度（见calibration.py）。
+"""
+import os
+import json
+import hashlib
+import argparse
+from collections import defaultdict
+
+import tasks
+import registry
+import workspace
+
+RESULTS_DIR = workspace.results_dir()
+TRENDS_FILE = RESULTS_DIR / 'trends.jsonl'
+TRENDS_INDEX = RESULTS_DIR / 'trends_index.json'
+TRENDS_REPORT = RESULTS_DIR / 'TRENDS.md'
+
+METRICS = [
+    ('time_minutes', 'Time (min)'),
+    ('tokens', 'Tokens'),
+    ('quality_score', 'Score'),
+    ('ports_per_sec', 'Ports/sec'),
+    ('normalized_speed', 'vs reference'),
+]
+
+
+def parse_performance_test(text, project=None):
+    """解析metadata.performance_test，返回(工作量, 秒数)，解析不了返回None（格式见任务规格）"""
+    return tasks.parse_manual(text, project)
+
+
+def measured_throughput(record):
+    """性能测试工具实测的吞吐量perf.<指标>（zigscan是端口/秒），没有实测时返回None。
+    趋势里的字段名仍叫ports_per_sec"""
+    metric = tasks.load_spec(record.get('project'))['perf']['metric']
+    return (record.get('perf') or {}).get(metric) or None
+
+
+def normalized_speed(record):
+    """实测吞吐量 / 同一台机器上参考扫描器的吞吐量，没有标定时返回None"""
+    return (record.get('perf') or {}).get('normalized_speed') or None
+
+
+def manual_throughput(record):
+    """人工记录的吞吐量（解析metadata.performance_test），只用于展示，不和实测值比较"""
+    project = record.get('project')
+    parsed = parse_performance_test((record.get('metadata') or {}).get('performance_test'), project)
+    return round(parsed[0] / parsed[1], 1) if parsed else None
+
+
+def series_key(record):
+    c = registry.canonical(record)
+    project = record.get('project') or workspace.default_project()
+    return f"{project} | {c['engine']} | {c['client']} | {c['level']}"
+
+
+def make_point(record):
+    c = registry.canonical(record)
+    point = {
+        'key': series_key(record),
+        'engine': c['engine'],
+        'client': c['client'],
+        'level': c['level'],
+        'project': record.get('project'),
+        'test_dir': record['test_dir'],
+        'test_date': (record.get('metadata') or {}).get('test_date') or c['run_date'],
+        'status': record.get('completed'),
+        'time_minutes': record.get('time_minutes'),
+        'tokens': record.get('tokens'),
+        'quality_score': record.get('quality_score'),
+        'ports_per_sec': measured_throughput(record),
+        'normalized_speed': normalized_speed(record),
+    }
+    digest = json.dumps(point, sort_keys=True, ensure_ascii=False)
+    point['fingerprint'] = hashlib.sha256(digest.encode('utf-8')).hexdigest()[:16]
+    return point
+
+
+def load_index():
+    """test_dir -> 最近一次追加的指纹（小文件，避免每次导入都扫一遍历史）"""
+    if not TRENDS_INDEX.exists():
+        return {}
+    with open(TRENDS_INDEX, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def update(records):
+    """把新出现或有变化的记录追加到趋势库，返回追加条数"""
+    index = load_index()
+    new_points = []
+    for record in records:
+        point = make_point(record)
+        ident = f"{point['project'] or ''}/{point['test_dir']}"
+        if index.get(ident) != point['fingerprint']:
+            index[ident] = point['fingerprint']
+            new_points.append(point)
+    if not new_points:
+        return 0
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    with open(TRENDS_FILE, 'a', encoding='utf-8') as f:
+        for point in new_points:
+            f.write(json.dumps(point, ensure_ascii=False) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    tmp = str(TRENDS_INDEX) + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, TRENDS_INDEX)
+    return len(new_points)
+
+
+def load_series():
+    """读取趋势库：同一测试目录以最后追加的一条为准，按日期排序"""
+    latest = {}
+    if TRENDS_FILE.exists():
+        with open(TRENDS_FILE, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    point = json.loads(line)
+                    latest[f"{point.get('project') or ''}/{point['test_dir']}"] = point
+    series = defaultdict(list)
+    for point in latest.values():
+        series[point['key']].append(point)
+    for points in series.values():
+        points.sort(key=lambda p: (p['test_date'] or '', p['test_dir']))
+    return dict(sorted(series.items()))
+
+
+def fmt(value, metric):
+    if value is None:
+        return 'N/A'
+    if metric == 'tokens':
+        return f'{value / 1000:.1f}K'
+    if metric == 'ports_per_sec':
+        return f'{value:,.0f}'
+    if metric == 'normalized_speed':
+        return f'x{value:.2f}'
+    return f'{value:g}'
+
+
+def change(prev, cur):
+    """相对上一次的变化倍数，例如 tokens ×0.22"""
+    if not prev or cur is None:
+        return ''
+    return f' (×{cur / prev:.2f})'
+
+
+def write_report(series, min_points=1):
+    """输出Markdown趋势表，多次测试过的组合排在前面"""
+    lines = ['# AI-PK Trends', '',
+             'Same project + engine + client + level across metadata.test_date.', '']
+    ordered = sorted(series.items(), key=lambda kv: (-len(kv[1]), kv[0]))
+    for key, points in ordered:
+        if len(points) < min_points:
+            continue
+        lines.append(f'## {key}')
+        lines.append('')
+        lines.append('| Date | Test | Status | ' + ' | '.join(label for _, label in METRICS) + ' |')
+        lines.append('|---' * (3 + len(METRICS)) + '|')
+        prev = None
+        for p in points:
+            cells = []
+            for metric, _ in METRICS:
+                cell = fmt(p.get(metric), metric)
+                if prev is not None:
+                    cell += change(prev.get(metric), p.get(metric))
+                cells.append(cell)
+            lines.append(f"| {p['test_date']} | {p['test_dir']} | {p['status']} | " + ' | '.join(cells) + ' |')
+            prev = p
+        lines.append('')
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    with open(TRENDS_REPORT, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines))
+    print(f"[+] Trend tables saved: {TRENDS_REPORT}")
+
+
+def write_chart(series):
+    """趋势图：每个指标一个子图，只画在两个以上日期测试过的组合
+
+    图是流水线trends阶段声明的输出，没有可画的组合时也写出一张带说明的空图，
+    免得旧图留着或者阶段每次都被当成没跑过。
+    """
+    try:
+        import generate_charts as gc
+    except ImportError as e:
+        print(f"[!] Skipping trend chart ({e})")
+        return
+    from datetime import date
+    # 没有日期的测试在表格里有，趋势图上画不出来
+    dated = {k: [p for p in v if p['test_date']] for k, v in series.items()}
+    multi = {k: v for k, v in dated.items() if len(v) > 1}
+    gc.setup_cyber_style()
+    fig, axes = gc.plt.subplots(2, 3, figsize=(21, 10))
+    colors = [gc.CYBER_COLORS[c] for c in ('primary', 'secondary', 'tertiary', 'warning', 'danger')]
+    for ax, (metric, label) in zip(axes.flat, METRICS):
+        for i, (key, points) in enumerate(multi.items()):
+            xs = [date.fromisoformat(p['test_date']) for p in points if p.get(metric) is not None]
+            ys = [p[metric] for p in points if p.get(metric) is not None]
+            if xs:
+                ax.plot(xs, ys, marker='o', color=colors[i % len(colors)], label=key)
+        ax.set_title(label, color=gc.CYBER_COLORS['primary'])
+        ax.grid(alpha=0.2)
+        ax.tick_params(axis='x', rotation=30)
+    for ax in axes.flat[len(METRICS):]:
+        ax.axis('off')
+    if multi:
+        axes.flat[0].legend(fontsize=8)
+    else:
+        print("[*] No engine+client tested on more than one date yet, trend chart is empty")
+        fig.suptitle('No engine+client tested on more than one date yet', color=gc.CYBER_COLORS['warning'])
+    gc.plt.tight_layout()
+    output_dir = RESULTS_DIR / 'charts'
+    output_dir.mkdir(parents=True, exist_ok=True)
+    gc.plt.savefig(output_dir / '06_trends.png', dpi=200,
+                   facecolor=gc.CYBER_COLORS['bg'], edgecolor='none')
+    gc.plt.close()
+    print(f"[+] Chart 6: Trends -> {output_dir}/06_trends.png")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Longitudinal trends per project and engine+client+level')
+    parser.add_argument('--update', action='store_true',
+                        help='append benchmark_data.json records before reporting')
+    parser.add_argument('--no-chart', action='store_true')
+    parser.add_argument('--min-points', type=int, default=1,
+                        help='only list combinations tested at least this many times')
+    args = parser.parse_args()
+
+    if args.update:
+        with open(RESULTS_DIR / 'benchmark_data.json', 'r', encoding='utf-8') as f:
+            print(f"[+] Appended {update(json.load(f))} trend point(s)")
+    series = load_series()
+    print(f"[+] {len(series)} series, {sum(len(v) for v in series.values())} points")
+    write_report(series, args.min_points)
+    if not args.no_chart:
+        write_chart(series)
+
+
+if __name__ == "__main__":
+    main()
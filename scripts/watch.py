@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+监视模式 - 测试目录有变化就增量更新结果
+监视 benchmarks/<project>/*/ 下的 stats.json（导入阶段只读它；finish.log、start
+等原始记录要先整理进stats.json才会进入结果，改它们不触发重建），
+Linux上用inotify（ctypes调用libc，无第三方依赖），不可用时退回定时轮询。
+一批连续的改动先合并（debounce），再只对受影响项目的ingest:<project>分片和
+它的下游阶段调用流水线（输入没变的阶段仍由指纹跳过）。
+"""
+import os
+import sys
+import time
+import fnmatch
+import select
+import struct
+import ctypes
+import ctypes.util
+import argparse
+
+import pipeline
+import workspace
+
+WATCH_PATTERNS = ['stats.json']
+
+DEBOUNCE = 0.2      # 最后一次改动后静默这么久才开始重建
+MAX_DELAY = 1.0     # 持续有改动时最多攒这么久
+POLL_INTERVAL = 0.5
+
+# <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+DIR_MASK = IN_CREATE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE | IN_DELETE_SELF
+FILE_MASK = DIR_MASK | IN_CLOSE_WRITE | IN_MODIFY | IN_ATTRIB
+EVENT_HEADER = struct.Struct('iIII')
+
+
+def is_watched(name):
+    return any(fnmatch.fnmatch(name, p) for p in WATCH_PATTERNS)
+
+
+def run_dirs(project_dir):
+    """项目下的测试目录（只监视第一层，不进入工具链和构建缓存）"""
+    if not project_dir.is_dir():
+        return []
+    return [p for p in sorted(project_dir.iterdir()) if p.is_dir() and not p.name.startswith('.')]
+
+
+class InotifyWatcher:
+    """inotify监视：benchmarks/、各项目目录、各测试目录各一个watch"""
+
+    def __init__(self, base):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError('inotify is not available')
+        self.libc = libc
+        self.base = base
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+        self.paths = {}
+        self.add(base, DIR_MASK)
+        for project_dir in sorted(p for p in base.iterdir() if p.is_dir()):
+            self.add_project(project_dir)
+
+    def add(self, path, mask):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == 28:
+                # ENOSPC：超过fs.inotify.max_user_watches
+                raise OSError(err, 'inotify watch limit reached (fs.inotify.max_user_watches)')
+            return
+        self.paths[wd] = path
+
+    def add_project(self, project_dir):
+        self.add(project_dir, DIR_MASK)
+        for run_dir in run_dirs(project_dir):
+            self.add(run_dir, FILE_MASK)
+
+    def read_events(self):
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0').decode('utf-8', 'replace')
+            offset += length
+            events.append((wd, mask, name))
+        return events
+
+    def wait(self, timeout=None):
+        """等待改动，返回变化的相对路径集合（超时返回空集合）"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        changed = set()
+        for wd, mask, name in self.read_events():
+            if mask & IN_Q_OVERFLOW:
+                # 事件队列溢出，当作全部变化
+                changed.add('*')
+                continue
+            if mask & IN_IGNORED:
+                self.paths.pop(wd, None)
+                continue
+            parent = self.paths.get(wd)
+            if parent is None or not name:
+                continue
+            path = parent / name
+            depth = len(path.relative_to(self.base).parts)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    if depth == 1:
+                        self.add_project(path)
+                    elif depth == 2:
+                        self.add(path, FILE_MASK)
+                if depth == 2:
+                    # 新拷进来或删掉的测试目录，里面可能已经有stats.json
+                    changed.add(str(path.relative_to(self.base)))
+            elif depth == 3 and is_watched(name):
+                changed.add(str(path.relative_to(self.base)))
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """轮询监视：定时stat所有被监视的文件，比较(size, mtime)"""
+
+    def __init__(self, base, interval=POLL_INTERVAL):
+        self.base = base
+        self.interval = interval
+        self.snapshot = self.scan()
+
+    def scan(self):
+        snapshot = {}
+        for project_dir in sorted(p for p in self.base.iterdir() if p.is_dir()):
+            for run_dir in run_dirs(project_dir):
+                for entry in os.scandir(run_dir):
+                    if is_watched(entry.name) and entry.is_file():
+                        st = entry.stat()
+                        rel = os.path.relpath(entry.path, self.base)
+                        snapshot[rel] = (st.st_size, st.st_mtime_ns)
+        return snapshot
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            current = self.scan()
+            changed = {k for k in current.keys() | self.snapshot.keys()
+                       if current.get(k) != self.snapshot.get(k)}
+            self.snapshot = current
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            delay = self.interval if deadline is None else min(self.interval, deadline - time.monotonic())
+            time.sleep(max(delay, 0))
+
+    def close(self):
+        pass
+
+
+def make_watcher(base, poll=False, interval=POLL_INTERVAL):
+    if not poll and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(base)
+        except OSError as e:
+            print(f"[!] inotify unavailable ({e}), falling back to polling")
+    return PollingWatcher(base, interval)
+
+
+def collect(watcher, debounce=DEBOUNCE, max_delay=MAX_DELAY):
+    """阻塞到第一次相关改动（不被监视的文件的事件会返回空集合，继续等），
+    再把随后一小段时间内的改动合并成一批"""
+    changes = set()
+    while not changes:
+        changes = watcher.wait()
+    start = time.monotonic()
+    while time.monotonic() - start < max_delay:
+        more = watcher.wait(debounce)
+        if not more:
+            break
+        changes |= more
+    return changes
+
+
+def affected_projects(changes):
+    if '*' in changes:
+        return set(workspace.list_projects())
+    return {c.split(os.sep)[0] for c in changes}
+
+
+def affected_stages(projects, targets=None):
+    """受影响项目的ingest分片及其下游阶段（限定在targets及其上游之内）；
+    有项目被删掉时它的分片已经不在流水线里，返回None表示整条流水线都要检查"""
+    shards = [f'ingest:{p}' for p in sorted(projects)]
+    if any(s not in pipeline.STAGES for s in shards):
+        return None
+    wanted = set(pipeline.select(targets))
+    return [n for n in pipeline.downstream(shards) if n in wanted]
+
+
+def watch(targets=None, poll=False, interval=POLL_INTERVAL, debounce=DEBOUNCE, jobs=4):
+    base = workspace.benchmarks_dir()
+    watcher = make_watcher(base, poll, interval)
+    mode = 'inotify' if isinstance(watcher, InotifyWatcher) else f'polling every {interval}s'
+    print(f"[*] Watching {base} ({mode}), Ctrl-C to stop")
+    # 启动时先把结果补到最新
+    pipeline.run_pipeline(targets, jobs=jobs)
+    try:
+        while True:
+            changes = collect(watcher, debounce)
+            detected = time.perf_counter()
+            projects = affected_projects(changes)
+            print(f"[*] {len(changes)} change(s) in: {', '.join(sorted(projects))}")
+            # 新项目会带来新的ingest分片
+            pipeline.refresh_stages()
+            stages = affected_stages(projects, targets)
+            if stages is None:
+                summary = pipeline.run_pipeline(targets, jobs=jobs)
+            else:
+                # 其他项目的分片没变，不用再算它们的指纹
+                summary = pipeline.run_pipeline(stages, jobs=jobs, upstream=False)
+            ran = [n for n, s in summary.items() if s['status'] == 'ran']
+            failed = [n for n, s in summary.items() if s['status'] in ('failed', 'blocked')]
+            elapsed = time.perf_counter() - detected
+            print(f"[+] Rebuilt {', '.join(ran) or 'nothing'} in {elapsed:.2f}s"
+                  + (f" ({', '.join(failed)} failed/blocked)" if failed else ''))
+    except KeyboardInterrupt:
+        print("\n[*] Stopped watching")
+    finally:
+        watcher.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Watch benchmark dirs and rebuild results on change')
+    parser.add_argument('targets', nargs='*', help='pipeline stages to keep up to date (default: all)')
+    parser.add_argument('--poll', action='store_true', help='use polling instead of inotify')
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL, help='polling interval (seconds)')
+    parser.add_argument('--debounce', type=float, default=DEBOUNCE, help='quiet period before rebuilding')
+    parser.add_argument('--jobs', '-j', type=int, default=4)
+    args = parser.parse_args()
+    watch(args.targets or None, args.poll, args.interval, args.debounce, args.jobs)
+
+
+if __name__ == "__main__":
+    main()
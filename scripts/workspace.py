@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+工作区配置与项目注册表
+所有脚本的路径都从这里取，不再写死 /home/winger/code/zig/ai-pk。
+工作区根目录默认是仓库根目录，可以用环境变量 AI_PK_ROOT 指向别处，
+根目录下可选的 workspace.json 可以改子目录名、默认项目和项目元数据。
+
+  AI_PK_ROOT     工作区根目录
+  AI_PK_PROJECT  只处理某一个项目（分片模式）；不设置时处理全部项目并输出合并结果
+"""
+import os
+import json
+from pathlib import Path
+
+CODE_ROOT = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = CODE_ROOT / 'scripts'
+
+DEFAULTS = {
+    'benchmarks_dir': 'benchmarks',
+    'projects_dir': 'projects',
+    'results_dir': 'results',
+    'default_project': 'zigscan',
+    'projects': {},
+}
+
+_config = None
+
+
+def root():
+    """工作区根目录"""
+    return Path(os.environ.get('AI_PK_ROOT') or CODE_ROOT).resolve()
+
+
+def load_config():
+    """读取workspace.json（可选），与默认值合并"""
+    global _config
+    if _config is None or _config['_root'] != str(root()):
+        config = dict(DEFAULTS)
+        path = root() / 'workspace.json'
+        if path.exists():
+            with open(path, 'r', encoding='utf-8') as f:
+                config.update(json.load(f))
+        config['_root'] = str(root())
+        _config = config
+    return _config
+
+
+def benchmarks_dir():
+    return root() / load_config()['benchmarks_dir']
+
+
+def projects_dir():
+    return root() / load_config()['projects_dir']
+
+
+def results_root():
+    return root() / load_config()['results_dir']
+
+
+def default_project():
+    return load_config()['default_project']
+
+
+def list_projects():
+    """已注册的项目：benchmarks/<project>/ 下至少有一个带stats.json的测试目录"""
+    base = benchmarks_dir()
+    if not base.is_dir():
+        return []
+    projects = []
+    for entry in sorted(base.iterdir()):
+        if entry.is_dir() and any(entry.glob('*/stats.json')):
+            projects.append(entry.name)
+    return projects
+
+
+def current_project():
+    """分片模式下的项目名（环境变量AI_PK_PROJECT），未设置返回None表示合并模式"""
+    return os.environ.get('AI_PK_PROJECT') or None
+
+
+def active_projects():
+    """本次运行要处理的项目列表"""
+    project = current_project()
+    return [project] if project else list_projects()
+
+
+def bench_dir(project=None):
+    """项目的测试目录，默认取当前分片项目或默认项目"""
+    return benchmarks_dir() / (project or current_project() or default_project())
+
+
+def results_dir(project=None):
+    """输出目录：分片项目写 results/<project>/，合并模式写 results/"""
+    project = project or current_project()
+    return results_root() / project if project else results_root()
+
+
+def charts_dir(project=None):
+    return results_dir(project) / 'charts'
+
+
+def stats_template(project=None):
+    """项目自己的STATS_TEMPLATE.json，没有则用默认项目的"""
+    path = bench_dir(project) / 'STATS_TEMPLATE.json'
+    if path.exists():
+        return path
+    return benchmarks_dir() / default_project() / 'STATS_TEMPLATE.json'
+
+
+def project_info(project):
+    """项目元数据：workspace.json里的配置 + projects/<project>/ 说明文档"""
+    info = {'name': project, 'title': project}
+    info.update(load_config()['projects'].get(project, {}))
+    readme = projects_dir() / project / 'README.md'
+    if readme.exists():
+        info['readme'] = str(readme.relative_to(root()))
+    return info
+
+
+def main():
+    print(f"[*] Workspace root: {root()}")
+    print(f"[*] Results dir:    {results_root()}")
+    for project in list_projects():
+        runs = len(list(bench_dir(project).glob('*/stats.json')))
+        marker = ' (default)' if project == default_project() else ''
+        print(f"[+] Project: {project}{marker} - {runs} runs")
+
+
+if __name__ == "__main__":
+    main()
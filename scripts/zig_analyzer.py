@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Zig静态分析 - 给代码质量加分和bug扣分提供证据
+用进程池扫描每个提交的.zig源码：识别并发模型（线程池、epoll/poll、阻塞connect、
+调用ncat等外部工具），标出未检查的@intCast/窄整数运算（如65535端口时的溢出崩溃）、
+缺失或被忽略的超时，并统计规模和圈复杂度。
+单文件结果按内容哈希缓存在 results/static_analysis_cache.json，
+汇总写入各测试目录stats.json的 static_analysis 字段。
+"""
+import os
+import re
+import sys
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import workspace
+import stats_io
+from blob_store import walk_submission, iter_run_dirs, hash_file
+
+RESULTS_DIR = workspace.results_dir()
+CACHE_FILE = RESULTS_DIR / 'static_analysis_cache.json'
+SUMMARY_FILE = RESULTS_DIR / 'static_analysis.json'
+
+# 规则有变化时递增，缓存随之失效
+ANALYZER_VERSION = 1
+MAX_FINDINGS = 40
+
+# 并发相关信号：名称 -> 正则（在去掉注释和字符串的代码上匹配）
+CONCURRENCY_SIGNALS = {
+    'thread_pool': re.compile(r'\bThread\.Pool\b|\bstd\.Thread\.Pool\b'),
+    'threads': re.compile(r'\bThread\.spawn\b'),
+    'epoll': re.compile(r'\bepoll_(?:create1?|ctl|wait)\b|\bEPOLL\b'),
+    'io_uring': re.compile(r'\bIoUring\b|\bio_uring'),
+    'poll': re.compile(r'\bposix\.poll\s*\(|\bpollfd\b'),
+    'select': re.compile(r'\bselect\s*\(\s*\w+\s*,\s*&'),
+    'nonblocking': re.compile(r'\bNONBLOCK\b|0x800\b'),
+    'connect': re.compile(r'\bconnect\s*\('),
+    'external_process': re.compile(r'\bprocess\.Child\b|\bChildProcess\b|\bChild\.(?:init|run)\b|\bexecve\w*\s*\('),
+}
+# 外部扫描工具名出现在字符串字面量里（在原始源码上匹配）
+EXTERNAL_TOOLS = re.compile(r'"(ncat|nc|nmap|masscan|netcat|telnet)"')
+TIMEOUT_MECHANISMS = re.compile(r'\bposix\.poll\s*\(|\bepoll_wait\b|\bSO_RCVTIMEO\b|\bSO_SNDTIMEO\b|'
+                                r'\bsetsockopt\b|\bIoUring\b|\bselect\s*\(')
+
+INT_CAST = re.compile(r'@(intCast|truncate)\s*\(')
+NARROW_DECL = re.compile(r'\b(?:(?:var|const)\s+)?(\w+)\s*:\s*u(?:8|16)\b(?!\s*\))|'
+                         r'\b(?:var|const)\s+(\w+)\s*=\s*(?:try\s+)?std\.fmt\.parseInt\s*\(\s*u(?:8|16)\b')
+ALIAS_DECL = re.compile(r'\bvar\s+(\w+)\s*=\s*(\w+)\s*;')
+INCLUSIVE_LOOP = re.compile(r'while\s*\(\s*(\w+)\s*<=\s*[^)]*\)\s*:\s*\(\s*\1\s*\+=\s*1\s*\)')
+IGNORED_TIMEOUT = re.compile(r'_\s*=\s*(\w*timeout\w*)\s*;')
+FN_DECL = re.compile(r'\bfn\s+(\w+)\s*\(')
+DECISIONS = re.compile(r'\bif\b|\bwhile\b|\bfor\b|\bcatch\b|\borelse\b|\band\b|\bor\b|=>')
+
+
+def strip_code(text):
+    """去掉注释、字符串和多行字符串（保留行结构），避免在字面量里误匹配"""
+    out = []
+    for line in text.split('\n'):
+        stripped = line.lstrip()
+        if stripped.startswith('\\\\'):
+            out.append('')
+            continue
+        line = re.sub(r'"(?:[^"\\]|\\.)*"', '""', line)
+        line = re.sub(r"'(?:[^'\\]|\\.)*'", "''", line)
+        out.append(line.split('//', 1)[0])
+    return out
+
+
+def function_spans(lines):
+    """按大括号匹配找出每个函数的(名字, 起始行, 结束行)，行号从0开始"""
+    spans = []
+    for i, line in enumerate(lines):
+        m = FN_DECL.search(line)
+        if not m:
+            continue
+        depth = 0
+        opened = False
+        for j in range(i, len(lines)):
+            for ch in lines[j]:
+                if ch == '{':
+                    depth += 1
+                    opened = True
+                elif ch == '}':
+                    depth -= 1
+            if opened and depth <= 0:
+                spans.append((m.group(1), i, j))
+                break
+            if not opened and lines[j].rstrip().endswith(';'):
+                # 函数声明/类型，没有函数体
+                break
+    return spans
+
+
+def finding(kind, severity, line_no, raw_lines, message):
+    return {'kind': kind, 'severity': severity, 'line': line_no + 1,
+            'snippet': raw_lines[line_no].strip()[:160], 'message': message}
+
+
+def narrow_names(code_lines):
+    names = set()
+    for line in code_lines:
+        for m in NARROW_DECL.finditer(line):
+            names.add(m.group(1) or m.group(2))
+    # var port = start; 这种推断类型的别名也算窄整数
+    for line in code_lines:
+        m = ALIAS_DECL.search(line)
+        if m and m.group(2) in names:
+            names.add(m.group(1))
+    return names
+
+
+def analyze_file(path):
+    """分析单个.zig文件（在工作进程中运行）"""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        text = f.read()
+    raw = text.split('\n')
+    code = strip_code(text)
+
+    signals = sorted(name for name, rx in CONCURRENCY_SIGNALS.items()
+                     if any(rx.search(line) for line in code))
+    # 工具名只在确实会启动子进程时才算（服务名映射里的"telnet"之类不算）
+    tools = []
+    if 'external_process' in signals:
+        tools = sorted(set(m.group(1) for m in EXTERNAL_TOOLS.finditer(text)))
+    has_timeout = any(TIMEOUT_MECHANISMS.search(line) for line in code)
+
+    findings = []
+    spans = function_spans(code)
+    # 窄整数变量按函数作用域收集（参数和局部变量），避免同名变量误报
+    narrow_at = {}
+    for _name, start, end in spans:
+        names = narrow_names(code[start:end + 1])
+        if names:
+            rx = re.compile(r'\b(' + '|'.join(map(re.escape, sorted(names))) + r')\s*(?:\+=|-=|\*=|[+*-](?![%|=]))')
+            for i in range(start, end + 1):
+                narrow_at.setdefault(i, rx)
+    for i, line in enumerate(code):
+        narrow_arith = narrow_at.get(i)
+        for m in INT_CAST.finditer(line):
+            # 括号里有减法（时间戳差、长度差）时负数会直接panic
+            arg = line[m.end():]
+            risky = ' - ' in arg.split(')')[0] or 'Timestamp' in arg
+            findings.append(finding('unchecked_cast', 'high' if risky else 'low', i, raw,
+                                    f'@{m.group(1)} without a range check'))
+        if INCLUSIVE_LOOP.search(line):
+            findings.append(finding('inclusive_loop_overflow', 'high', i, raw,
+                                    'inclusive loop with += 1 overflows when the bound is the type maximum'))
+        elif narrow_arith and narrow_arith.search(line) and 'while' not in line.split(':')[0]:
+            findings.append(finding('narrow_arithmetic', 'medium', i, raw,
+                                    'checked arithmetic on a u8/u16 value may overflow (use +% or std.math.add)'))
+        m = IGNORED_TIMEOUT.search(line)
+        if m:
+            findings.append(finding('timeout_ignored', 'medium', i, raw,
+                                    f'{m.group(1)} parameter is discarded'))
+        if 'connect' in signals and not has_timeout and CONCURRENCY_SIGNALS['connect'].search(line):
+            findings.append(finding('missing_timeout', 'high', i, raw,
+                                    'connect() without poll/epoll/SO_SNDTIMEO, blocks until the kernel gives up'))
+    for i, line in enumerate(raw):
+        if tools and EXTERNAL_TOOLS.search(line):
+            findings.append(finding('external_tool', 'high', i, raw,
+                                    'spawns an external scanner instead of using sockets'))
+
+    comment_lines = sum(1 for line in raw if line.lstrip().startswith('//'))
+    blank_lines = sum(1 for line in raw if not line.strip())
+    functions = []
+    for name, start, end in spans:
+        body = code[start:end + 1]
+        complexity = 1 + sum(len(DECISIONS.findall(line)) for line in body)
+        functions.append({'name': name, 'line': start + 1, 'lines': end - start + 1,
+                          'complexity': complexity})
+    return {
+        'lines': len(raw),
+        'code_lines': len(raw) - comment_lines - blank_lines,
+        'comment_lines': comment_lines,
+        'signals': signals,
+        'external_tools': tools,
+        'has_timeout': has_timeout,
+        'functions': functions,
+        'findings': findings,
+    }
+
+
+def concurrency_model(signals, tools):
+    """提交的主要并发模型"""
+    if tools or 'external_process' in signals:
+        return 'external-tool'
+    for model in ('io_uring', 'epoll'):
+        if model in signals:
+            return model
+    if 'poll' in signals or 'select' in signals:
+        return 'threads+poll' if {'threads', 'thread_pool'} & set(signals) else 'poll'
+    if 'thread_pool' in signals:
+        return 'thread-pool'
+    if 'threads' in signals:
+        return 'threads+blocking-connect'
+    if 'connect' in signals:
+        return 'blocking-connect'
+    return 'unknown'
+
+
+def summarize(files):
+    """把单文件结果汇总成写入stats.json的证据"""
+    signals, tools, findings, functions = set(), set(), [], []
+    totals = {'files': len(files), 'lines': 0, 'code_lines': 0, 'comment_lines': 0}
+    for rel, result in files:
+        signals.update(result['signals'])
+        tools.update(result['external_tools'])
+        for key in ('lines', 'code_lines', 'comment_lines'):
+            totals[key] += result[key]
+        functions += result['functions']
+        findings += [dict(f, file=rel) for f in result['findings']]
+    severity_order = {'high': 0, 'medium': 1, 'low': 2}
+    findings.sort(key=lambda f: (severity_order[f['severity']], f['file'], f['line']))
+    counts = {}
+    for f in findings:
+        counts[f['kind']] = counts.get(f['kind'], 0) + 1
+    complexities = [fn['complexity'] for fn in functions]
+    totals.update({
+        'functions': len(functions),
+        'max_complexity': max(complexities, default=0),
+        'avg_complexity': round(sum(complexities) / len(complexities), 1) if complexities else 0,
+        'max_function_lines': max((fn['lines'] for fn in functions), default=0),
+    })
+    return {
+        'analyzer_version': ANALYZER_VERSION,
+        'concurrency_model': concurrency_model(sorted(signals), sorted(tools)),
+        'signals': sorted(signals),
+        'external_tools': sorted(tools),
+        'metrics': totals,
+        'finding_counts': counts,
+        'findings': findings[:MAX_FINDINGS],
+    }
+
+
+def load_cache():
+    if not CACHE_FILE.exists():
+        return {}
+    with open(CACHE_FILE, 'r', encoding='utf-8') as f:
+        cache = json.load(f)
+    return cache if cache.get('version') == ANALYZER_VERSION else {}
+
+
+def save_cache(cache):
+    cache['version'] = ANALYZER_VERSION
+    stats_io.write_json_atomic(CACHE_FILE, cache)
+
+
+def zig_files(run_dir):
+    files = []
+    for root, dirs, names in walk_submission(run_dir):
+        files += [os.path.join(root, n) for n in names if n.endswith('.zig')]
+    return sorted(files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Static analysis of Zig submissions')
+    parser.add_argument('test_dirs', nargs='*', help='only analyze these test dirs')
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count())
+    parser.add_argument('--dry-run', action='store_true', help='do not write stats.json')
+    parser.add_argument('--verbose', '-v', action='store_true', help='print findings')
+    args = parser.parse_args()
+
+    cache = load_cache()
+    files_by_hash = cache.setdefault('files', {})
+    runs = []
+    pending = {}
+    for run_dir in iter_run_dirs(workspace.bench_dir()):
+        test_dir = os.path.basename(run_dir)
+        if args.test_dirs and test_dir not in args.test_dirs:
+            continue
+        entries = []
+        for path in zig_files(run_dir):
+            digest = hash_file(path)
+            entries.append((os.path.relpath(path, run_dir), digest))
+            if digest not in files_by_hash:
+                pending.setdefault(digest, path)
+        runs.append((run_dir, entries))
+
+    print(f"[*] {sum(len(e) for _, e in runs)} files in {len(runs)} submissions, "
+          f"{len(pending)} not cached, analyzing with {args.jobs} worker(s)...")
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        for digest, result in zip(pending, pool.map(analyze_file, pending.values(), chunksize=4)):
+            files_by_hash[digest] = result
+    save_cache(cache)
+
+    summary = {}
+    for run_dir, entries in runs:
+        test_dir = os.path.basename(run_dir)
+        evidence = summarize([(rel, files_by_hash[d]) for rel, d in entries])
+        summary[test_dir] = evidence
+        counts = ', '.join(f'{k}={v}' for k, v in sorted(evidence['finding_counts'].items())) or 'clean'
+        print(f"[+] {test_dir:32s} {evidence['concurrency_model']:24s} {counts}")
+        if args.verbose:
+            for f in evidence['findings']:
+                print(f"      [{f['severity']}] {f['file']}:{f['line']} {f['kind']}: {f['snippet']}")
+        stats = stats_io.load_stats(test_dir, workspace.bench_dir())
+        if stats is not None and not args.dry_run and stats.get('static_analysis') != evidence:
+            stats['static_analysis'] = evidence
+            stats_io.write_json_atomic(stats_io.stats_path(test_dir, workspace.bench_dir()), stats)
+
+    stats_io.write_json_atomic(SUMMARY_FILE, summary)
+    print(f"[+] Summary saved: {SUMMARY_FILE}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())